@@ -0,0 +1,97 @@
+import os
+import glob
+import random
+
+import text_game_maker
+from text_game_maker.ptttl import ptttl_audio_encoder
+from text_game_maker.ptttl.ptttl_parser import PTTTLParser
+
+from benchmarks.harness import benchmark, Result, best_time
+
+SONG_DIR = os.path.join(os.path.dirname(text_game_maker.__file__),
+    'ptttl-data')
+
+# The tones engine is slow, so limit the number of repeats for it
+MAX_TONES_REPEAT = 2
+
+# Size of the generated score used for the parser benchmark
+SCORE_NOTES = 100000
+SCORE_TRACKS = 4
+SCORE_BLOCK_NOTES = 50
+SCORE_SEED = 1234
+
+_score_notes = ['c', 'c#', 'db', 'd', 'eb', 'e', 'f', 'f#', 'g', 'ab', 'a',
+    'bb', 'b', 'p']
+
+def generate_score(numnotes, numtracks=SCORE_TRACKS,
+        block_notes=SCORE_BLOCK_NOTES, seed=SCORE_SEED):
+    """
+    Generate a PTTTL score with random notes
+
+    :param int numnotes: total number of notes, across all tracks
+    :param int numtracks: number of tracks
+    :param int block_notes: number of notes per track in each block
+    :param int seed: seed for random choices
+    :return: PTTTL data
+    :rtype: str
+    """
+    rng = random.Random(seed)
+    blocks = []
+
+    for _ in range(numnotes // (numtracks * block_notes)):
+        tracks = []
+        for _ in range(numtracks):
+            tracks.append(', '.join(['%s%s%s%s' % (
+                rng.choice(['', '4', '8', '16']), rng.choice(_score_notes),
+                rng.choice(['', '3', '5', '6']), rng.choice(['', '.']))
+                for _ in range(block_notes)]))
+
+        blocks.append(' |\n'.join(tracks))
+
+    return 'benchmark:\nd=4,o=5,b=120:\n' + ';\n\n'.join(blocks)
+
+def _parsed_songs():
+    ret = []
+    for filename in sorted(glob.glob(os.path.join(SONG_DIR, '*.txt'))):
+        with open(filename, 'r') as fh:
+            ret.append(PTTTLParser().parse(fh.read()))
+
+    return ret
+
+def _synth_secs(songs, engine, repeat):
+    def synth():
+        for parsed in songs:
+            ptttl_audio_encoder._generate_sample_data(parsed, 0.5,
+                ptttl_audio_encoder.SINE_WAVE, engine)
+
+    return best_time(synth, repeat)
+
+@benchmark('synth')
+def synth(repeat):
+    songs = _parsed_songs()
+
+    tones_secs = _synth_secs(songs, ptttl_audio_encoder.ENGINE_TONES,
+        min(repeat, MAX_TONES_REPEAT))
+    ret = [Result('tones_secs', tones_secs, 's')]
+
+    if not ptttl_audio_encoder.numpy_available():
+        return ret
+
+    numpy_secs = _synth_secs(songs, ptttl_audio_encoder.ENGINE_NUMPY, repeat)
+    ret.extend([
+        Result('numpy_secs', numpy_secs, 's'),
+        Result('numpy_speedup', tones_secs / numpy_secs, 'x',
+            higher_is_better=True)
+    ])
+
+    return ret
+
+@benchmark('ptttl_parse')
+def ptttl_parse(repeat):
+    score = generate_score(SCORE_NOTES)
+    secs = best_time(lambda: PTTTLParser().parse(score), repeat)
+
+    return [
+        Result('notes_per_sec', SCORE_NOTES / secs, 'notes/s',
+            higher_is_better=True)
+    ]
@@ -0,0 +1,230 @@
+from timeit import default_timer
+
+from text_game_maker.chatbot_utils.redict import ReDict
+from text_game_maker.crafting import crafting
+from text_game_maker.example_map import room_ids
+from text_game_maker.game_objects.items import Item
+from text_game_maker.game_objects.person import Person
+from text_game_maker.player import player
+from text_game_maker.tile import tile
+from text_game_maker.utils import utils
+
+from benchmarks.harness import (benchmark, Result, build_example_map, play,
+    best_time
+)
+from benchmarks.walkthrough import NEW_GAME, WALKTHROUGH, DIALOGUE
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# Calls per measurement for the faster benchmarks
+SAVE_LOAD_CALLS = 10
+MAP_RENDER_CALLS = 200
+DESCRIBE_CALLS = 200
+DIALOGUE_CALLS = 20
+CRAFTING_CALLS = 20
+NPC_TICK_CALLS = 20
+
+# Number of generated recipes for the crafting benchmark
+CRAFTING_RECIPES = 5000
+CRAFTING_INGREDIENTS = 200
+
+# Number of distinct dialogue sets, and number of NPCs using each set, for
+# the dialogue compile benchmark
+DIALOGUE_SETS = 600
+NPCS_PER_DIALOGUE_SET = 5
+
+# Number of NPCs following the player for the NPC simulation benchmark, and
+# number of active NPCs in a part of the map the player cannot reach
+FOLLOWING_NPCS = 500
+SUSPENDED_NPCS = 5000
+
+def _add_generated_recipes(numrecipes):
+    names = ['part %d' % i for i in range(CRAFTING_INGREDIENTS)]
+    for i in range(numrecipes):
+        ingredients = [Item('a', names[(i * 7 + j) % len(names)])
+            for j in range(3)]
+        crafting.add(ingredients, Item('a', 'gadget %d mark %d' % (i, i % 3)))
+
+    return [Item('a', name) for name in names[:20]]
+
+def _played_example_map():
+    builder = build_example_map()
+    play(builder, WALKTHROUGH)
+    return builder
+
+@benchmark('walkthrough')
+def walkthrough(repeat):
+    build_secs = []
+    play_secs = []
+
+    for _ in range(repeat):
+        start = default_timer()
+        builder = build_example_map()
+        build_secs.append(default_timer() - start)
+
+        start = default_timer()
+        play(builder, WALKTHROUGH)
+        play_secs.append(default_timer() - start)
+
+    commands = len(NEW_GAME) + len(WALKTHROUGH)
+    return [
+        Result('commands_per_sec', commands / min(play_secs), 'commands/s',
+            higher_is_better=True),
+        Result('map_build_secs', min(build_secs), 's')
+    ]
+
+@benchmark('save_load')
+def save_load(repeat):
+    builder = _played_example_map()
+    state = builder.player.save_to_string()
+
+    save_secs = best_time(builder.player.save_to_string, repeat,
+        SAVE_LOAD_CALLS)
+    load_secs = best_time(lambda: player.load_from_string(state), repeat,
+        SAVE_LOAD_CALLS)
+
+    return [
+        Result('save_secs', save_secs, 's'),
+        Result('load_secs', load_secs, 's'),
+        Result('save_size_bytes', len(state), 'bytes')
+    ]
+
+@benchmark('map_render')
+def map_render(repeat):
+    builder = _played_example_map()
+    secs = best_time(lambda: utils.draw_map_of_nearby_tiles(builder.player),
+        repeat, MAP_RENDER_CALLS)
+
+    return [Result('draw_map_secs', secs, 's')]
+
+def _check_loaded_descriptions(state):
+    # Tile descriptions are cached, so check that changing a person's name
+    # after loading a saved game still changes the description
+    loaded = player.load_from_string(state)
+    for t in tile.iterate_tiles():
+        people = [p for l in t.people.values() for p in l]
+        if not people:
+            continue
+
+        loaded.current = t
+        before = loaded.describe_current_tile()
+        people[0].name = "renamed %s" % people[0].name
+        if loaded.describe_current_tile() == before:
+            raise RuntimeError("description of %s not updated after a person "
+                "was renamed" % t.tile_id)
+
+        return
+
+    raise RuntimeError("no people found in loaded game")
+
+@benchmark('describe_tile')
+def describe_tile(repeat):
+    builder = _played_example_map()
+    _check_loaded_descriptions(builder.player.save_to_string())
+
+    builder = _played_example_map()
+    secs = best_time(lambda: builder.player.describe_current_tile(), repeat,
+        DESCRIBE_CALLS)
+
+    return [Result('describe_tile_secs', secs, 's')]
+
+@benchmark('dialogue')
+def dialogue(repeat):
+    build_example_map()
+    entrance = tile.get_tile_by_id(room_ids.entrance_id)
+    oldman = [p for people in entrance.people.values() for p in people][0]
+
+    def lookups():
+        for phrase in DIALOGUE:
+            oldman.get_response(phrase)
+
+    secs = best_time(lookups, repeat, DIALOGUE_CALLS) / len(DIALOGUE)
+    return [
+        Result('lookups_per_sec', 1.0 / secs, 'lookups/s',
+            higher_is_better=True)
+    ]
+
+@benchmark('dialogue_compile')
+def dialogue_compile(repeat):
+    sets = []
+    for i in range(DIALOGUE_SETS):
+        sets.append({
+            '(hello|hi) there %d' % i: ['hello'],
+            'what is (.*) %d' % i: ['no idea'],
+            'bye %d|see you %d' % (i, i): ['bye']
+        })
+
+    def load_npcs():
+        loaded = []
+        for _ in range(NPCS_PER_DIALOGUE_SET):
+            for data in sets:
+                responsedict = ReDict().load_from_dict(data)
+                responsedict.compile()
+                loaded.append(responsedict)
+
+    secs = best_time(load_npcs, repeat)
+    return [Result('compile_secs', secs, 's')]
+
+@benchmark('crafting')
+def crafting_lookup(repeat):
+    build_example_map()
+    available = _add_generated_recipes(CRAFTING_RECIPES)
+
+    # Fuzzy lookup that matches the last recipe added
+    last = 'gadget %d' % (CRAFTING_RECIPES - 1)
+    lookup_secs = best_time(lambda: crafting.can_craft(last), repeat,
+        CRAFTING_CALLS)
+    query_secs = best_time(lambda: crafting.craftable_with(available), repeat,
+        CRAFTING_CALLS)
+
+    return [
+        Result('lookup_secs', lookup_secs, 's'),
+        Result('craftable_query_secs', query_secs, 's')
+    ]
+
+@benchmark('npc_tick')
+def npc_tick(repeat):
+    builder = build_example_map()
+    entrance = tile.get_tile_by_id(room_ids.entrance_id)
+    lounge = tile.get_tile_by_id(room_ids.bank_lounge_id)
+
+    def add_following_npcs(location, count):
+        builder.player.current = location
+        for i in range(count):
+            npc = Person('a', 'guard %d' % i, location='in the corner')
+            location.add_person(npc)
+            npc._start_following_player(builder.player)
+
+        builder.player.current = entrance
+
+        # Let all NPCs become active before measuring
+        builder.player.scheduler_tick()
+        builder.player.scheduler_tick()
+
+        return best_time(builder.player.scheduler_tick, repeat, NPC_TICK_CALLS)
+
+    secs = add_following_npcs(entrance, FOLLOWING_NPCS)
+    suspended_secs = add_following_npcs(lounge, SUSPENDED_NPCS)
+
+    return [
+        Result('tick_secs', secs, 's'),
+        Result('tick_with_suspended_secs', suspended_secs, 's')
+    ]
+
+@benchmark('memory')
+def memory(repeat):
+    if tracemalloc is None:
+        # tracemalloc is not available on python 2
+        return []
+
+    tracemalloc.start()
+    try:
+        _played_example_map()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return [Result('walkthrough_peak_bytes', peak, 'bytes')]
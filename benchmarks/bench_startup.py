@@ -0,0 +1,52 @@
+import os
+import sys
+import subprocess
+
+from benchmarks.harness import benchmark, Result
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules imported by worker processes, with a short name for each result
+IMPORT_MODULES = [
+    ('runner', 'text_game_maker.utils.runner'),
+    ('map_builder', 'text_game_maker.builder.map_builder'),
+    ('utils', 'text_game_maker.utils.utils')
+]
+
+IMPORTTIME_PREFIX = 'import time:'
+
+def _import_secs(module):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([REPO_DIR, env.get('PYTHONPATH', '')])
+
+    # Each measurement needs a fresh interpreter, with nothing imported yet
+    proc = subprocess.Popen([sys.executable, '-X', 'importtime', '-c',
+        'import %s' % module], stderr=subprocess.PIPE, env=env, cwd=REPO_DIR)
+    _, stderr = proc.communicate()
+
+    if proc.returncode != 0:
+        raise RuntimeError("failed to import %s" % module)
+
+    for line in stderr.decode('utf-8').splitlines():
+        if not line.startswith(IMPORTTIME_PREFIX):
+            continue
+
+        fields = line[len(IMPORTTIME_PREFIX):].split('|')
+        if fields[2].strip() == module:
+            # Cumulative import time, in microseconds
+            return int(fields[1]) / 1000000.0
+
+    raise RuntimeError("no import time reported for %s" % module)
+
+@benchmark('startup')
+def startup(repeat):
+    if sys.version_info < (3, 7):
+        # -X importtime is not available before python 3.7
+        return []
+
+    ret = []
+    for name, module in IMPORT_MODULES:
+        secs = min(_import_secs(module) for _ in range(repeat))
+        ret.append(Result('import_%s_secs' % name, secs, 's'))
+
+    return ret
@@ -0,0 +1,108 @@
+import timeit
+
+from text_game_maker.builder.map_builder import StopWaitingForInput
+from text_game_maker.utils import utils
+from text_game_maker.utils.runner import (build_map_from_class,
+    reset_global_state
+)
+from text_game_maker.example_map.example_map import ExampleMapRunner
+
+from benchmarks.walkthrough import NEW_GAME
+
+# Seed used for all game sessions, so every run makes the same random choices
+SEED = 1234
+
+_benchmarks = []
+
+class Result(object):
+    """
+    A single measurement produced by a benchmark
+    """
+    def __init__(self, name, value, unit, higher_is_better=False):
+        """
+        :param str name: measurement name
+        :param float value: measured value
+        :param str unit: unit of measured value
+        :param bool higher_is_better: True if a higher value is an improvement
+        """
+        self.name = name
+        self.value = value
+        self.unit = unit
+        self.higher_is_better = higher_is_better
+
+    def to_dict(self):
+        return {
+            'value': self.value,
+            'unit': self.unit,
+            'higher_is_better': self.higher_is_better
+        }
+
+def benchmark(name):
+    """
+    Decorator to register a benchmark function. The function will be called
+    with the number of times to repeat each measurement, and must return a list
+    of benchmarks.harness.Result instances.
+
+    :param str name: benchmark name
+    """
+    def decorator(func):
+        _benchmarks.append((name, func))
+        return func
+
+    return decorator
+
+def get_benchmarks():
+    """
+    Get all registered benchmarks
+
+    :return: list of tuples of the form ``(name, func)``
+    :rtype: [tuple]
+    """
+    return list(_benchmarks)
+
+def _discard_output(text):
+    pass
+
+def _stop_input(prompt):
+    return StopWaitingForInput()
+
+def set_headless_io():
+    """
+    Discard all game output, and stop the game as soon as it asks for input
+    that has not been queued with utils.queue_command_sequence
+    """
+    utils.set_printfunc(_discard_output)
+    utils.set_inputfunc(_stop_input)
+
+def build_example_map():
+    """
+    Build the example map from scratch, without running it
+
+    :return: map builder instance containing the built map
+    :rtype: text_game_maker.builder.map_builder.MapBuilder
+    """
+    reset_global_state()
+    set_headless_io()
+    return build_map_from_class(ExampleMapRunner, SEED)
+
+def play(builder, commands):
+    """
+    Start a new game and run a list of commands, headlessly
+
+    :param text_game_maker.builder.map_builder.MapBuilder builder: built map
+    :param [str] commands: commands to run after starting a new game
+    """
+    utils.queue_command_sequence(NEW_GAME + list(commands))
+    builder.run_game()
+
+def best_time(func, repeat, number=1):
+    """
+    Time a function call
+
+    :param func: function to time, takes no arguments
+    :param int repeat: number of times to repeat the measurement
+    :param int number: number of calls per measurement
+    :return: fastest time for a single call, in seconds
+    :rtype: float
+    """
+    return min(timeit.Timer(func).repeat(repeat, number)) / number
@@ -0,0 +1,130 @@
+from __future__ import print_function
+import sys
+import json
+import time
+import fnmatch
+import platform
+import argparse
+
+import text_game_maker
+from benchmarks.harness import get_benchmarks
+
+# Importing benchmark modules registers their benchmarks
+from benchmarks import bench_game, bench_audio, bench_startup
+
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 10.0
+
+def run_benchmarks(repeat=DEFAULT_REPEAT, pattern='*'):
+    """
+    Run all registered benchmarks
+
+    :param int repeat: number of times to repeat each measurement
+    :param str pattern: only run benchmarks with names matching this\
+        fnmatch-style pattern
+    :return: results, keyed by ``<benchmark name>.<result name>``
+    :rtype: dict
+    """
+    results = {}
+    for name, func in get_benchmarks():
+        if not fnmatch.fnmatch(name, pattern):
+            continue
+
+        print("running %s..." % name)
+        for result in func(repeat):
+            results['%s.%s' % (name, result.name)] = result.to_dict()
+
+    return results
+
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare benchmark results against a baseline
+
+    :param dict results: results from run_benchmarks
+    :param dict baseline: baseline results from run_benchmarks
+    :param float threshold: percentage by which a result must be worse than\
+        the baseline to be counted as a regression
+    :return: list of tuples of the form ``(name, old, new, change, regressed)``\
+        where ``change`` is the percentage change from the baseline value
+    :rtype: [tuple]
+    """
+    ret = []
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+
+        old = baseline[name]['value']
+        new = results[name]['value']
+        if old == 0:
+            continue
+
+        change = ((new - old) / float(old)) * 100.0
+        if results[name]['higher_is_better']:
+            regressed = change < -threshold
+        else:
+            regressed = change > threshold
+
+        ret.append((name, old, new, change, regressed))
+
+    return ret
+
+def main():
+    argparser = argparse.ArgumentParser(description="Run text_game_maker "
+        "benchmarks, and optionally compare results against a baseline")
+
+    argparser.add_argument('-o', '--output', help="write results to this "
+        "JSON file")
+    argparser.add_argument('-c', '--compare', help="compare results against "
+        "a baseline JSON file written by a previous run")
+    argparser.add_argument('-t', '--threshold', type=float,
+        default=DEFAULT_THRESHOLD, help="percentage by which a result must be "
+        "worse than the baseline to fail the comparison (default: "
+        "%(default)s)")
+    argparser.add_argument('-r', '--repeat', type=int, default=DEFAULT_REPEAT,
+        help="number of times to repeat each measurement (default: "
+        "%(default)s)")
+    argparser.add_argument('-k', '--pattern', default='*', help="only run "
+        "benchmarks with names matching this pattern (default: %(default)s)")
+
+    args = argparser.parse_args()
+
+    results = run_benchmarks(args.repeat, args.pattern)
+
+    print("")
+    for name in sorted(results):
+        print("%-40s %14.6g %s" % (name, results[name]['value'],
+            results[name]['unit']))
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({
+                'version': text_game_maker.__version__,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'timestamp': time.time(),
+                'results': results
+            }, fh, indent=4, sort_keys=True)
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare, 'r') as fh:
+        baseline = json.load(fh)['results']
+
+    regressions = 0
+    print("\nComparison against %s (threshold %.1f%%):\n"
+        % (args.compare, args.threshold))
+
+    for name, old, new, change, regressed in compare_results(results,
+            baseline, args.threshold):
+        if regressed:
+            regressions += 1
+
+        print("%-40s %14.6g -> %-14.6g %+7.1f%% %s" % (name, old, new, change,
+            "REGRESSION" if regressed else ""))
+
+    print("\n%d regressions" % regressions)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+# Commands to start a new game from the main menu, and enter a player name
+NEW_GAME = ["1", "benchmark"]
+
+# Scripted playthrough of text_game_maker.example_map. Covers escaping the
+# starting cell, crafting, containers, conversations with both NPCs, the pawn
+# shop menu and the map display. Empty strings end conversations/menus.
+WALKTHROUGH = [
+    "use lighter",
+    "get bag",
+    "look in tin",
+    "get blueprint from tin",
+    "get string",
+    "get paperclip",
+    "craft lockpick",
+    "east",
+    "unlock door",
+    "east",
+    "look",
+    "speak to old man",
+    "hello",
+    "what is going on",
+    "who are the raiders",
+    "why are they here",
+    "where are we",
+    "",
+    "north",
+    "get flashlight",
+    "get coins",
+    "look in filing cabinet",
+    "get badge from filing cabinet",
+    "get battery from filing cabinet",
+    "south",
+    "south",
+    "south",
+    "look in paper bag",
+    "get paper bag",
+    "north",
+    "west",
+    "get cd",
+    "east",
+    "north",
+    "unlock heavy iron door",
+    "east",
+    "east",
+    "east",
+    "speak to cashier",
+    "sell",
+    "",
+    "",
+    "i",
+    "west",
+    "south",
+    "look",
+    "map",
+    "north",
+    "west",
+    "west",
+    "look",
+    "speak to old man",
+    "what are the replacements",
+    "when will they come",
+    "",
+    "equip flashlight",
+    "look",
+    "examine lighter"
+]
+
+# Phrases used to benchmark NPC dialogue lookup. Includes phrases matching
+# plain responses, context entry phrases, context responses, and phrases
+# that match nothing and fall through to the default responses.
+DIALOGUE = [
+    "hello",
+    "what is going on",
+    "where should i go",
+    "where are we",
+    "who are the raiders",
+    "why are they here",
+    "tell me about the raiders",
+    "what are the replacements",
+    "when will they come",
+    "nice weather today",
+    "do you like cheese",
+    "goodbye"
+]
@@ -45,7 +45,8 @@ setup(
     author_email='eknyquist@gmail.com',
     license='Apache 2.0',
     install_requires=dependencies,
-    packages=find_packages(exclude=['example-map']),
+    extras_require={'numpy': ['numpy']},
+    packages=find_packages(exclude=['example-map', 'benchmarks']),
     package_dir={'text_game_maker':'text_game_maker'},
     package_data={'text_game_maker':['ptttl-data/*.txt', 'utils/*.txt', 'example_map/example_map.tgmdata']},
     cmdclass={'test': TestRunner},
@@ -1,9 +1,17 @@
 import sys
 import os
 import time
-from pygame import mixer
+import hashlib
+import tempfile
+import heapq
+import threading
 import text_game_maker
-from text_game_maker.ptttl.ptttl_audio_encoder import ptttl_to_sample_data
+from text_game_maker.ptttl.ptttl_parser import PTTTLParser
+from text_game_maker.ptttl.ptttl_audio_encoder import (ptttl_to_sample_data,
+    generate_sample_chunks, duration_secs, SAMPLE_RATE, SINE_WAVE,
+    CHUNK_SAMPLES
+)
+from text_game_maker.utils import utils
 
 dir_path = os.path.dirname(text_game_maker.__file__)
 AUDIO_DIR = os.path.join(dir_path, 'ptttl-data')
@@ -20,17 +28,250 @@ SAMPLESIZE = -16
 CHANNELS = 1
 BUFSIZE = 1024
 
+AMPLITUDE = 0.5
+WAVETYPE = SINE_WAVE
+
+# Increment if changes to PTTTL synthesis change the generated samples, to
+# invalidate previously cached samples
+PCM_CACHE_VERSION = 1
+PCM_CACHE_SUFFIX = '.pcm'
+
+# Sounds at least this long are streamed in chunks while they are played,
+# instead of being synthesized and loaded in full before playing
+STREAM_MIN_SECS = 5.0
+
+# Size in bytes of each chunk of 16-bit samples queued for streamed sounds
+STREAM_CHUNK_BYTES = CHUNK_SAMPLES * 2
+
+# Number of sounds that can play at the same time
+MIXER_CHANNELS = 4
+
+# Max. number of sounds waiting to be played
+QUEUE_SIZE = 16
+
+# Sound priorities; when all mixer channels are busy, queued sounds with a
+# lower priority value are played first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# pygame.mixer, imported by init() (pygame is slow to import, and is not
+# needed at all when audio is disabled)
+mixer = None
+
 class _Control(object):
     def __init__(self):
         self.sounds = {}
-        self.last_played = None
+        self.sound_files = {}
+        self.worker = None
+        self.stopping = None
         self.files_loaded = False
 
 ctrl = _Control()
 
+def _get_pcm_cache_dir():
+    return os.path.join(utils.get_cache_dir(), 'pcm')
+
+def _pcm_cache_key(ptttl_data, amplitude, wavetype):
+    params = "|%d|%d|%r|%s" % (PCM_CACHE_VERSION, SAMPLE_RATE, amplitude,
+        wavetype)
+
+    sha = hashlib.sha1()
+    sha.update(ptttl_data.encode('utf-8'))
+    sha.update(params.encode('utf-8'))
+    return sha.hexdigest()
+
+def _pcm_cache_filename(ptttl_data, amplitude, wavetype):
+    # Returns None if the cache directory cannot be created
+    try:
+        dirname = _get_pcm_cache_dir()
+    except (IOError, OSError):
+        return None
+
+    return os.path.join(dirname,
+        _pcm_cache_key(ptttl_data, amplitude, wavetype) + PCM_CACHE_SUFFIX)
+
+def _write_cache_file(filename, data):
+    dirname = os.path.dirname(filename)
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+
+    # Write to a temporary file first, so that a partially written file is
+    # never read from the cache
+    fd, tmpname = tempfile.mkstemp(dir=dirname)
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+
+        os.rename(tmpname, filename)
+    except (IOError, OSError):
+        os.remove(tmpname)
+        raise
+
+def get_sample_data(ptttl_data, amplitude=AMPLITUDE, wavetype=WAVETYPE):
+    """
+    Convert PTTTL data to PCM samples. Samples are cached on disk, keyed by a
+    hash of the PTTTL data and synthesis parameters, so each unique sound is
+    only synthesized once.
+
+    :param str ptttl_data: PTTTL data
+    :param float amplitude: amplitude, 0.0 to 1.0
+    :param int wavetype: wave type
+    :return: PCM samples
+    :rtype: bytes
+    """
+    filename = _pcm_cache_filename(ptttl_data, amplitude, wavetype)
+    if filename is None:
+        # No cache directory, just synthesize every time
+        return ptttl_to_sample_data(ptttl_data, amplitude, wavetype)
+
+    try:
+        with open(filename, 'rb') as fh:
+            return fh.read()
+    except (IOError, OSError):
+        pass
+
+    rawdata = ptttl_to_sample_data(ptttl_data, amplitude, wavetype)
+
+    try:
+        _write_cache_file(filename, rawdata)
+    except (IOError, OSError):
+        # Cache is not writable, just synthesize again next time
+        pass
+
+    return rawdata
+
+def _read_cached_chunks(fh):
+    with fh:
+        while True:
+            chunk = fh.read(STREAM_CHUNK_BYTES)
+            if not chunk:
+                break
+
+            yield chunk
+
+def _open_cache_tempfile(filename):
+    dirname = os.path.dirname(filename)
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+
+    fd, tmpname = tempfile.mkstemp(dir=dirname)
+    return os.fdopen(fd, 'wb'), tmpname
+
+def _render_chunks(parsed, amplitude, wavetype, filename):
+    fh = None
+    if filename is not None:
+        try:
+            fh, tmpname = _open_cache_tempfile(filename)
+        except (IOError, OSError):
+            # Cache is not writable, just synthesize again next time
+            fh = None
+
+    completed = False
+    try:
+        for chunk in generate_sample_chunks(parsed, amplitude, wavetype):
+            if fh is not None:
+                fh.write(chunk)
+
+            yield chunk
+
+        completed = True
+    finally:
+        if fh is not None:
+            fh.close()
+
+            # Only add the samples to the cache if the whole sound was rendered
+            try:
+                if completed:
+                    os.rename(tmpname, filename)
+                else:
+                    os.remove(tmpname)
+            except (IOError, OSError):
+                pass
+
+def get_sample_chunks(ptttl_data, parsed=None, amplitude=AMPLITUDE,
+        wavetype=WAVETYPE):
+    """
+    Generator that converts PTTTL data to PCM samples, one fixed-size chunk at
+    a time. If the samples are cached on disk, chunks are read from the cache.
+    Otherwise, chunks are synthesized as they are needed, and added to the
+    cache once all chunks have been synthesized.
+
+    :param str ptttl_data: PTTTL data
+    :param list parsed: PTTTL data already parsed by\
+        text_game_maker.ptttl.ptttl_parser.PTTTLParser (if None,\
+        ``ptttl_data`` will be parsed if needed)
+    :param float amplitude: amplitude, 0.0 to 1.0
+    :param int wavetype: wave type
+    :return: generator yielding PCM sample chunks
+    """
+    filename = _pcm_cache_filename(ptttl_data, amplitude, wavetype)
+
+    if filename is not None:
+        try:
+            fh = open(filename, 'rb')
+        except (IOError, OSError):
+            pass
+        else:
+            return _read_cached_chunks(fh)
+
+    if parsed is None:
+        parsed = PTTTLParser().parse(ptttl_data)
+
+    return _render_chunks(parsed, amplitude, wavetype, filename)
+
+class _Stream(threading.Thread):
+    """
+    Feeds chunks of samples to a mixer channel's queue, so that playback can
+    start as soon as the first chunk is available
+    """
+    def __init__(self, channel, chunks):
+        super(_Stream, self).__init__()
+        self.daemon = True
+        self.channel = channel
+        self.chunks = chunks
+        self.stopped = threading.Event()
+
+        # Check the channel queue a few times per chunk, so the next chunk is
+        # always queued before the current chunk finishes playing
+        self.poll_secs = (float(CHUNK_SAMPLES) / SAMPLE_RATE) / 4.0
+
+    def run(self):
+        first = True
+
+        for chunk in self.chunks:
+            sound = mixer.Sound(buffer=chunk)
+
+            if first:
+                self.channel.play(sound)
+                first = False
+                continue
+
+            # A channel can only queue one sound, so wait for the queued
+            # chunk to start playing before queueing the next one
+            while self.channel.get_queue() is not None:
+                if self.stopped.wait(self.poll_secs):
+                    return
+
+            if self.stopped.is_set():
+                return
+
+            self.channel.queue(sound)
+
+    def stop(self):
+        self.stopped.set()
+
+def _read_sound_file(sound_id):
+    if sound_id not in ctrl.sound_files:
+        raise ValueError("No sound with ID '%s'" % sound_id)
+
+    with open(ctrl.sound_files[sound_id], 'r') as fh:
+        return fh.read()
+
 def load_file(filename, sound_id=None):
     """
-    Read a PTTTL file, convert to PCM samples and save for playback
+    Register a PTTTL file for playback. The file is read and converted to PCM
+    samples the first time the sound is played.
 
     :param str filename: filename for PTTTL file to read
     :param sound_id: key used to retrieve sound for playback (if None, filename\
@@ -39,17 +280,240 @@ def load_file(filename, sound_id=None):
     if sound_id is None:
         sound_id = filename
 
-    with open(filename, 'r') as fh:
-        ptttl_data = fh.read()
+    ctrl.sound_files[sound_id] = filename
+    ctrl.sounds.pop(sound_id, None)
+
+class _SoundQueue(object):
+    """
+    Bounded priority queue of sounds waiting to be played
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.heap = []
+        self.count = 0
+        self.active = 0
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def put(self, priority, sound_id):
+        """
+        Add a sound to the queue, without blocking. If the queue is full, the
+        sound is dropped, unless it has a higher priority than a queued sound,
+        in which case the queued sound with the lowest priority is dropped.
+
+        :param int priority: sound priority
+        :param sound_id: key for sound to play
+        :return: True if the sound was queued
+        :rtype: bool
+        """
+        with self.cond:
+            if self.closed:
+                return False
 
-    rawdata = ptttl_to_sample_data(ptttl_data)
-    ctrl.sounds[sound_id] = mixer.Sound(buffer=rawdata)
+            # Count is included so sounds with the same priority are played
+            # in the order they were queued
+            item = (priority, self.count, sound_id)
+            self.count += 1
+
+            if len(self.heap) >= self.maxsize:
+                lowest = max(self.heap)
+                if lowest[0] <= priority:
+                    return False
+
+                self.heap.remove(lowest)
+                heapq.heapify(self.heap)
+
+            heapq.heappush(self.heap, item)
+            self.cond.notify_all()
+            return True
+
+    def get(self):
+        """
+        Wait for a sound to be added to the queue, and remove it. done() must
+        be called when the sound has been handled.
+
+        :return: tuple of the form ``(priority, count, sound_id)``, or None\
+            if the queue was closed
+        """
+        with self.cond:
+            while (not self.heap) and (not self.closed):
+                self.cond.wait()
+
+            if self.closed:
+                return None
+
+            self.active += 1
+            return heapq.heappop(self.heap)
+
+    def done(self):
+        with self.cond:
+            self.active -= 1
+            self.cond.notify_all()
+
+    def wait(self, timeout):
+        """
+        Wait until a sound is queued, the queue is closed, or the timeout
+        expires
+
+        :param float timeout: max. time to wait in seconds
+        """
+        with self.cond:
+            if not self.closed:
+                self.cond.wait(timeout)
+
+    def join(self, timeout=None):
+        """
+        Wait until all queued sounds have been handled
+
+        :param float timeout: max. time to wait in seconds (if None, wait\
+            forever)
+        :return: True if all queued sounds were handled
+        :rtype: bool
+        """
+        deadline = None if timeout is None else time.time() + timeout
+
+        with self.cond:
+            while (self.heap or self.active) and (not self.closed):
+                if deadline is None:
+                    self.cond.wait()
+                    continue
+
+                remaining = deadline - time.time()
+                if remaining <= 0.0:
+                    return False
+
+                self.cond.wait(remaining)
+
+            return True
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+class _AudioWorker(threading.Thread):
+    """
+    Plays queued sounds on a fixed number of mixer channels. Sounds are loaded
+    (and synthesized, if needed) in this thread, so the game loop never waits
+    for audio.
+    """
+    def __init__(self):
+        super(_AudioWorker, self).__init__()
+        self.daemon = True
+        self.queue = _SoundQueue(QUEUE_SIZE)
+
+        # Time at which the sound playing on each channel should end
+        self.channel_ends = [0.0] * MIXER_CHANNELS
+        self.streams = [None] * MIXER_CHANNELS
+
+    def _channel_busy(self, i):
+        stream = self.streams[i]
+        if (stream is not None) and stream.is_alive():
+            return True
+
+        return mixer.Channel(i).get_busy()
+
+    def _free_channel(self):
+        for i in range(MIXER_CHANNELS):
+            if not self._channel_busy(i):
+                return i
+
+        return None
+
+    def _wait_for_channel(self):
+        # Sleep until the first channel is due to finish playing, instead of
+        # polling the channels
+        while not self.queue.closed:
+            i = self._free_channel()
+            if i is not None:
+                return i
+
+            timeout = min(self.channel_ends) - time.time()
+            self.queue.wait(max(timeout, 0.01))
+
+        return None
+
+    def _play(self, channel_index, sound_id):
+        channel = mixer.Channel(channel_index)
+
+        if sound_id in ctrl.sounds:
+            sound = ctrl.sounds[sound_id]
+            self.channel_ends[channel_index] = time.time() + sound.get_length()
+            channel.play(sound)
+            return
+
+        ptttl_data = _read_sound_file(sound_id)
+        parsed = PTTTLParser().parse(ptttl_data)
+        secs = duration_secs(parsed)
+
+        if secs < STREAM_MIN_SECS:
+            sound = mixer.Sound(buffer=get_sample_data(ptttl_data))
+            ctrl.sounds[sound_id] = sound
+        else:
+            sound = None
+
+        if self.queue.closed:
+            return
+
+        self.channel_ends[channel_index] = time.time() + secs
+        if sound is None:
+            stream = _Stream(channel, get_sample_chunks(ptttl_data, parsed))
+            self.streams[channel_index] = stream
+            stream.start()
+        else:
+            channel.play(sound)
+
+    def run(self):
+        while True:
+            i = self._wait_for_channel()
+            if i is None:
+                break
+
+            item = self.queue.get()
+            if item is None:
+                break
+
+            try:
+                self._play(i, item[2])
+            except Exception:
+                # Audio problems should never stop the game
+                pass
+            finally:
+                self.queue.done()
+
+        self._shutdown()
+
+    def _shutdown(self):
+        for stream in self.streams:
+            if stream is not None:
+                stream.stop()
+
+        for stream in self.streams:
+            if stream is not None:
+                stream.join()
+
+        mixer.stop()
+        mixer.quit()
+        ctrl.sounds.clear()
+
+    def stop(self):
+        """
+        Stop playing sounds and shut down the mixer, without waiting
+        """
+        self.queue.close()
+
+def _import_mixer():
+    global mixer
+
+    if mixer is None:
+        from pygame import mixer as pygame_mixer
+        mixer = pygame_mixer
 
 def init(frequency=FREQ, samplewidth=SAMPLESIZE, numchannels=CHANNELS,
         buffersize=BUFSIZE):
     """
-    Initialize game audio and load PTTTL files for default sounds (called
-    automatically by text_game_maker.builder.map_builder.MapBuilder.run_game)
+    Initialize game audio and register PTTTL files for default sounds. Does
+    nothing in headless mode (see text_game_maker.utils.utils.set_headless).
 
     :param int frequency: frequency in HZ
     :param int samplewidth: sample size in bits
@@ -57,11 +521,23 @@ def init(frequency=FREQ, samplewidth=SAMPLESIZE, numchannels=CHANNELS,
     :param int buffersize: size in bytes of the buffer to be used for playing\
         audio samples
     """
-    if mixer.get_init() is not None:
+    if (ctrl.worker is not None) or utils.is_headless():
         return
 
+    _import_mixer()
+
+    if ctrl.stopping is not None:
+        # Audio was disabled, make sure the worker thread has finished
+        # shutting down the mixer
+        ctrl.stopping.join()
+        ctrl.stopping = None
+
     mixer.pre_init(frequency, samplewidth, numchannels, buffersize)
     mixer.init()
+    mixer.set_num_channels(MIXER_CHANNELS)
+
+    ctrl.worker = _AudioWorker()
+    ctrl.worker.start()
 
     if not ctrl.files_loaded:
         load_file(SUCCESS_SOUND)
@@ -73,41 +549,68 @@ def init(frequency=FREQ, samplewidth=SAMPLESIZE, numchannels=CHANNELS,
         load_file(ALLSTAR_SOUND)
         ctrl.files_loaded = True
 
-def wait():
+def wait(timeout=None):
     """
-    Wait until currently playing sound is finished playing (if any)
+    Wait until all queued sounds have started playing, and all playing sounds
+    are finished (if any)
+
+    :param float timeout: max. time to wait in seconds (if None, wait\
+        until all sounds are finished)
+    :return: True if all sounds are finished
+    :rtype: bool
     """
-    if ctrl.last_played is None:
-        return
+    worker = ctrl.worker
+    if worker is None:
+        return True
+
+    deadline = None if timeout is None else time.time() + timeout
 
-    while ctrl.last_played.get_busy():
-        time.sleep(0.01)
+    if not worker.queue.join(timeout):
+        return False
+
+    # Sleep until the last sound is due to finish, then check again
+    while any(worker._channel_busy(i) for i in range(MIXER_CHANNELS)):
+        remaining = max(worker.channel_ends) - time.time()
+        if deadline is not None:
+            remaining = min(remaining, deadline - time.time())
+            if remaining <= 0.0:
+                return False
+
+        time.sleep(max(remaining, 0.01))
+
+    return True
 
 def quit():
     """
-    Disable audio after it has been initialized
+    Disable audio after it has been initialized. Playing sounds are stopped,
+    and this function returns without waiting for the mixer to shut down.
     """
-    wait()
-
-    if mixer.get_init() is None:
+    if ctrl.worker is None:
         return
 
-    ctrl.last_played = None
-    mixer.quit()
+    ctrl.worker.stop()
+    ctrl.stopping = ctrl.worker
+    ctrl.worker = None
 
-def play_sound(sound_id):
+def play_sound(sound_id, priority=PRIORITY_NORMAL):
     """
-    Play a loaded sound
+    Play a loaded sound, without waiting for it to be loaded or played. Up to
+    MIXER_CHANNELS sounds can play at the same time; if all channels are busy,
+    the sound is queued until a channel is free. Long sounds are streamed;
+    playback starts as soon as the first chunk of samples is available, and
+    the full sound is never held in memory.
 
     :param sound_id: key for sound to play
+    :param int priority: sound priority, PRIORITY_HIGH, PRIORITY_NORMAL or\
+        PRIORITY_LOW
+    :return: True if the sound was queued, False if audio is disabled or too\
+        many sounds are already queued
+    :rtype: bool
     """
-    if mixer.get_init() is None:
-        return
-
-    if (not ctrl.last_played is None) and ctrl.last_played.get_busy():
-        return
+    if ctrl.worker is None:
+        return False
 
-    if sound_id not in ctrl.sounds:
+    if sound_id not in ctrl.sound_files:
         raise ValueError("No sound with ID '%s'" % sound_id)
 
-    ctrl.last_played = mixer.Sound.play(ctrl.sounds[sound_id])
+    return ctrl.worker.queue.put(priority, sound_id)
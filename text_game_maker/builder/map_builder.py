@@ -5,7 +5,6 @@ import sys
 import os
 import json
 import zlib
-import pdb
 import errno
 
 from text_game_maker.tile.tile import (Tile, LockedDoor, reverse_direction,
@@ -16,9 +15,10 @@ from text_game_maker.game_objects.items import Item
 from text_game_maker.player import player
 from text_game_maker.tile import tile
 from text_game_maker.audio import audio
+from text_game_maker.event import event_bus
 from text_game_maker.crafting import crafting
 from text_game_maker.messages import messages
-from text_game_maker.utils import utils
+from text_game_maker.utils import utils, instrumentation
 
 MIN_LINE_WIDTH = 50
 MAX_LINE_WIDTH = 120
@@ -132,6 +132,20 @@ def _do_craft(player, word, item):
 
     return True
 
+def _do_show_craftable(player, word, remaining):
+    if not crafting.craftables:
+        utils.game_print("You don't know how to craft anything yet.")
+        return
+
+    items = crafting.craftable_by_player(player)
+    if not items:
+        utils.game_print("You don't have the items needed to craft "
+            "anything.")
+        return
+
+    utils.game_print("You can craft %s."
+        % utils.list_to_english([str(x) for x in items]))
+
 def _get_next_unused_save_id(save_dir):
     default_num = 1
     nums = []
@@ -303,6 +317,10 @@ def _do_set_audio(player, word, setting):
 
     setting = setting.lower()
     if setting == 'on':
+        if utils.is_headless():
+            utils._wrap_print("Can't enable %s in headless mode." % word)
+            return
+
         audio.init()
     elif setting == 'off':
         audio.quit()
@@ -383,11 +401,13 @@ class MapBuilder(object):
     Base class for building a tile-based map
     """
 
-    def __init__(self, parser):
+    def __init__(self, parser, seed=None):
         """
         Initialises a MapBuilder instance.
 
         :param text_game_maker.parser.parser.CommandParser: command parser
+        :param int seed: seed for all random choices made during this game\
+            session. If None, a seed is generated from the current time.
         """
 
         if info['instance']:
@@ -401,7 +421,17 @@ class MapBuilder(object):
         self.parser = parser
         self.start = None
         self.current = None
-        random.seed(time.time())
+
+        if seed is None:
+            seed = int(time.time() * 1000000)
+
+        # Seed both the engine's RNG and the global RNG, so that maps which
+        # use the random module while being built are also reproducible
+        self.seed = seed
+        self.rng = random.Random(seed)
+        random.seed(seed)
+        utils.set_rng(self.rng)
+
         self.player = player.Player()
 
     def load_map_data_from_string(self, map_data):
@@ -425,7 +455,7 @@ class MapBuilder(object):
             strdata = fh.read()
 
         decompressed = zlib.decompress(strdata).decode("utf-8")
-        load_map_data_from_string(decompressed)
+        self.load_map_data_from_string(decompressed)
 
     def set_current_tile(self, tile_id):
         """
@@ -456,6 +486,9 @@ class MapBuilder(object):
     def _parse_command(self, player, action):
         if info['debug_next']:
             info['debug_next'] = False
+
+            # pdb is slow to import, and is almost never needed
+            import pdb
             pdb.set_trace()
 
         if action == '':
@@ -472,7 +505,9 @@ class MapBuilder(object):
 
             word = action
         else:
-            i, cmd = utils.run_parser(self.parser, action)
+            with instrumentation.stage(instrumentation.STAGE_RUN_PARSER):
+                i, cmd = utils.run_parser(self.parser, action)
+
             if not cmd:
                 utils.save_sound(audio.ERROR_SOUND)
                 return
@@ -480,7 +515,9 @@ class MapBuilder(object):
             word = action[:i].strip()
             remaining = action[i:].strip()
 
-            ret = cmd.callback(player, word, remaining)
+            with instrumentation.stage(instrumentation.STAGE_COMMAND_CALLBACK):
+                ret = cmd.callback(player, word, remaining)
+
             if not ret:
                 utils.save_sound(audio.FAILURE_SOUND)
                 return
@@ -489,9 +526,14 @@ class MapBuilder(object):
         utils.set_last_command(action)
 
         if cmd is not None:
-            cmd.event.generate(player, word, remaining)
+            with instrumentation.stage(instrumentation.STAGE_COMMAND_EVENT):
+                cmd.event.generate(player, word, remaining)
 
-        player.scheduler_tick()
+        with instrumentation.stage(instrumentation.STAGE_SCHEDULER_TICK):
+            player.scheduler_tick()
+
+        with instrumentation.stage(instrumentation.STAGE_DEFERRED_EVENTS):
+            event_bus.get_event_bus().flush()
 
     def set_on_game_run(self, callback):
         """
@@ -923,16 +965,6 @@ class MapBuilder(object):
 
         utils.set_sequence_count(None)
 
-    def _do_scheduled_tasks(self, player):
-        for task_id in player.scheduled_tasks:
-            callback, turns, start = player.scheduled_tasks[task_id]
-            if player.turns >= (start + turns):
-                if callback(player):
-                    new = (callback, turns, player.turns)
-                    player.scheduled_tasks[task_id] = new
-                else:
-                    del player.scheduled_tasks[task_id]
-
     def _do_init(self):
         add_format_tokens()
 
@@ -996,6 +1028,29 @@ class MapBuilder(object):
             self.reset_state_data = self.player.save_to_string()
             utils.game_print(self.player.describe_current_tile())
 
+    def _run_turn(self, raw):
+        with instrumentation.stage(instrumentation.STAGE_NORMALIZE_INPUT):
+            action = ' '.join(raw.split())
+
+        with instrumentation.stage(instrumentation.STAGE_BADWORD_CHECK):
+            badword = _has_badword(action)
+
+        if badword:
+            utils.game_print(messages.badword_message())
+            return
+
+        delim = self._get_command_delimiter(action)
+        if delim:
+            sequence = action.lstrip(delim).split(delim)
+            self._run_command_sequence(self.player, sequence)
+        else:
+            self._parse_command(self.player, action.strip().lower())
+
+        sound = utils.last_saved_sound()
+        if sound:
+            with instrumentation.stage(instrumentation.STAGE_PLAY_SOUND):
+                audio.play_sound(sound)
+
     def run_game(self):
         """
         Start running the game
@@ -1004,6 +1059,9 @@ class MapBuilder(object):
         if not self._do_init():
             return
 
+        if instrumentation.is_enabled():
+            instrumentation.new_session()
+
         while True:
             while True:
                 self._check_flags()
@@ -1013,19 +1071,5 @@ class MapBuilder(object):
                 if isinstance(raw, StopWaitingForInput):
                     return
 
-                action = ' '.join(raw.split())
-
-                if _has_badword(action):
-                    utils.game_print(messages.badword_message())
-                    continue
-
-                delim = self._get_command_delimiter(action)
-                if delim:
-                    sequence = action.lstrip(delim).split(delim)
-                    self._run_command_sequence(self.player, sequence)
-                else:
-                    self._parse_command(self.player, action.strip().lower())
-
-                sound = utils.last_saved_sound()
-                if sound:
-                    audio.play_sound(sound)
+                with instrumentation.stage(instrumentation.STAGE_TURN):
+                    self._run_turn(raw)
@@ -0,0 +1,220 @@
+import os
+import json
+import zlib
+
+import text_game_maker
+from text_game_maker.game_objects import __object_model_version__
+from text_game_maker.event import event_bus
+from text_game_maker.player import player
+from text_game_maker.utils import utils
+
+BUNDLE_SUFFIX = '.tgmbundle'
+BUNDLE_FORMAT_VERSION = 1
+
+TEMP_SUFFIX = '.tmp'
+
+# utils.info keys that a map can change while it is being built, or that
+# commands can change during a game session
+UTILS_STATE_KEYS = ['slow_printing', 'chardelay', 'last_command',
+    'sequence_count', 'sound']
+
+class MapBundleError(Exception):
+    pass
+
+def _serialize_handlers(handlers):
+    return [[utils.serialize_callback(cb), priority]
+        for cb, priority in handlers]
+
+def _deserialize_handlers(handlers):
+    return [(utils.deserialize_callback(name), priority)
+        for name, priority in handlers]
+
+def _replace_file(src, dest):
+    if hasattr(os, 'replace'):
+        os.replace(src, dest)
+        return
+
+    if os.path.exists(dest):
+        os.remove(dest)
+
+    os.rename(src, dest)
+
+def get_bundle_filename(source_filename):
+    """
+    Get the name of the bundle file that is loaded in place of a map file
+
+    :param str source_filename: file containing a MapRunner class
+    :return: bundle file name
+    :rtype: str
+    """
+    return os.path.splitext(source_filename)[0] + BUNDLE_SUFFIX
+
+def bundle_is_current(bundle_filename, source_filename):
+    """
+    Check whether a bundle file exists and is newer than the map file it was
+    compiled from
+
+    :param str bundle_filename: bundle file
+    :param str source_filename: file containing a MapRunner class
+    :return: True if bundle file can be loaded in place of the map file
+    :rtype: bool
+    """
+    if not os.path.isfile(bundle_filename):
+        return False
+
+    try:
+        source_mtime = os.path.getmtime(source_filename)
+    except OSError:
+        return False
+
+    return os.path.getmtime(bundle_filename) >= source_mtime
+
+def bundle_to_string(builder):
+    """
+    Serialize a map that has been built but not run, including the player,
+    all tiles and craftables, and all registered event handlers
+
+    :param text_game_maker.builder.map_builder.MapBuilder builder: built map
+    :return: compressed bundle data
+    :rtype: bytes
+    """
+    builder.player.start = builder.start
+    builder.player.current = builder.start
+
+    on_game_run = None
+    command_handlers = {}
+    bus = event_bus.get_event_bus().snapshot()
+
+    try:
+        if builder.on_game_run:
+            on_game_run = utils.serialize_callback(builder.on_game_run)
+
+        for cmd in builder.parser.get_commands():
+            handlers = cmd.event.get_handlers()
+            if handlers:
+                command_handlers[cmd.word_list[0]] = _serialize_handlers(
+                    handlers)
+
+        data = {
+            'format_version': BUNDLE_FORMAT_VERSION,
+            'engine_version': text_game_maker.__version__,
+            'object_model_version': __object_model_version__,
+            'player': builder.player.get_attrs(),
+            'new_game_handlers': _serialize_handlers(
+                builder.player.new_game_event.get_handlers()),
+            'on_game_run': on_game_run,
+            'command_handlers': command_handlers,
+            'event_bus': {name: [bus[name][0], _serialize_handlers(
+                bus[name][1])] for name in bus},
+            'utils_state': {k: utils.info[k] for k in UTILS_STATE_KEYS},
+            'wrap_width': utils.wrapper.width
+        }
+    except RuntimeError as e:
+        raise MapBundleError(str(e))
+
+    return zlib.compress(json.dumps(data).encode('utf-8'))
+
+def save_bundle(builder, filename):
+    """
+    Serialize a map that has been built but not run, and write it to a bundle
+    file
+
+    :param text_game_maker.builder.map_builder.MapBuilder builder: built map
+    :param str filename: name of bundle file to write
+    """
+    strdata = bundle_to_string(builder)
+    tempname = filename + TEMP_SUFFIX
+
+    with open(tempname, 'wb') as fh:
+        fh.write(strdata)
+
+    _replace_file(tempname, filename)
+
+def bundle_from_string(strdata):
+    """
+    Decode bundle data, and check that it was compiled by the same engine and
+    object model version
+
+    :param bytes strdata: compressed bundle data
+    :return: decoded bundle
+    :rtype: dict
+    """
+    try:
+        data = json.loads(zlib.decompress(strdata).decode('utf-8'))
+    except (zlib.error, ValueError) as e:
+        raise MapBundleError("invalid bundle data (%s)" % e)
+
+    checks = [
+        ('format_version', BUNDLE_FORMAT_VERSION),
+        ('engine_version', text_game_maker.__version__),
+        ('object_model_version', __object_model_version__)
+    ]
+
+    for key, expected in checks:
+        if data.get(key) != expected:
+            raise MapBundleError("bundle has %s %s, expected %s"
+                % (key.replace('_', ' '), data.get(key), expected))
+
+    return data
+
+def read_bundle(filename):
+    """
+    Read and decode a bundle file
+
+    :param str filename: name of bundle file to read
+    :return: decoded bundle
+    :rtype: dict
+    """
+    with open(filename, 'rb') as fh:
+        return bundle_from_string(fh.read())
+
+def load_bundle(builder, data):
+    """
+    Restore a decoded bundle onto a new map builder, in place of building the
+    map. All serializable callbacks used by the map must already be
+    registered, i.e. the file containing the map must have been imported
+    under the same module name as when the bundle was compiled. Raises
+    MapBundleError if the bundle cannot be restored, in which case tiles and
+    craftables may have been partly replaced by those in the bundle.
+
+    :param text_game_maker.builder.map_builder.MapBuilder builder: new map\
+        builder instance, with the parser already built
+    :param dict data: decoded bundle, as returned by read_bundle
+    """
+    try:
+        new_game_handlers = _deserialize_handlers(data['new_game_handlers'])
+        on_game_run = None
+        if data['on_game_run'] is not None:
+            on_game_run = utils.deserialize_callback(data['on_game_run'])
+
+        command_handlers = []
+        for word, handlers in data['command_handlers'].items():
+            i, cmd = builder.parser.run(word)
+            if (cmd is None) or (i != len(word)):
+                raise MapBundleError("bundle has handlers for unknown "
+                    "command '%s'" % word)
+
+            command_handlers.append((cmd, _deserialize_handlers(handlers)))
+
+        bus = {}
+        for name, (arg_names, handlers) in data['event_bus'].items():
+            if arg_names is not None:
+                arg_names = tuple(arg_names)
+
+            bus[name] = (arg_names, _deserialize_handlers(handlers))
+
+        # Loading the player also restores all tiles and craftables
+        builder.player = player.load_from_dict(data['player'])
+    except RuntimeError as e:
+        raise MapBundleError(str(e))
+
+    builder.player.new_game_event.set_handlers(new_game_handlers)
+    builder.start = builder.player.start
+    builder.on_game_run = on_game_run
+
+    for cmd, handlers in command_handlers:
+        cmd.event.set_handlers(handlers)
+
+    event_bus.get_event_bus().restore(bus)
+    utils.info.update(data['utils_state'])
+    utils.wrapper.width = data['wrap_width']
@@ -1,4 +1,241 @@
 import re
+import os
+import sys
+import json
+import atexit
+import hashlib
+import weakref
+import tempfile
+
+from text_game_maker.utils import utils
+
+# Incremented whenever any ReDict is created or modified
+_generation = 0
+
+def _next_version():
+    global _generation
+    _generation += 1
+    return _generation
+
+def get_generation():
+    """
+    Get a number that changes whenever any ReDict is created or modified
+
+    :return: current generation
+    :rtype: int
+    """
+    return _generation
+
+# Compiled regexs shared between all ReDict instances, keyed by the list of
+# patterns and the flags they were compiled from. Entries are removed when no
+# ReDict is using them any more.
+_compiled_blocks = weakref.WeakValueDictionary()
+
+class _CompiledBlock(object):
+    __slots__ = ['regexs', '__weakref__']
+
+    def __init__(self, regexs):
+        self.regexs = regexs
+
+METADATA_CACHE_VERSION = 1
+METADATA_CACHE_FILENAME = 'redict_metadata.json'
+
+# Max. number of blocks to keep metadata for in the cache file
+METADATA_CACHE_MAX_BLOCKS = 10000
+
+class _MetadataCache(object):
+    def __init__(self):
+        self.enabled = True
+        self.filename = None
+        self.blocks = None
+        self.dirty = False
+
+# Metadata for compiled pattern blocks (how each block is split into regexs,
+# and the number of subgroups in each pattern), keyed by a hash of the block.
+# Persisted between sessions, so blocks only need to be split once.
+_metadata = _MetadataCache()
+
+def _metadata_filename():
+    # Returns None, and disables the cache, if the cache directory cannot be
+    # created
+    if _metadata.filename is None:
+        try:
+            dirname = utils.get_cache_dir()
+        except (IOError, OSError):
+            _metadata.enabled = False
+            return None
+
+        _metadata.filename = os.path.join(dirname, METADATA_CACHE_FILENAME)
+
+    return _metadata.filename
+
+def _read_metadata_file():
+    filename = _metadata_filename()
+    if filename is None:
+        return {}
+
+    try:
+        with open(filename, 'r') as fh:
+            data = json.load(fh)
+    except (IOError, OSError, ValueError):
+        return {}
+
+    if (not isinstance(data, dict) or
+            (data.get('version') != METADATA_CACHE_VERSION)):
+        return {}
+
+    blocks = data.get('blocks')
+    if not isinstance(blocks, dict):
+        return {}
+
+    return blocks
+
+def _is_count(value, minimum):
+    return (isinstance(value, int) and (not isinstance(value, bool)) and
+        (value >= minimum))
+
+def _valid_metadata(block, metadata):
+    # Entries are read from a file that may have been modified, so check
+    # that an entry could describe this block before using it
+    try:
+        slices = metadata['slices']
+        groups = metadata['groups']
+        if (not isinstance(slices, list)) or (not isinstance(groups, list)):
+            return False
+
+        if (len(groups) != len(block)) or (sum(slices) != len(block)):
+            return False
+
+        if not all(_is_count(size, 0) for size in slices):
+            return False
+
+        for entry, count in zip(block, groups):
+            # Each subgroup needs an opening parenthesis, and every entry has
+            # one extra for its named group
+            if (not _is_count(count, 0)) or (count >= entry.count('(')):
+                return False
+    except (TypeError, KeyError, ValueError):
+        return False
+
+    return True
+
+def _load_metadata():
+    if _metadata.blocks is None:
+        _metadata.blocks = _read_metadata_file() if _metadata.enabled else {}
+
+def _get_metadata(key, block):
+    # Returns None if there is no valid entry for the block
+    _load_metadata()
+    metadata = _metadata.blocks.get(key)
+    if (metadata is None) or (not _valid_metadata(block, metadata)):
+        return None
+
+    return metadata
+
+def _set_metadata(key, metadata):
+    _load_metadata()
+    _metadata.blocks[key] = metadata
+    _metadata.dirty = True
+
+def _metadata_key(block, flags):
+    # Python versions may differ in how many groups a regex can have, so
+    # include the version in the key
+    sha = hashlib.sha1()
+    sha.update(("%d|%d.%d|" % ((flags,) + tuple(sys.version_info[:2])))
+        .encode('utf-8'))
+    sha.update('\0'.join(block).encode('utf-8'))
+    return sha.hexdigest()
+
+def _block_metadata(block, regexs):
+    names = [entry[4:entry.index('>')] for entry in block]
+    nameset = set(names)
+    slices = []
+    groups = {}
+
+    for compiled in regexs:
+        outer = sorted((index, name) for name, index in
+            compiled.groupindex.items() if name in nameset)
+
+        slices.append(len(outer))
+        for i in range(len(outer)):
+            index, name = outer[i]
+            if (i + 1) < len(outer):
+                end = outer[i + 1][0]
+            else:
+                end = compiled.groups + 1
+
+            groups[name] = end - index - 1
+
+    return {'slices': slices, 'groups': [groups[name] for name in names]}
+
+def save_metadata_cache():
+    """
+    Write metadata for all pattern blocks compiled so far to the metadata
+    cache file, so that later sessions can compile the same patterns without
+    searching for a way to split them into regexs. Called automatically
+    when the process exits.
+    """
+    if (not _metadata.enabled) or (not _metadata.dirty):
+        return
+
+    filename = _metadata_filename()
+    if filename is None:
+        return
+
+    # Keep entries written by other sessions since the file was read
+    blocks = _read_metadata_file()
+    blocks.update(_metadata.blocks)
+    keys = list(blocks.keys())[-METADATA_CACHE_MAX_BLOCKS:]
+    data = {
+        'version': METADATA_CACHE_VERSION,
+        'blocks': {key: blocks[key] for key in keys}
+    }
+
+    try:
+        fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(filename))
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(data, fh)
+
+        if hasattr(os, 'replace'):
+            os.replace(tmpname, filename)
+        else:
+            if os.path.exists(filename):
+                os.remove(filename)
+
+            os.rename(tmpname, filename)
+    except (IOError, OSError):
+        # Cache is not writable, just split the blocks again next time
+        return
+
+    _metadata.dirty = False
+
+def set_metadata_cache_file(filename):
+    """
+    Set the file used to store compiled pattern metadata between sessions.
+    By default, ``redict_metadata.json`` in the directory returned by
+    text_game_maker.utils.utils.get_cache_dir is used.
+
+    :param str filename: metadata cache file name. If None, metadata is not\
+        read from or written to any file.
+    """
+    save_metadata_cache()
+
+    _metadata.enabled = filename is not None
+    _metadata.filename = filename
+    _metadata.blocks = None
+    _metadata.dirty = False
+
+atexit.register(save_metadata_cache)
+
+def compiled_block_count():
+    """
+    Get the number of distinct compiled pattern blocks currently shared between
+    ReDict instances
+
+    :return: number of compiled pattern blocks
+    :rtype: int
+    """
+    return len(_compiled_blocks)
 
 class ReDict(dict):
     """
@@ -35,6 +272,13 @@ class ReDict(dict):
         self.patterns = {}
         self.subgroups = None
 
+        # Compiled blocks used by this dict, from the shared cache
+        self._blocks = []
+
+        # Changes whenever patterns are added or removed, so that anything
+        # built from the contents of this dict can tell when to rebuild
+        self.version = _next_version()
+
     def groups(self):
         """
         Return tuple of all subgroups from the last regex match performed
@@ -45,7 +289,43 @@ class ReDict(dict):
         """
         return self.subgroups
 
+    def _compile_slices(self, block, slices):
+        if sum(slices) != len(block):
+            return None
+
+        ret = []
+        start = 0
+
+        for size in slices:
+            try:
+                ret.append(re.compile('|'.join(block[start:start + size]),
+                    flags=self.flags))
+            except AssertionError:
+                return None
+
+            start += size
+
+        return ret
+
     def _block_to_regexs(self, block):
+        key = _metadata_key(block, self.flags)
+        metadata = _get_metadata(key, block)
+
+        if metadata is not None:
+            ret = self._compile_slices(block, metadata['slices'])
+            if ret is not None:
+                # Replace the entry if the subgroup counts were wrong
+                actual = _block_metadata(block, ret)
+                if actual != metadata:
+                    _set_metadata(key, actual)
+
+                return ret
+
+        ret = self._split_block(block)
+        _set_metadata(key, _block_metadata(block, ret))
+        return ret
+
+    def _split_block(self, block):
         total_len = len(block)
         override_slice = None
         num_regexs = 1
@@ -84,27 +364,76 @@ class ReDict(dict):
 
         return ret
 
-    def compile(self):
-        """
-        Compile all regular expressions in the dictionary
-        """
-        i = 0
-        ret = []
+    def _compile_block(self, block):
+        key = (tuple(block), self.flags)
+        compiled = _compiled_blocks.get(key)
+
+        if compiled is None:
+            compiled = _CompiledBlock(self._block_to_regexs(block))
+            _compiled_blocks[key] = compiled
+
+        self._blocks.append(compiled)
+        return compiled.regexs
+
+    def _iter_blocks(self):
         block = []
-        self.compiled = []
 
         for groupname in self.patterns:
             pattern, _ = self.patterns[groupname]
             block.append('(?P<%s>^%s$)' % (groupname, pattern))
-            i += 1
 
-            if i == self.groups_per_regex:
-                self.compiled.extend(self._block_to_regexs(block))
-                i = 0
+            if len(block) == self.groups_per_regex:
+                yield block
                 block = []
 
         if block:
-            self.compiled.extend(self._block_to_regexs(block))
+            yield block
+
+    def compile(self):
+        """
+        Compile all regular expressions in the dictionary
+        """
+        self.compiled = []
+        self._blocks = []
+
+        for block in self._iter_blocks():
+            self.compiled.extend(self._compile_block(block))
+
+    def subgroup_counts(self):
+        """
+        Get the number of subgroups in each pattern, and the number of
+        subgroups returned by ``groups`` when each pattern is matched. Uses
+        cached metadata if the patterns have been compiled before (in this
+        session or an earlier one), otherwise the patterns are compiled.
+
+        :return: dict mapping the names used as keys in ``patterns`` to\
+            tuples of the form ``(pattern_subgroups, returned_subgroups)``
+        :rtype: dict
+        """
+        ret = {}
+
+        for block in self._iter_blocks():
+            key = _metadata_key(block, self.flags)
+            metadata = _get_metadata(key, block)
+            if metadata is None:
+                metadata = _block_metadata(block, self._compile_block(block))
+                _set_metadata(key, metadata)
+
+            names = [entry[4:entry.index('>')] for entry in block]
+            groups = metadata['groups']
+            start = 0
+
+            for size in metadata['slices']:
+                # Groups from all later patterns in the same regex are also
+                # returned when a pattern matches
+                later = 0
+                for i in reversed(range(start, start + size)):
+                    ret[names[i]] = (groups[i], groups[i] + later)
+                    later += groups[i] + 1
+
+                start += size
+
+        return ret
 
     def dump_to_dict(self):
         """
@@ -130,6 +459,7 @@ class ReDict(dict):
         self.groupid = 1
         self.compiled = None
         self.patterns = {}
+        self.version = _next_version()
 
         for pattern in data:
             self.__setitem__(pattern, data[pattern])
@@ -160,6 +490,7 @@ class ReDict(dict):
 
         self.patterns["g%d" % self.groupid] = (pattern, value)
         self.groupid += 1
+        self.version = _next_version()
 
         if self.compiled is not None:
             self.compiled = None
@@ -188,6 +519,7 @@ class ReDict(dict):
         m = self._do_match(text)
         ret = self.patterns[m.lastgroup][1]
         del self.patterns[m.lastgroup]
+        self.version = _next_version()
 
         if self.compiled is not None:
             self.compiled = None
@@ -246,6 +578,7 @@ class ReDict(dict):
         self.groupid = 1
         self.compiled = None
         self.patterns.clear()
+        self.version = _next_version()
 
     def copy(self):
         """
@@ -1,5 +1,13 @@
+import re
+
+from text_game_maker.chatbot_utils import redict
 from text_game_maker.chatbot_utils.redict import ReDict
 
+# Where a pattern in a merged matcher came from
+_CONTEXT_RESPONSE = 0  # Response or entry pattern of the current context
+_RESPONSE = 1          # Contextless response pattern
+_CONTEXT_ENTRY = 2     # Entry pattern of a context that can be entered
+
 class NoResponse(object):
     pass
 
@@ -27,6 +35,41 @@ def _check_pattern_response_pair(pair):
 
     return regex, response
 
+def _merge_redicts(sources):
+    # Build one ReDict containing all patterns from a list of (tag, ReDict)
+    # tuples, in the order they should be checked. Values are tuples of the
+    # form (tag, value, subgroups in pattern, subgroups returned by source).
+    # Returns None if the patterns cannot be merged.
+    sources = [(tag, d) for tag, d in sources if d]
+    flags = set([d.flags for _, d in sources])
+    if len(flags) > 1:
+        return None
+
+    merged = ReDict()
+    if flags:
+        merged.flags = flags.pop()
+
+    try:
+        for tag, responsedict in sources:
+            counts = responsedict.subgroup_counts()
+            for groupname in responsedict.patterns:
+                pattern, value = responsedict.patterns[groupname]
+                merged[pattern] = (tag, value) + counts[groupname]
+
+        merged.compile()
+    except (AssertionError, re.error):
+        # Patterns that compile separately may not compile together, e.g. if
+        # two patterns use the same group name
+        return None
+
+    # Counts for the source ReDicts may come from cached metadata, but counts
+    # for the merged ReDict were checked when it was compiled
+    for groupname, counts in merged.subgroup_counts().items():
+        if counts[0] != merged.patterns[groupname][1][2]:
+            return None
+
+    return merged
+
 def _attempt_context_entry(contexts, text):
     for context in contexts:
         response, groups = _check_get_response(context.entry, text)
@@ -259,20 +302,133 @@ class Responder(object):
         self.context = None
         self.contexts = []
 
+        # If True, get_response checks all patterns that can match in the
+        # current context with one merged matcher
+        self.merged = False
+        self._matchers = {}
+        self._segments = {}
+
     def compile(self):
         """
         Compile all regular expressions contained in this responder (including
-        contexts), so they are ready for matching immediately
-        """
-        if self.responses:
-            self.responses.compile()
+        contexts), so they are ready for matching immediately. After this is
+        called, all patterns that can match in the current context (responses
+        and entry phrases for the current context, entry phrases for contexts
+        that can be entered, and contextless responses) are merged into a
+        single matcher, so that input text can be checked against all of them
+        in one pass. Responses are found in the same order as before.
+        Patterns added after this is called are merged automatically.
+        """
+        self.merged = True
+        self._matchers = {}
+        self._segments = {}
+
+        merged = self._get_matcher(None) is not None
+        for context in self.contexts:
+            if self._get_matcher(context) is None:
+                merged = False
+
+        if not merged:
+            # Some patterns could not be merged, and will be matched one
+            # ReDict at a time
+            if self.responses:
+                self.responses.compile()
 
-        if self.contexts:
             for context in self.contexts:
                 context.compile()
 
+            return self
+
+        # Merged patterns do not need to be compiled separately, but chains
+        # are always matched separately
+        for context in self.contexts:
+            for chain in context.chains:
+                for responsedict in chain:
+                    responsedict.compile()
+
         return self
 
+    def _matcher_sources(self, context):
+        ret = []
+        if context is None:
+            ret.append(((_RESPONSE, None), self.responses))
+            for topcontext in self.contexts:
+                ret.append(((_CONTEXT_ENTRY, topcontext), topcontext.entry))
+        else:
+            ret.append(((_CONTEXT_RESPONSE, context), context.responses))
+            ret.append(((_CONTEXT_RESPONSE, context), context.entry))
+            for subcontext in context.contexts:
+                ret.append(((_CONTEXT_ENTRY, subcontext), subcontext.entry))
+
+        return ret
+
+    def _get_segment(self, context):
+        # Merged patterns for a context are rebuilt whenever any of the ReDicts
+        # they were built from are modified
+        sources = self._matcher_sources(context)
+        key = tuple([(d.version, d.flags) for _, d in sources])
+
+        cached = self._segments.get(id(context))
+        if cached and (cached[0] == key):
+            return cached[1]
+
+        segment = _merge_redicts(sources)
+        self._segments[id(context)] = (key, segment)
+        return segment
+
+    def _matcher_key(self, context):
+        numcontexts = 0 if context is None else len(context.contexts)
+        return (redict.get_generation(), len(self.contexts), numcontexts)
+
+    def _get_matcher(self, context):
+        # If no ReDicts have been created or modified, and no contexts have
+        # been added, since the matcher for a context was last used, it can be
+        # used again without checking each ReDict it was built from
+        cached = self._matchers.get(id(context))
+        if cached and (cached[0] == self._matcher_key(context)):
+            return cached[1]
+
+        # Contextless responses and top-level context entry phrases are
+        # checked last in every context, so they are merged once and shared by
+        # all contexts, instead of being compiled again for each context
+        matcher = None
+        shared = self._get_segment(None)
+        if (shared is not None) and (context is None):
+            matcher = [shared]
+        elif shared is not None:
+            segment = self._get_segment(context)
+            if segment is not None:
+                matcher = [segment, shared]
+
+        self._matchers[id(context)] = (self._matcher_key(context), matcher)
+        return matcher
+
+    def _get_merged_response(self, matcher, text):
+        for segment in matcher:
+            if not segment:
+                continue
+
+            try:
+                tag, response, owngroups, numgroups = segment[text]
+            except KeyError:
+                continue
+
+            groups = segment.groups()[:owngroups]
+            groups += (None,) * (numgroups - owngroups)
+            source, context = tag
+
+            if source == _CONTEXT_RESPONSE:
+                # Exit any current chains, as Context.get_response does
+                context.chain = None
+            elif source == _RESPONSE:
+                self.context = None
+            else:
+                self.context = context
+
+            return response, groups
+
+        return self.default_response, None
+
     def add_default_response(self, response):
         """
         Set response to return when no other matching responses can be found
@@ -352,6 +508,18 @@ class Responder(object):
         response = NoResponse
         groups = None
 
+        if self.merged:
+            # Chains depend on the state of the current context, so they are
+            # checked separately
+            if self.context:
+                response, groups = self.context._get_chained_response(text)
+                if response != NoResponse:
+                    return response, groups
+
+            matcher = self._get_matcher(self.context)
+            if matcher is not None:
+                return self._get_merged_response(matcher, text)
+
         # If currently in a context, try to get a response from the context
         if self.context:
             response, groups = self.context.get_response(text)
@@ -0,0 +1,79 @@
+import os
+import sys
+import argparse
+from timeit import default_timer
+
+from text_game_maker.builder import map_bundle
+from text_game_maker.transcript.replay_pool import build_uses_rng
+from text_game_maker.utils.runner import (get_runner_from_filename,
+    build_map_from_class, build_map_from_bundle, reset_global_state,
+    MapRunnerError
+)
+
+# Seed used to build the map. Any seed will do; maps are only compiled if
+# building them does not make any random choices.
+BUILD_SEED = 0
+
+def compile_map(runnerclass, filename):
+    """
+    Build a map once, and write it to a bundle file that can be loaded in
+    place of building the map
+
+    :param runnerclass: map runner class object
+    :param str filename: name of bundle file to write
+    :return: time taken to build the map, in seconds
+    :rtype: float
+    """
+    start = default_timer()
+    builder = build_map_from_class(runnerclass, BUILD_SEED)
+    build_secs = default_timer() - start
+
+    if build_uses_rng(builder, BUILD_SEED):
+        raise map_bundle.MapBundleError("random choices were made while "
+            "building the map, so it cannot be compiled (make random choices "
+            "when a new game starts instead)")
+
+    map_bundle.save_bundle(builder, filename)
+    return build_secs
+
+def main():
+    argparser = argparse.ArgumentParser(description="Build a map once, and "
+        "write the built map to a bundle file. text_game_maker.runner loads "
+        "the bundle in place of building the map, as long as the bundle is "
+        "newer than the map file.")
+
+    argparser.add_argument('map_file', help="file containing a MapRunner "
+        "class")
+    argparser.add_argument('-o', '--output', default=None, help="bundle "
+        "file to write (default: map file name with the %s suffix)"
+        % map_bundle.BUNDLE_SUFFIX)
+
+    args = argparser.parse_args()
+
+    map_file = os.path.abspath(args.map_file)
+    runnerclass = get_runner_from_filename(map_file)
+    if not runnerclass:
+        raise MapRunnerError("Unable to find a MapRunner class in %s"
+            % args.map_file)
+
+    output = args.output
+    if output is None:
+        output = map_bundle.get_bundle_filename(map_file)
+
+    try:
+        build_secs = compile_map(runnerclass, output)
+    except map_bundle.MapBundleError as e:
+        print("%s: %s" % (args.map_file, e))
+        return 1
+
+    reset_global_state()
+    start = default_timer()
+    build_map_from_bundle(runnerclass, output, BUILD_SEED)
+    load_secs = default_timer() - start
+
+    print("wrote %s (%d bytes)" % (output, os.path.getsize(output)))
+    print("build: %.3fs, load from bundle: %.3fs" % (build_secs, load_secs))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+import bisect
+
 import text_game_maker
 
 from text_game_maker.audio import audio
@@ -5,7 +7,124 @@ from text_game_maker.utils import utils
 from text_game_maker.game_objects.base import serialize as base_serialize
 from text_game_maker.game_objects.base import deserialize as base_deserialize
 
-craftables = {}
+def _normalize(name):
+    return ' '.join(name.lower().split())
+
+class _CraftableIndex(object):
+    """
+    Indexes for looking up craftable items by name, and by ingredient
+    """
+    def __init__(self, craftables):
+        self.order = {}
+        self.by_name = {}
+        self.by_ingredient = {}
+        self.no_ingredients = []
+
+        for i, key in enumerate(craftables):
+            self.order[key] = i
+            name = _normalize(key)
+            if name not in self.by_name:
+                self.by_name[name] = key
+
+            items, _ = craftables[key]
+            if not items:
+                self.no_ingredients.append(key)
+
+            for ingredient in set(x.name for x in items):
+                self.by_ingredient.setdefault(ingredient, []).append(key)
+
+        self.names = sorted(self.by_name)
+        self.reversed_names = sorted(n[::-1] for n in self.by_name)
+        self.name_lengths = sorted(set(len(n) for n in self.by_name))
+
+    def _prefix_matches(self, names, prefix):
+        i = bisect.bisect_left(names, prefix)
+        while (i < len(names)) and names[i].startswith(prefix):
+            yield names[i]
+            i += 1
+
+    def find(self, name):
+        """
+        Find the craftable item that best matches a name. If there is no exact
+        match, the first added item whose name starts or ends with the given
+        name, or is contained in the given name, is returned.
+
+        :param str name: name to look up
+        :return: craftables key, or None if nothing matches
+        """
+        if name in self.order:
+            return name
+
+        name = _normalize(name)
+        if name in self.by_name:
+            return self.by_name[name]
+
+        matches = set(self._prefix_matches(self.names, name))
+        matches.update(n[::-1] for n in
+            self._prefix_matches(self.reversed_names, name[::-1]))
+
+        for length in self.name_lengths:
+            if length > len(name):
+                break
+
+            for i in range(len(name) - length + 1):
+                if name[i:i + length] in self.by_name:
+                    matches.add(name[i:i + length])
+
+        if not matches:
+            return None
+
+        keys = [self.by_name[n] for n in matches]
+        return min(keys, key=lambda k: self.order[k])
+
+class CraftableDict(dict):
+    """
+    Dict of craftable items, keyed by item name. Each value is a list of the
+    form ``[ingredients, item]``. Indexes for looking up craftable items are
+    built when first needed, and rebuilt after the dict is modified.
+    """
+    def __init__(self, *args, **kwargs):
+        super(CraftableDict, self).__init__(*args, **kwargs)
+        self._index = None
+
+    def get_index(self):
+        if self._index is None:
+            self._index = _CraftableIndex(self)
+
+        return self._index
+
+    def __setitem__(self, key, value):
+        super(CraftableDict, self).__setitem__(key, value)
+        self._index = None
+
+    def __delitem__(self, key):
+        super(CraftableDict, self).__delitem__(key)
+        self._index = None
+
+    def clear(self):
+        super(CraftableDict, self).clear()
+        self._index = None
+
+    def update(self, *args, **kwargs):
+        super(CraftableDict, self).update(*args, **kwargs)
+        self._index = None
+
+    def pop(self, *args):
+        ret = super(CraftableDict, self).pop(*args)
+        self._index = None
+        return ret
+
+    def popitem(self):
+        ret = super(CraftableDict, self).popitem()
+        self._index = None
+        return ret
+
+    def setdefault(self, key, default=None):
+        ret = super(CraftableDict, self).setdefault(key, default)
+        self._index = None
+        return ret
+
+craftables = CraftableDict()
 
 def serialize():
     ret = {}
@@ -52,26 +171,80 @@ def help_text():
 
     return None
 
-def _find_item(item, items):
+def _items_by_name(items):
+    ret = {}
     for i in items:
-        if (i.name == item.name) and isinstance(i, item.__class__):
-            return i
+        ret.setdefault(i.name, []).append(i)
 
-    return None
+    return ret
 
-def _find_craftable(name):
-    items = []
-    item = None
+def _find_ingredients(items, available):
+    # Find a different available item for each ingredient
+    ret = []
+    used = set()
 
-    if name in craftables:
-        items, item = craftables[name]
-    else:
-        for k in craftables:
-            if k.startswith(name) or k.endswith(name) or (k in name):
-                items, item = craftables[k]
+    for item in items:
+        found = None
+        for i in available.get(item.name, []):
+            if (id(i) not in used) and isinstance(i, item.__class__):
+                found = i
                 break
 
-    return items, item
+        if found is None:
+            return None
+
+        used.add(id(found))
+        ret.append(found)
+
+    return ret
+
+def _player_items(player):
+    ret = []
+    ret.extend(player.pockets.items)
+    if player.inventory:
+        ret.extend(player.inventory.items)
+
+    return ret
+
+def _find_craftable(name):
+    key = craftables.get_index().find(name)
+    if key is None:
+        return [], None
+
+    return craftables[key]
+
+def craftable_with(items):
+    """
+    Get all craftable items that can be crafted from a collection of items
+
+    :param [text_game_maker.game_objects.items.Item] items: available items
+    :return: list of craftable items, in the order they were added
+    :rtype: [text_game_maker.game_objects.items.Item]
+    """
+    index = craftables.get_index()
+    available = _items_by_name(items)
+    candidates = set(index.no_ingredients)
+
+    for name in available:
+        candidates.update(index.by_ingredient.get(name, []))
+
+    ret = []
+    for key in sorted(candidates, key=lambda k: index.order[k]):
+        ingredients, item = craftables[key]
+        if _find_ingredients(ingredients, available) is not None:
+            ret.append(item)
+
+    return ret
+
+def craftable_by_player(player):
+    """
+    Get all craftable items that player has the ingredients to craft
+
+    :param text_game_maker.player.player.Player player: player instance
+    :return: list of craftable items, in the order they were added
+    :rtype: [text_game_maker.game_objects.items.Item]
+    """
+    return craftable_with(_player_items(player))
 
 def _need_items(name, word, items):
     names = [str(x) for x in items]
@@ -110,20 +283,12 @@ def craft(name, word, player):
         utils.game_print("Don't know how to %s %s" % (word, name))
         return None
 
-    ingredients = []
-
-    player_items = []
-    player_items.extend(player.pockets.items)
-    if player.inventory:
-        player_items.extend(player.inventory.items)
-
-    for i in items:
-        ingredient = _find_item(i, player_items)
-        if ingredient is None:
-            _need_items(name, word, items)
-            return None
+    ingredients = _find_ingredients(items,
+        _items_by_name(_player_items(player)))
 
-        ingredients.append(ingredient)
+    if ingredients is None:
+        _need_items(name, word, items)
+        return None
 
     for i in ingredients:
         i.delete()
@@ -1,11 +1,115 @@
+import sys
+import traceback
+from timeit import default_timer
+
 from text_game_maker.utils import utils
 
+DEFAULT_PRIORITY = 0
+
+info = {
+    'isolate_errors': True
+}
+
+_handler_stats = {}
+
+class HandlerStats(object):
+    """
+    Timing and error counters for a single event handler
+    """
+    def __init__(self, event_name, handler_name):
+        self.event_name = event_name
+        self.handler_name = handler_name
+        self.calls = 0
+        self.errors = 0
+        self.total_secs = 0.0
+        self.max_secs = 0.0
+        self.last_error = None
+
+    @property
+    def mean_secs(self):
+        if self.calls == 0:
+            return 0.0
+
+        return self.total_secs / self.calls
+
+    def __str__(self):
+        return ("%s %s: %d calls, %d errors, %.6fs total, %.6fs mean, "
+            "%.6fs max" % (self.event_name, self.handler_name, self.calls,
+            self.errors, self.total_secs, self.mean_secs, self.max_secs))
+
+    def __repr__(self):
+        return self.__str__()
+
+def get_handler_stats():
+    """
+    Get timing and error counters for all event handlers that have been run,
+    sorted by total time spent in each handler (slowest first)
+
+    :return: list of handler stats
+    :rtype: [text_game_maker.event.event.HandlerStats]
+    """
+    return sorted(_handler_stats.values(), key=lambda x: x.total_secs,
+        reverse=True)
+
+def reset_handler_stats():
+    """
+    Clear timing and error counters for all event handlers
+    """
+    _handler_stats.clear()
+
+def set_error_isolation(value):
+    """
+    Set whether an exception raised by an event handler should be isolated to
+    that handler (default) or propagated to the code generating the event.
+    Isolated exceptions are counted in the handler's stats, and the traceback
+    is written to stderr, but the remaining handlers still run.
+
+    :param bool value: True to isolate handler exceptions, False to propagate
+    """
+    info['isolate_errors'] = value
+
+def _handler_name(handler):
+    # Handlers may be any callable (e.g. functools.partial objects, or
+    # instances with a __call__ method), which may not have a name
+    try:
+        name = (getattr(handler, '__qualname__', None) or
+            getattr(handler, '__name__', None))
+        if not name:
+            return repr(handler)
+
+        module = getattr(handler, '__module__', None)
+        if module and (module != str.__class__.__module__):
+            return module + '.' + name
+
+        return name
+    except Exception:
+        return object.__repr__(handler)
+
+def _get_stats(event_name, handler):
+    try:
+        key = (event_name, handler)
+        hash(key)
+    except TypeError:
+        key = (event_name, id(handler))
+
+    if key not in _handler_stats:
+        handler_name = _handler_name(handler)
+        _handler_stats[key] = HandlerStats(event_name, handler_name)
+
+    return _handler_stats[key]
+
 class Event(object):
     """
     Class to represent a generic event that handlers can be registered for
     """
-    def __init__(self):
+    def __init__(self, name=None):
+        """
+        :param str name: event name, used to identify this event in handler\
+            stats
+        """
+        self.name = name
         self._handlers = []
+        self._priorities = []
 
     def clear_handlers(self):
         """
@@ -15,19 +119,27 @@ class Event(object):
         :rtype: text_game_maker.event.event.Event
         """
         self._handlers = []
+        self._priorities = []
         return self
 
-    def add_handler(self, handler):
+    def add_handler(self, handler, priority=DEFAULT_PRIORITY):
         """
         Registers a handler to run when this event is generated.
 
         :param handler: handler to add. Handler should be of the form:\
             ``handler(*event_args)`` where ``event_args`` is all of the\
             arguments for the event
+        :param int priority: handlers with a higher priority run first.\
+            Handlers with the same priority run in the order they were added
         :return: Event instance
         :rtype: text_game_maker.event.event.Event
         """
-        self._handlers.append(handler)
+        i = len(self._priorities)
+        while (i > 0) and (self._priorities[i - 1] < priority):
+            i -= 1
+
+        self._handlers.insert(i, handler)
+        self._priorities.insert(i, priority)
         return self
 
     def clear_handler(self, handler):
@@ -39,12 +151,70 @@ class Event(object):
         :rtype: text_game_maker.event.event.Event
         """
         try:
-            self._handlers.remove(handler)
+            i = self._handlers.index(handler)
         except ValueError:
-            pass
+            return self
+
+        del self._handlers[i]
+        del self._priorities[i]
+        return self
+
+    def get_handlers(self):
+        """
+        Get all registered handlers, in the order they will run
+
+        :return: list of tuples of the form ``(handler, priority)``
+        :rtype: [tuple]
+        """
+        return list(zip(self._handlers, self._priorities))
+
+    def set_handlers(self, handlers):
+        """
+        Replace all registered handlers
+
+        :param [tuple] handlers: list of tuples of the form\
+            ``(handler, priority)``, as returned by get_handlers
+        :return: Event instance
+        :rtype: text_game_maker.event.event.Event
+        """
+        self.clear_handlers()
+        for handler, priority in handlers:
+            self.add_handler(handler, priority)
 
         return self
 
+    def _run_handler(self, handler, event_args):
+        # Stats are looked up inside the try block, so that a handler which
+        # cannot be named or hashed is still isolated like any other error
+        stats = None
+        start = default_timer()
+
+        try:
+            stats = _get_stats(self.name, handler)
+            handler(*event_args)
+        except Exception as e:
+            if stats is None:
+                stats = HandlerStats(self.name, object.__repr__(handler))
+
+            stats.errors += 1
+            stats.last_error = e
+
+            if not info['isolate_errors']:
+                raise
+
+            sys.stderr.write("Error in handler %s for event %s:\n"
+                % (stats.handler_name, self.name))
+            traceback.print_exc()
+        finally:
+            if stats is None:
+                stats = HandlerStats(self.name, object.__repr__(handler))
+
+            elapsed = default_timer() - start
+            stats.calls += 1
+            stats.total_secs += elapsed
+            if elapsed > stats.max_secs:
+                stats.max_secs = elapsed
+
     def generate(self, *event_args):
         """
         Generate an event. Runs all registered handlers.
@@ -53,8 +223,9 @@ class Event(object):
         :return: Event instance
         :rtype: text_game_maker.event.event.Event
         """
-        for handler in self._handlers:
-            handler(*event_args)
+        # Iterate over a copy, handlers may remove themselves
+        for handler in list(self._handlers):
+            self._run_handler(handler, event_args)
 
         return self
 
@@ -63,3 +234,4 @@ class Event(object):
 
     def deserialize(self, attrs):
         self._handlers = [utils.deserialize_callback(name) for name in attrs]
+        self._priorities = [DEFAULT_PRIORITY] * len(self._handlers)
@@ -0,0 +1,172 @@
+from text_game_maker.event.event import Event, DEFAULT_PRIORITY
+
+class EventBus(object):
+    """
+    Collection of named topics, where each topic is an
+    text_game_maker.event.event.Event instance. Events can be published to a
+    topic immediately, or deferred until the end of the current turn.
+    """
+    def __init__(self):
+        self._topics = {}
+        self._arg_names = {}
+        self._deferred = []
+
+    def add_topic(self, name, *arg_names):
+        """
+        Declare a topic, and the arguments that handlers for this topic will be
+        called with. Publishing an event with the wrong number of arguments to
+        a declared topic raises a TypeError. Topics that are not declared are
+        created on first use, and accept any arguments.
+
+        :param str name: topic name
+        :param arg_names: names of the arguments passed to handlers
+        :return: event for the topic
+        :rtype: text_game_maker.event.event.Event
+        """
+        self._arg_names[name] = arg_names
+        return self.get_topic(name)
+
+    def get_topic(self, name):
+        """
+        Get the event for a topic, creating the topic if it does not exist
+
+        :param str name: topic name
+        :return: event for the topic
+        :rtype: text_game_maker.event.event.Event
+        """
+        if name not in self._topics:
+            self._topics[name] = Event(name)
+
+        return self._topics[name]
+
+    def topics(self):
+        """
+        Get the names of all topics on this bus
+
+        :return: list of topic names
+        :rtype: [str]
+        """
+        return list(self._topics.keys())
+
+    def subscribe(self, name, handler, priority=DEFAULT_PRIORITY):
+        """
+        Register a handler for a topic
+
+        :param str name: topic name
+        :param handler: handler to add, of the form ``handler(*event_args)``
+        :param int priority: handlers with a higher priority run first
+        :return: EventBus instance
+        :rtype: text_game_maker.event.event_bus.EventBus
+        """
+        self.get_topic(name).add_handler(handler, priority)
+        return self
+
+    def unsubscribe(self, name, handler):
+        """
+        Unregister a handler for a topic
+
+        :param str name: topic name
+        :param handler: handler that was previously registered
+        :return: EventBus instance
+        :rtype: text_game_maker.event.event_bus.EventBus
+        """
+        if name in self._topics:
+            self._topics[name].clear_handler(handler)
+
+        return self
+
+    def _check_args(self, name, event_args):
+        if name not in self._arg_names:
+            return
+
+        expected = self._arg_names[name]
+        if len(event_args) != len(expected):
+            raise TypeError("topic '%s' expects %d arguments (%s), got %d"
+                % (name, len(expected), ', '.join(expected), len(event_args)))
+
+    def publish(self, name, *event_args):
+        """
+        Run all handlers for a topic immediately
+
+        :param str name: topic name
+        :param event_args: arguments to pass to handlers
+        :return: EventBus instance
+        :rtype: text_game_maker.event.event_bus.EventBus
+        """
+        self._check_args(name, event_args)
+        if name in self._topics:
+            self._topics[name].generate(*event_args)
+
+        return self
+
+    def publish_deferred(self, name, *event_args):
+        """
+        Queue an event for a topic, to be dispatched the next time ``flush``
+        is called (at the end of the current turn, when running a game)
+
+        :param str name: topic name
+        :param event_args: arguments to pass to handlers
+        :return: EventBus instance
+        :rtype: text_game_maker.event.event_bus.EventBus
+        """
+        self._check_args(name, event_args)
+        self._deferred.append((name, event_args))
+        return self
+
+    def flush(self):
+        """
+        Dispatch all deferred events, in the order they were published. Events
+        deferred by handlers while flushing are dispatched on the next flush.
+        """
+        deferred = self._deferred
+        self._deferred = []
+
+        for name, event_args in deferred:
+            if name in self._topics:
+                self._topics[name].generate(*event_args)
+
+    def snapshot(self):
+        """
+        Get a snapshot of all topics and handlers on this bus, which can be
+        restored later with restore(). Deferred events are not included.
+
+        :return: snapshot
+        :rtype: dict
+        """
+        return {name: (self._arg_names.get(name),
+            self._topics[name].get_handlers()) for name in self._topics}
+
+    def restore(self, snapshot):
+        """
+        Replace all topics and handlers on this bus with a snapshot taken by
+        snapshot(), and discard any deferred events
+
+        :param dict snapshot: snapshot to restore
+        """
+        self.clear()
+        for name in snapshot:
+            arg_names, handlers = snapshot[name]
+            if arg_names is not None:
+                self._arg_names[name] = arg_names
+
+            self.get_topic(name).set_handlers(handlers)
+
+    def clear(self):
+        """
+        Remove all topics, handlers and deferred events from this bus
+        """
+        self._topics.clear()
+        self._arg_names.clear()
+        self._deferred = []
+
+_bus = EventBus()
+
+def get_event_bus():
+    """
+    Get the default event bus, which is flushed at the end of every turn by
+    text_game_maker.builder.map_builder.MapBuilder
+
+    :return: default event bus
+    :rtype: text_game_maker.event.event_bus.EventBus
+    """
+    return _bus
@@ -7,6 +7,7 @@ from text_game_maker.tile import tile
 from text_game_maker.utils import utils, runner
 
 # Called when the game starts
+@utils.serializable_callback
 def on_game_run(player):
     # read name from player
     player.read_player_name_and_set()
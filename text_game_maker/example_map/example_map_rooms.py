@@ -1,9 +1,8 @@
-import random
-
 from text_game_maker.example_map import hints
 from text_game_maker.example_map import room_ids
 from text_game_maker.game_objects.person import Person, Context
 from text_game_maker.utils.responses import STANDARD_GREETINGS
+from text_game_maker.utils import utils
 from text_game_maker.utils.utils import serializable_callback
 from text_game_maker.materials.materials import Material
 from text_game_maker.tile import tile
@@ -14,9 +13,40 @@ from text_game_maker.game_objects.items import (Item, Food, Weapon, Bag,
     Lighter, Machete
 )
 
-class config(object):
-    idnumber = random.randrange(100000, 500000)
-    vaultcode = random.randrange(10000000, 50000000)
+ID_CARD_NAME = "ID badge"
+POSTIT_NAME = "post-it note"
+
+def _find_item(items, name):
+    for item in items:
+        if item.name == name:
+            return item
+
+        found = _find_item(item.items, name)
+        if found:
+            return found
+
+    return None
+
+def _find_tile_item(tile_id, name):
+    items = tile.get_tile_by_id(tile_id).items
+    return _find_item([i for loc in items for i in items[loc]], name)
+
+def _generate_codes():
+    # Codes are generated when a new game starts, rather than when the map is
+    # built, so that they are drawn from the RNG for the current game session
+    rng = utils.get_rng()
+    idnumber = rng.randrange(100000, 500000)
+    vaultcode = rng.randrange(10000000, 50000000)
+
+    # Set codes for keypad doors
+    tile.get_tile_by_id(room_ids.bank_officedoor_id).unlock_code = idnumber
+    tile.get_tile_by_id(room_ids.bank_vaultdoor_id).unlock_code = vaultcode
+
+    idcard = _find_tile_item(room_ids.prisonoffice_id, ID_CARD_NAME)
+    idcard.paragraphs[2] = "CID: %d" % idnumber
+
+    postit = _find_tile_item(room_ids.bank_office_id, POSTIT_NAME)
+    postit.paragraphs[0] = "code 4 vault: %d" % vaultcode
 
 @serializable_callback
 def _do_buy(person, player):
@@ -44,7 +74,10 @@ def on_take_event(player, word, remaining):
 
         player.schedule_task(hints.small_tin_hint_callback, 10)
 
+@serializable_callback
 def new_game_event_handler(player):
+    _generate_codes()
+
     player.schedule_task(hints.light_source_decay_callback, 1)
     player.schedule_task(hints.lighter_equip_hint, 5)
 
@@ -169,10 +202,11 @@ def prison_office(builder):
     chair = Furniture("a", "chair", location="against the wall",
         combustible=False)
 
-    idcard = Paper("an", "ID badge", paragraphs=[
+    # CID is set when a new game starts
+    idcard = Paper("an", ID_CARD_NAME, paragraphs=[
             "<playername>, Branch Manager",
             "Branch: 115N",
-            "CID: %d" % config.idnumber
+            "CID: "
         ], header="Central Bank", footer="Central Bank"
     )
 
@@ -229,12 +263,7 @@ def central_bank(builder):
 
 def central_bank_hallway(builder):
     builder.set_current_tile(room_ids.bank_hallway_id)
-
-    # Need to set randomly-generated codes for keypad doors
-    office_door = tile.get_tile_by_id(room_ids.bank_officedoor_id)
-    vault_door = tile.get_tile_by_id(room_ids.bank_vaultdoor_id)
-    office_door.unlock_code = config.idnumber
-    vault_door.unlock_code = config.vaultcode
+    pass
 
 def central_bank_vault(builder):
     builder.set_current_tile(room_ids.bank_vault_id)
@@ -260,8 +289,9 @@ def central_bank_employee_lounge(builder):
 def central_bank_managers_office(builder):
     builder.set_current_tile(room_ids.bank_office_id)
 
-    postit = Paper("a", "post-it note", paragraphs=[
-            "code 4 vault: %d" % config.vaultcode
+    # Vault code is set when a new game starts
+    postit = Paper("a", POSTIT_NAME, paragraphs=[
+            "code 4 vault: "
         ], location="stuck to the wall"
     )
 
@@ -0,0 +1,213 @@
+import os
+import sys
+import argparse
+import multiprocessing
+from timeit import default_timer
+
+from text_game_maker.ptttl import ptttl_audio_encoder
+from text_game_maker.ptttl.ptttl_parser import PTTTLParser
+
+PTTTL_SUFFIXES = ['.txt', '.ptttl', '.rtttl']
+
+FORMAT_WAV = 'wav'
+FORMAT_MP3 = 'mp3'
+
+class ExportError(Exception):
+    pass
+
+class _WorkerConfig(object):
+    output_dir = None
+    fmt = FORMAT_WAV
+    amplitude = 0.5
+    wavetype = ptttl_audio_encoder.SINE_WAVE
+
+def _init_worker(output_dir, fmt, amplitude, wavetype):
+    _WorkerConfig.output_dir = output_dir
+    _WorkerConfig.fmt = fmt
+    _WorkerConfig.amplitude = amplitude
+    _WorkerConfig.wavetype = wavetype
+
+    # Import numpy (if available) up front, so the time taken is not counted
+    # as part of the render time for the first file
+    ptttl_audio_encoder.numpy_available()
+
+def output_filename(filename, output_dir, fmt=FORMAT_WAV):
+    """
+    Get the name of the file that a PTTTL file is exported to
+
+    :param str filename: PTTTL file
+    :param str output_dir: directory to write exported file to
+    :param str fmt: output format, ``'wav'`` or ``'mp3'``
+    :return: exported file path
+    :rtype: str
+    """
+    name = os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(output_dir, '%s.%s' % (name, fmt))
+
+def export_file(filename, output_dir, fmt=FORMAT_WAV, amplitude=0.5,
+        wavetype=ptttl_audio_encoder.SINE_WAVE):
+    """
+    Render a single PTTTL file and write it to a WAV or MP3 file. Samples are
+    kept in memory and written directly; no temporary files are used.
+
+    :param str filename: PTTTL file to render
+    :param str output_dir: directory to write exported file to
+    :param str fmt: output format, ``'wav'`` or ``'mp3'`` (MP3 requires\
+        ``lame``)
+    :param float amplitude: amplitude, 0.0 to 1.0
+    :param int wavetype: wave type
+    :return: exported file path
+    :rtype: str
+    """
+    with open(filename, 'r') as fh:
+        parsed = PTTTLParser().parse(fh.read())
+
+    samples = ptttl_audio_encoder._generate_sample_data(parsed, amplitude,
+        wavetype)
+    outfile = output_filename(filename, output_dir, fmt)
+
+    if fmt == FORMAT_MP3:
+        ptttl_audio_encoder._wav_to_mp3(
+            ptttl_audio_encoder.samples_to_wav_data(samples), outfile)
+    else:
+        ptttl_audio_encoder.write_wav(outfile, samples)
+
+    return outfile
+
+def _export_worker(filename):
+    start = default_timer()
+
+    try:
+        outfile = export_file(filename, _WorkerConfig.output_dir,
+            _WorkerConfig.fmt, _WorkerConfig.amplitude,
+            _WorkerConfig.wavetype)
+    except Exception as e:
+        return filename, None, default_timer() - start, str(e)
+
+    return filename, outfile, default_timer() - start, None
+
+def find_ptttl_files(input_dir):
+    """
+    Find all PTTTL files in a directory
+
+    :param str input_dir: directory to search
+    :return: list of PTTTL file paths
+    :rtype: [str]
+    """
+    ret = []
+    for f in sorted(os.listdir(input_dir)):
+        if os.path.splitext(f)[1].lower() not in PTTTL_SUFFIXES:
+            continue
+
+        path = os.path.join(input_dir, f)
+        if os.path.isfile(path):
+            ret.append(path)
+
+    return ret
+
+def _check_output_filenames(files, output_dir, fmt):
+    # Files with the same name and a different suffix (e.g. song.txt and
+    # song.rtttl) would be exported to the same file. Names are compared
+    # ignoring case, since some filesystems are case-insensitive.
+    seen = {}
+    for filename in files:
+        outfile = output_filename(filename, output_dir, fmt)
+        key = outfile.lower()
+        if key in seen:
+            raise ExportError("%s and %s would both be exported to %s"
+                % (os.path.basename(seen[key]), os.path.basename(filename),
+                os.path.basename(outfile)))
+
+        seen[key] = filename
+
+def export_dir(input_dir, output_dir, fmt=FORMAT_WAV, processes=None,
+        amplitude=0.5, wavetype=ptttl_audio_encoder.SINE_WAVE):
+    """
+    Render all PTTTL files in a directory to WAV or MP3 files, using a pool of
+    worker processes. Raises ExportError, before rendering any files, if more
+    than one file would be exported to the same file name.
+
+    :param str input_dir: directory containing PTTTL files
+    :param str output_dir: directory to write exported files to
+    :param str fmt: output format, ``'wav'`` or ``'mp3'``
+    :param int processes: number of worker processes to use (if None, the\
+        number of CPUs is used)
+    :param float amplitude: amplitude, 0.0 to 1.0
+    :param int wavetype: wave type
+    :return: list of tuples of the form ``(filename, outfile, secs, error)``\
+        where ``secs`` is the time taken to render and write the file
+    :rtype: [tuple]
+    """
+    files = find_ptttl_files(input_dir)
+    if not files:
+        return []
+
+    _check_output_filenames(files, output_dir, fmt)
+
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    pool = multiprocessing.Pool(processes, _init_worker,
+        (output_dir, fmt, amplitude, wavetype))
+
+    try:
+        # Render the largest files first, so one slow file is not left
+        # running on its own at the end
+        files.sort(key=os.path.getsize, reverse=True)
+        ret = list(pool.imap_unordered(_export_worker, files))
+    finally:
+        pool.close()
+        pool.join()
+
+    return sorted(ret)
+
+def main():
+    argparser = argparse.ArgumentParser(description="Render all PTTTL files "
+        "in a directory to WAV or MP3 files, in parallel")
+
+    argparser.add_argument('input_dir', help="directory containing PTTTL "
+        "files (%s)" % ', '.join(PTTTL_SUFFIXES))
+    argparser.add_argument('output_dir', help="directory to write exported "
+        "files to")
+    argparser.add_argument('-f', '--format', default=FORMAT_WAV,
+        choices=[FORMAT_WAV, FORMAT_MP3], help="output format (default: "
+        "%(default)s)")
+    argparser.add_argument('-j', '--processes', type=int, default=None,
+        help="number of worker processes (default: number of CPUs)")
+    argparser.add_argument('-s', '--square', action='store_true',
+        help="use a square wave instead of a sine wave")
+
+    args = argparser.parse_args()
+
+    if not os.path.isdir(args.input_dir):
+        print("%s: no such directory" % args.input_dir)
+        return 1
+
+    wavetype = ptttl_audio_encoder.SINE_WAVE
+    if args.square:
+        wavetype = ptttl_audio_encoder.SQUARE_WAVE
+
+    start = default_timer()
+    try:
+        results = export_dir(args.input_dir, args.output_dir, args.format,
+            args.processes, wavetype=wavetype)
+    except ExportError as e:
+        print("%s: %s" % (args.input_dir, e))
+        return 1
+
+    total = default_timer() - start
+
+    failed = 0
+    for filename, outfile, secs, error in results:
+        name = os.path.basename(filename)
+        if error is not None:
+            failed += 1
+            print("%s: failed after %.3fs (%s)" % (name, secs, error))
+        else:
+            print("%s: %s (%.3fs)" % (name, os.path.basename(outfile), secs))
+
+    print("\n%d files, %d failed, %.3fs" % (len(results), failed, total))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
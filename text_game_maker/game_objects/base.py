@@ -1,5 +1,6 @@
 import sys
 import copy
+import itertools
 from future.utils import with_metaclass
 
 import text_game_maker
@@ -11,6 +12,106 @@ from text_game_maker.game_objects import __object_model_version__
 
 TYPE_KEY = '_type_key'
 
+_versions = itertools.count(1)
+
+def next_version():
+    """
+    Get a new version number. Version numbers are unique across all objects,
+    so a cached value can be checked against the version of an object that
+    has since been replaced by a different object.
+
+    :return: version number
+    :rtype: int
+    """
+    return next(_versions)
+
+class LocationList(list):
+    """
+    List of items at a location, e.g. all items "on the floor" of a tile. The
+    version number changes whenever the list is modified, or when the name of
+    an item in the list changes, so that descriptions of the location can be
+    cached.
+    """
+    def __init__(self, *args):
+        super(LocationList, self).__init__(*args)
+        self.version = next_version()
+
+    def touch(self):
+        """
+        Change the version number of this list
+        """
+        self.version = next_version()
+
+    def append(self, item):
+        ret = super(LocationList, self).append(item)
+        self.touch()
+        return ret
+
+    def extend(self, items):
+        ret = super(LocationList, self).extend(items)
+        self.touch()
+        return ret
+
+    def insert(self, index, item):
+        ret = super(LocationList, self).insert(index, item)
+        self.touch()
+        return ret
+
+    def remove(self, item):
+        ret = super(LocationList, self).remove(item)
+        self.touch()
+        return ret
+
+    def pop(self, *args):
+        ret = super(LocationList, self).pop(*args)
+        self.touch()
+        return ret
+
+    def sort(self, *args, **kwargs):
+        ret = super(LocationList, self).sort(*args, **kwargs)
+        self.touch()
+        return ret
+
+    def reverse(self):
+        ret = super(LocationList, self).reverse()
+        self.touch()
+        return ret
+
+    def __setitem__(self, index, value):
+        ret = super(LocationList, self).__setitem__(index, value)
+        self.touch()
+        return ret
+
+    def __delitem__(self, index):
+        ret = super(LocationList, self).__delitem__(index)
+        self.touch()
+        return ret
+
+    def __iadd__(self, items):
+        ret = super(LocationList, self).__iadd__(items)
+        self.touch()
+        return ret
+
+class VersionedAttribute(object):
+    """
+    Class attribute that calls ``touch()`` on an instance whenever the
+    instance attribute of the same name is set, if the instance is in a
+    location list. Only setting the attribute is intercepted; since this
+    descriptor has no ``__get__`` method, reading the attribute reads the
+    instance attribute directly.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __set__(self, obj, value):
+        attrs = obj.__dict__
+        attrs[self.name] = value
+
+        # Skip the method call for items that are not in a location yet, e.g.
+        # while items are being created or deserialized
+        if attrs.get('home') is not None:
+            obj.touch()
+
 def is_deserializable_type(obj):
     return (type(obj) == dict) and (TYPE_KEY in obj)
 
@@ -45,7 +146,7 @@ def deserialize(data, version):
     if is_deserializable_type(data):
         item = build_instance(data[TYPE_KEY])
         item.set_attrs(data, version)
-    elif type(data) == list:
+    elif isinstance(data, list):
         item = []
 
         if len(data) > 0:
@@ -65,7 +166,7 @@ def serialize(attr):
     :return: serialized object
     :rtype: dict
     """
-    if type(attr) == list:
+    if isinstance(attr, list):
         ret = []
 
         for item in attr:
@@ -90,6 +191,59 @@ class ObjectModelMigration(object):
     def migrate(self, attrs):
         return self._do_migration(attrs)
 
+# Registered migrations, keyed by class object. Each value is a dict of
+# ObjectModelMigration instances keyed by the version they migrate from.
+_migrations = {}
+
+# Composed migration paths, keyed by (class object, from version, to version)
+_migration_paths = {}
+
+def _class_migrations(classobj):
+    ret = {}
+
+    # Walk the MRO from the root, so migrations registered on a subclass
+    # override migrations registered on a base class for the same version
+    for cls in reversed(classobj.__mro__):
+        if cls in _migrations:
+            ret.update(_migrations[cls])
+
+    return ret
+
+def get_migration_path(classobj, from_version,
+        to_version=__object_model_version__):
+    """
+    Get the sequence of migrations required to migrate a serialized instance
+    of a class from one object model version to another. The path is composed
+    once for each class and version pair, and cached for subsequent calls
+
+    :param classobj: class object to get migration path for
+    :param str from_version: version to migrate from
+    :param str to_version: version to migrate to
+    :return: migrations to apply, in order
+    :rtype: tuple
+    """
+    key = (classobj, from_version, to_version)
+    if key in _migration_paths:
+        return _migration_paths[key]
+
+    table = _class_migrations(classobj)
+    current = from_version
+    seen = set()
+    path = []
+
+    while (current != to_version) and (current in table):
+        if current in seen:
+            raise RuntimeError("Circular object model migration for %s at "
+                "version %s" % (classobj.__name__, current))
+
+        seen.add(current)
+        migration = table[current]
+        path.append(migration)
+        current = migration.to_version
+
+    _migration_paths[key] = tuple(path)
+    return _migration_paths[key]
+
 class GameEntity(object, with_metaclass(utils.SubclassTrackerMetaClass, object)):
     """
     Base class for anything that the player can interact with in the
@@ -134,11 +288,17 @@ class GameEntity(object, with_metaclass(utils.SubclassTrackerMetaClass, object))
         e.g. "the coins are on the floor"
     """
 
-    global_skip_attrs = ['home', '_migrations']
+    global_skip_attrs = ['home', '_version', '_description_cache']
     skip_attrs = []
 
+    # Changing any of these attributes changes the description of the
+    # location this item is in
+    name = VersionedAttribute('name')
+    prefix = VersionedAttribute('prefix')
+    verb = VersionedAttribute('verb')
+    scenery = VersionedAttribute('scenery')
+
     def __init__(self):
-        self._migrations = []
         self.inanimate = True
         self.combustible = True
         self.scenery = False
@@ -162,6 +322,15 @@ class GameEntity(object, with_metaclass(utils.SubclassTrackerMetaClass, object))
         self.size = 1
         self.verb = "is"
 
+    def touch(self):
+        """
+        Called when an attribute that affects how this item is described has
+        changed. Changes the version of the location list this item is in.
+        """
+        home = self.__dict__.get('home')
+        if isinstance(home, LocationList):
+            home.touch()
+
     @property
     def prep(self):
         if self._prep in ["", None]:
@@ -194,17 +363,24 @@ class GameEntity(object, with_metaclass(utils.SubclassTrackerMetaClass, object))
 
         return False
 
-    def add_migration(self, from_version, to_version, migration_function):
+    @classmethod
+    def add_migration(cls, from_version, to_version, migration_function):
         """
-        Add function to migrate a serialized version of this object to a new
-        object model version
+        Add function to migrate a serialized version of this class (and any
+        subclasses) to a new object model version. Migrations are registered
+        once per class; registering a second migration from the same version
+        replaces the first one.
 
         :param str from_version: version to migrate from
         :param str to_version: version to migrate to
         :param migration_function: function to perform migration
         """
         m = ObjectModelMigration(from_version, to_version, migration_function)
-        self._migrations.append(m)
+        if cls not in _migrations:
+            _migrations[cls] = {}
+
+        _migrations[cls][from_version] = m
+        _migration_paths.clear()
 
     def migrate(self, old_version, attrs):
         """
@@ -215,11 +391,8 @@ class GameEntity(object, with_metaclass(utils.SubclassTrackerMetaClass, object))
         :param attrs: object to migrate as a serialized dict
         :return: migrated serialized dict
         """
-        current_version = old_version
-        for migration in self._migrations:
-            if migration.from_version == current_version:
-                attrs = migration.migrate(attrs)
-                current_version = migration.to_version
+        for migration in get_migration_path(self.__class__, old_version):
+            attrs = migration.migrate(attrs)
 
         return attrs
 
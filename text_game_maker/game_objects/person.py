@@ -1,5 +1,4 @@
 import sys
-import random
 
 from text_game_maker.game_objects.items import Coins
 from text_game_maker.game_objects.living import LivingItem
@@ -112,6 +111,8 @@ class Responder(GameEntity, responder.Responder):
     """
     See text_game_maker.chatbot_utils.responder.Responder
     """
+    skip_attrs = ['_matchers', '_segments']
+
     def __init__(self, *args, **kwargs):
         responder.Responder.__init__(self, *args, **kwargs)
         GameEntity.__init__(self)
@@ -325,9 +326,13 @@ class Person(LivingItem):
             subgroups from the regular expression match (as returned by \
             re.MatchObject.groups), if any, otherwise None.
         """
+        if not self.responses.merged:
+            # Merge all patterns, so each input string is checked in one pass
+            self.responses.compile()
+
         response, groups = self.responses.get_response(text)
         if (type(response) == list) or (type(response) == tuple):
-            return random.choice(response), groups
+            return utils.get_rng().choice(response), groups
 
         return response, groups
 
@@ -426,6 +431,7 @@ class Person(LivingItem):
         return True
 
     def _stop_following_player(self, player):
+        player.npc_simulation.deactivate(self)
         self.location = self.original_location
         self.looking = False
         self.following = False
@@ -438,15 +444,46 @@ class Person(LivingItem):
         self.location = "standing next to you"
         self_tile = tile.get_tile_by_id(self.tile_id)
         self_tile.add_person(self)
-        player.schedule_task(self._follow_attack_player, 2)
+        player.npc_simulation.activate(player, self)
+
+    def catch_up(self, player, turns):
+        """
+        Called by text_game_maker.simulation.simulation.NPCSimulation when
+        this person was too far from the player to be updated for some turns.
+        The player was not on a connected tile for any of those turns, so this
+        person has stopped following them.
+
+        :param text_game_maker.player.player.Player player: player instance
+        :param int turns: number of turns missed
+        """
+        self._stop_following_player(player)
 
-    def _follow_attack_player(self, player, turns):
+    def simulation_stopped(self, player):
+        """
+        Called by text_game_maker.simulation.simulation.NPCSimulation when
+        all NPCs stop being updated (e.g. when all scheduled tasks are
+        cleared). This person stops following the player.
+
+        :param text_game_maker.player.player.Player player: player instance
+        """
+        self._stop_following_player(player)
+
+    def simulate(self, player, self_tile, connected, can_see):
+        """
+        Follow and attack the player. Called once per turn by
+        text_game_maker.simulation.simulation.NPCSimulation while this person
+        is following the player.
+
+        :param text_game_maker.player.player.Player player: player instance
+        :param text_game_maker.tile.tile.Tile self_tile: tile this person is on
+        :param bool connected: True if this person is on the player's current\
+            tile, or on a tile connected to it
+        :param bool can_see: True if the player can see their surroundings
+        """
         if not self.alive:
             self._stop_following_player(player)
             return
 
-        self_tile = tile.get_tile_by_id(self.tile_id)
-
         # Waiting for player to emerge
         if self.looking:
             if self_tile is player.current:
@@ -456,7 +493,7 @@ class Person(LivingItem):
                 self._do_attack_player(player)
 
             else:
-                if not player.current.is_connected_to(self_tile):
+                if not connected:
                     # Player exited to a non-adjacent tile
                     self._stop_following_player(player)
                     return
@@ -471,15 +508,15 @@ class Person(LivingItem):
                 utils.game_print("%s is still waiting for you to emerge from "
                     "darkness." % self.prep)
 
-        elif self_tile != player.current:
+        elif self_tile is not player.current:
             # Player moved to a different tile
-            if not player.current.is_connected_to(self_tile):
+            if not connected:
                 # Player moved to a non-adjacent tile
                 utils.game_print("%s is unable to follow you." % self.prep)
                 self._stop_following_player(player)
                 return
 
-            if player.can_see():
+            if can_see:
                 # We can still see the player, follow them
                 player.current.add_person(self)
                 utils.game_print("%s follows you." % self.prep)
@@ -492,8 +529,6 @@ class Person(LivingItem):
             if not self.looking:
                 self._do_attack_player(player)
 
-        player.schedule_task(self._follow_attack_player, 1)
-
     def on_attack(self, player, item):
 
         if not self._do_attacked_by_player(player, item):
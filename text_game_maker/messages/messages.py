@@ -1,7 +1,7 @@
-import random
+from text_game_maker.utils import utils
 
 def _randmsg(choices, *args):
-    choice = random.choice(choices)
+    choice = utils.get_rng().choice(choices)
     return choice.format(*args)
 
 def attack_corpse_message(target_name, item_name):
@@ -25,6 +25,10 @@ CRAFT_WORDS = [
     'craft', 'make', 'create', 'build'
 ]
 
+CRAFTABLE_WORDS = [
+    'what can i craft', 'what can i make', 'recipes'
+]
+
 SHOW_COMMAND_LIST_WORDS = [
     'show commands', 'show controls', 'show words', 'show wordlist',
     'commands', 'controls', 'wordlist', 'words'
@@ -81,7 +85,7 @@ class Command(object):
         self.desc = desc
         self.usage_fmt = usage_fmt
         self.hidden = hidden
-        self.event = Event()
+        self.event = Event("command:%s" % word_list[0])
 
         if self.desc:
             self.desc = self.desc[0].upper() + self.desc[1:]
@@ -295,6 +299,9 @@ class CommandParser(CharacterTrie):
             [CRAFT_WORDS, map_builder._do_craft,
                 "Craft an item", "%s <item>"],
 
+            [CRAFTABLE_WORDS, map_builder._do_show_craftable,
+                "show items you have the ingredients to craft", "%s"],
+
             [INVENTORY_WORDS, map_builder._do_inventory_listing,
             "show player's inventory", "%s"]
         ]
@@ -307,6 +314,27 @@ class CommandParser(CharacterTrie):
 
         commands.add_commands(self)
 
+    def get_commands(self):
+        """
+        Get all commands added to the parser, including hidden commands
+
+        :return: list of commands
+        :rtype: [text_game_maker.parser.parser.Command]
+        """
+        ret = []
+        seen = set()
+        stack = [self.start]
+
+        while stack:
+            node = stack.pop()
+            if node.token and (id(node.token) not in seen):
+                seen.add(id(node.token))
+                ret.append(node.token)
+
+            stack.extend(node.children.values())
+
+        return ret
+
     def add_event_handler(self, word, callback):
         """
         Add an event handler to run whenever a command is used, in addition to
@@ -1,5 +1,6 @@
 import time
 import zlib
+import heapq
 import json
 import sys
 
@@ -15,6 +16,7 @@ from text_game_maker.tile import tile
 from text_game_maker.messages import messages
 from text_game_maker.materials.materials import Material, get_properties
 from text_game_maker.event.event import Event
+from text_game_maker.simulation.simulation import NPCSimulation
 
 OBJECT_VERSION_KEY = '_object_model_version'
 CRAFTABLES_KEY = '_craftables_data'
@@ -49,7 +51,18 @@ def load_from_string(strdata, compression=True):
     if compression:
         strdata = zlib.decompress(strdata).decode("utf-8")
 
-    data = json.loads(strdata)
+    return load_from_dict(json.loads(strdata))
+
+def load_from_dict(data):
+    """
+    Load a serialized state that has already been decoded from JSON, and create
+    a new player instance
+
+    :param dict data: decoded state, as returned by Player.get_attrs. This\
+        dict is modified.
+    :return: new Player instance
+    :rtype: text_game_maker.player.player.Player
+    """
     version = data[OBJECT_VERSION_KEY]
     del data[OBJECT_VERSION_KEY]
 
@@ -78,7 +91,7 @@ class Player(LivingGameEntity):
     Base class to hold player related methods & data
     """
 
-    skip_attrs = ["parser", "new_game_event"]
+    skip_attrs = ["parser", "new_game_event", "_task_heap", "npc_simulation"]
 
     def __init__(self, start_tile=None, input_prompt=None):
         """
@@ -88,7 +101,7 @@ class Player(LivingGameEntity):
 
         super(Player, self).__init__()
 
-        self.new_game_event = Event()
+        self.new_game_event = Event("new_game_event")
         self.material = Material.SKIN
         self.smell_description = None
         self.taste_description = None
@@ -111,10 +124,17 @@ class Player(LivingGameEntity):
         self.current = start_tile
         self.prompt = input_prompt
 
-        self.max_task_id = 0xffff
         self.task_id = 0
         self.scheduled_tasks = {}
 
+        # Min-heap of (due turn, task ID) tuples for all entries in
+        # scheduled_tasks. Entries for cleared or rescheduled tasks are left in
+        # the heap, and discarded when they reach the top
+        self._task_heap = []
+
+        # Updates all NPCs that act every turn, from a single scheduled task
+        self.npc_simulation = NPCSimulation()
+
         self.equipped = None
         self.inventory = None
         self.name = "john"
@@ -369,15 +389,33 @@ class Player(LivingGameEntity):
         ret['scheduled_tasks'] = tasks
         return ret
 
+    def _rebuild_task_heap(self):
+        self._task_heap = [(start + turns, task_id) for task_id, (_, turns, start)
+            in self.scheduled_tasks.items()]
+        heapq.heapify(self._task_heap)
+
     def set_special_attrs(self, attrs, version):
+        next_task_id = attrs.get('task_id', 0)
+
         for taskid in attrs['scheduled_tasks']:
             cb_name, turns, scheduled_turns = attrs['scheduled_tasks'][taskid]
             callback = utils.deserialize_callback(cb_name)
+
+            # Task IDs are stored as strings in JSON
+            taskid = int(taskid)
             self.scheduled_tasks[taskid] = (callback, turns, scheduled_turns)
+            next_task_id = max(next_task_id, taskid + 1)
+
+        # Saves created before task IDs stopped wrapping around may contain
+        # a task ID counter that collides with pending tasks
+        attrs['task_id'] = next_task_id
+        attrs.pop('max_task_id', None)
+        self._rebuild_task_heap()
 
         self.start = tile.builder(attrs[TILES_KEY], attrs[START_TILE_KEY], version)
         self.current = tile.get_tile_by_id(attrs['current'])
         crafting.deserialize(attrs[CRAFTABLES_KEY], version)
+        self.npc_simulation.rebuild(self, tile.iterate_tiles())
 
         del attrs['scheduled_tasks']
         del attrs[START_TILE_KEY]
@@ -549,9 +587,9 @@ class Player(LivingGameEntity):
         """
 
         ret = self.task_id
-        args = (callback, turns, self.turns)
-        self.scheduled_tasks[self.task_id] = args
-        self.task_id = (self.task_id + 1) % self.max_task_id
+        self.scheduled_tasks[ret] = (callback, turns, self.turns)
+        heapq.heappush(self._task_heap, (self.turns + turns, ret))
+        self.task_id += 1
         return ret
 
     def scheduler_tick(self):
@@ -561,22 +599,39 @@ class Player(LivingGameEntity):
         executes any tasks scheduled for that move.
         """
         self.turns += 1
-        for task_id in list(self.scheduled_tasks):
+
+        # Collect all due tasks before running any of them, so that tasks
+        # scheduled by a callback are not run until the next tick
+        due = []
+        while self._task_heap and (self._task_heap[0][0] <= self.turns):
+            due.append(heapq.heappop(self._task_heap))
+
+        for due_turn, task_id in due:
+            if task_id not in self.scheduled_tasks:
+                # Task was cleared
+                continue
+
             callback, turns, start = self.scheduled_tasks[task_id]
-            if self.turns >= (start + turns):
-                if callback(self, turns):
-                    new = (callback, turns, self.turns)
-                    self.scheduled_tasks[task_id] = new
-                else:
-                    del self.scheduled_tasks[task_id]
+            if (start + turns) != due_turn:
+                # Stale heap entry
+                continue
+
+            if callback(self, turns):
+                self.scheduled_tasks[task_id] = (callback, turns, self.turns)
+                heapq.heappush(self._task_heap, (self.turns + turns, task_id))
+            else:
+                del self.scheduled_tasks[task_id]
 
     def clear_tasks(self):
         """
         Clear all pending scheduled tasks (tasks which have been added but
-        whose timers have not expired)
+        whose timers have not expired). Any NPCs following the player stop
+        following.
         """
 
         self.scheduled_tasks.clear()
+        self._task_heap = []
+        self.npc_simulation.clear(self)
 
     def clear_task(self, task_id):
         """
@@ -592,6 +647,16 @@ class Player(LivingGameEntity):
             return False
 
         del self.scheduled_tasks[task_id]
+
+        # NPCs updated by a cancelled simulation task stop being updated
+        if task_id == self.npc_simulation.task_id:
+            self.npc_simulation.clear(self)
+
+        # Cleared tasks are removed from the heap lazily; rebuild the heap if
+        # stale entries start to outnumber pending tasks
+        if len(self._task_heap) > (2 * len(self.scheduled_tasks)) + 16:
+            self._rebuild_task_heap()
+
         return True
 
     def _items_to_words(self, items):
@@ -675,9 +740,20 @@ class Player(LivingGameEntity):
         :return: text description of current game state
         :rtype: str
         """
+        can_see = self.can_see()
+        first_visit = (self.current.first_visit and
+            self.current.first_visit_message and
+            (can_see or self.current.first_visit_message_in_dark))
+
+        if can_see and not first_visit:
+            # Only rebuilt when something on this tile, or the name of an
+            # adjacent tile, has changed
+            return self.current.cached_description('player_view',
+                self.current.description_key(), self._describe_current_tile)
 
-        items = []
+        return self._describe_current_tile()
 
+    def _describe_current_tile(self):
         ret = "You are %s. " % self.current.description.rstrip('.')
 
         if (self.current.first_visit and self.current.first_visit_message and
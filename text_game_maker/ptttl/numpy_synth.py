@@ -0,0 +1,119 @@
+import numpy
+
+# Same envelope settings as the tracks created by
+# text_game_maker.ptttl.ptttl_audio_encoder for the 'tones' engine
+ATTACK_SECS = 0.01
+DECAY_SECS = 0.01
+
+MAX_SAMPLE_VALUE = 32767
+
+SINE_WAVE = 0
+SQUARE_WAVE = 1
+
+_envelopes = {}
+
+def _envelope(sample_rate, secs):
+    key = (sample_rate, secs)
+    if key not in _envelopes:
+        # Build the ramp by repeated addition, like tones does, so that the
+        # envelope values are identical
+        step = 1.0 / (sample_rate * secs)
+        ramp = numpy.cumsum(numpy.full(int(sample_rate * secs) + 2, step))
+        ramp = numpy.concatenate(([0.0], ramp))
+        _envelopes[key] = ramp[:numpy.argmax(ramp >= 1.0)]
+
+    return _envelopes[key]
+
+def _tone(pitch, numsamples, sample_rate, wavetype):
+    if numsamples <= 0:
+        return numpy.zeros(0)
+
+    index = numpy.arange(numsamples, dtype=numpy.float64)
+    ret = numpy.sin(2.0 * numpy.pi * pitch * (index / sample_rate))
+
+    if wavetype == SQUARE_WAVE:
+        ret = numpy.where(ret > 0, 1.0, -1.0)
+
+    attack = _envelope(sample_rate, ATTACK_SECS)
+    num = min(len(attack), numsamples)
+    ret[:num] *= attack[:num]
+
+    decay = _envelope(sample_rate, DECAY_SECS)
+    num = min(len(decay), numsamples)
+    ret[numsamples - num:] *= decay[:num][::-1]
+
+    return ret
+
+def note_samples(pitch, numsamples, sample_rate, wavetype):
+    """
+    Generate samples for a single note
+
+    :param float pitch: note pitch in Hz (0.0 or less for silence)
+    :param int numsamples: number of samples to generate
+    :param int sample_rate: sample rate in Hz
+    :param int wavetype: wave type
+    :return: samples in the range -1.0 to 1.0
+    :rtype: numpy.ndarray
+    """
+    if pitch <= 0.0:
+        return numpy.zeros(numsamples)
+
+    return _tone(pitch, numsamples, sample_rate, wavetype)
+
+def mix(tracks, numsamples, amplitude):
+    """
+    Mix samples from multiple tracks into 16-bit PCM samples
+
+    :param list tracks: one list of sample arrays per track, in the order\
+        the tracks should be mixed. Sample arrays for each track are\
+        concatenated.
+    :param int numsamples: number of samples to generate; tracks with fewer\
+        samples are padded with silence
+    :param float amplitude: amplitude, 0.0 to 1.0
+    :return: PCM samples
+    :rtype: bytes
+    """
+    weight = 1.0 / len(tracks)
+    mixed = numpy.zeros(numsamples)
+
+    for parts in tracks:
+        if not parts:
+            continue
+
+        track = numpy.concatenate(parts)
+        mixed[:len(track)] += (track * weight) * amplitude
+
+    mixed = numpy.clip(mixed * MAX_SAMPLE_VALUE, -MAX_SAMPLE_VALUE,
+        MAX_SAMPLE_VALUE)
+    return mixed.astype(numpy.int16).tobytes()
+
+def _track(notes, sample_rate, wavetype):
+    return [note_samples(pitch, int(time * sample_rate), sample_rate, wavetype)
+        for pitch, time in notes]
+
+def generate_sample_data(parsed, sample_rate, amplitude, wavetype):
+    """
+    Generate 16-bit PCM samples for parsed PTTTL data. Each note is generated
+    as a whole array, and tracks are mixed with array operations.
+
+    :param list parsed: parsed PTTTL data, as returned by\
+        text_game_maker.ptttl.ptttl_parser.PTTTLParser.parse
+    :param int sample_rate: sample rate in Hz
+    :param float amplitude: amplitude, 0.0 to 1.0
+    :param int wavetype: wave type
+    :return: PCM samples
+    :rtype: bytes
+    """
+    if wavetype not in [SINE_WAVE, SQUARE_WAVE]:
+        raise ValueError("Invalid wave type '%s'" % wavetype)
+
+    tracks = [_track(notes, sample_rate, wavetype) for notes in parsed]
+    if not tracks:
+        return b''
+
+    # Mix longest tracks first, like tones does
+    lengths = [sum(len(part) for part in parts) for parts in tracks]
+    order = sorted(range(len(tracks)), key=lambda i: lengths[i],
+        reverse=True)
+
+    return mix([tracks[i] for i in order], lengths[order[0]], amplitude)
@@ -1,47 +1,87 @@
 import sys
 import os
+import io
 import wave
 import math
 import struct
 import subprocess
-import tempfile
 
 from text_game_maker.ptttl.ptttl_parser import PTTTLParser
 
-sys.path.insert(0, 'tones')
-import tones
-from tones.mixer import Mixer
-
 SAMPLE_RATE = 44100
 MP3_BITRATE = 128
 LAME_BIN = 'lame'
 
-SINE_WAVE = tones.SINE_WAVE
-SQUARE_WAVE = tones.SQUARE_WAVE
+# Same values as tones.SINE_WAVE and tones.SQUARE_WAVE (tones is only
+# imported when the tones synthesis engine is used)
+SINE_WAVE = 0
+SQUARE_WAVE = 1
+
+ATTACK_SECS = 0.01
+DECAY_SECS = 0.01
+
+# Default number of samples in each chunk generated by
+# ptttl_to_sample_chunks (a quarter of a second)
+CHUNK_SAMPLES = SAMPLE_RATE // 4
+
+# Synthesis engines
+ENGINE_TONES = 'tones'
+ENGINE_NUMPY = 'numpy'
 
-def _wav_to_mp3(infile, outfile):
-    args = [LAME_BIN, '--silent', '-b', str(MP3_BITRATE), infile, outfile]
+# Uses the numpy engine if numpy is installed, otherwise the tones engine
+ENGINE_AUTO = 'auto'
+
+_numpy_synth = None
+
+def _wav_to_mp3(wavdata, outfile):
+    # WAV data is piped to lame's stdin, so no temporary file is needed
+    args = [LAME_BIN, '--silent', '-b', str(MP3_BITRATE), '-', outfile]
 
     try:
-        ret = subprocess.call(args)
+        proc = subprocess.Popen(args, stdin=subprocess.PIPE)
     except OSError as e:
-        os.remove(infile)
         raise OSError("Unable to run %s. Is %s installed?"
             % (LAME_BIN, LAME_BIN))
 
-    if ret != 0:
-        os.remove(infile)
-        raise OSError("Error (%d) returned by lame" % ret)
+    proc.communicate(wavdata)
+    if proc.returncode != 0:
+        raise OSError("Error (%d) returned by lame" % proc.returncode)
+
+def _import_numpy_synth():
+    global _numpy_synth
 
-def _generate_sample_data(parsed, amplitude, wavetype):
-    if wavetype not in [tones.SINE_WAVE, tones.SQUARE_WAVE]:
+    if _numpy_synth is None:
+        # numpy is optional, so only import it when the numpy engine is used
+        try:
+            from text_game_maker.ptttl import numpy_synth
+        except ImportError:
+            return None
+
+        _numpy_synth = numpy_synth
+
+    return _numpy_synth
+
+def numpy_available():
+    """
+    Check whether the numpy synthesis engine can be used
+
+    :return: True if numpy is installed
+    :rtype: bool
+    """
+    return _import_numpy_synth() is not None
+
+def _generate_tones_sample_data(parsed, amplitude, wavetype):
+    from tones.mixer import Mixer
+
+    if wavetype not in [SINE_WAVE, SQUARE_WAVE]:
         raise ValueError("Invalid wave type '%s'" % wavetype)
 
     mixer = Mixer(SAMPLE_RATE, amplitude)
     numchannels = 0
 
     for i in range(len(parsed)):
-        mixer.create_track(i, wavetype=wavetype, attack=0.01, decay=0.01)
+        mixer.create_track(i, wavetype=wavetype, attack=ATTACK_SECS,
+            decay=DECAY_SECS)
 
     for i in range(len(parsed)):
         for pitch, time in parsed[i]:
@@ -52,26 +92,236 @@ def _generate_sample_data(parsed, amplitude, wavetype):
 
     return mixer.sample_data()
 
+def _resolve_engine(engine):
+    if engine == ENGINE_AUTO:
+        engine = ENGINE_NUMPY if numpy_available() else ENGINE_TONES
+
+    if engine not in [ENGINE_TONES, ENGINE_NUMPY]:
+        raise ValueError("Invalid synthesis engine '%s'" % engine)
+
+    if (engine == ENGINE_NUMPY) and (not numpy_available()):
+        raise ImportError("numpy is required for the '%s' synthesis engine"
+            % ENGINE_NUMPY)
+
+    return engine
+
+def _generate_sample_data(parsed, amplitude, wavetype, engine=ENGINE_AUTO):
+    if _resolve_engine(engine) == ENGINE_TONES:
+        return _generate_tones_sample_data(parsed, amplitude, wavetype)
+
+    return _numpy_synth.generate_sample_data(parsed, SAMPLE_RATE, amplitude,
+        wavetype)
+
+def _tones_note_samples(pitch, numsamples, wavetype):
+    if pitch <= 0.0:
+        return [0.0] * numsamples
+
+    if numsamples <= 0:
+        return []
+
+    from tones.tone import Tone
+
+    # Same as tones.mixer.Mixer.add_tone, for a track with no vibrato
+    tone = Tone(SAMPLE_RATE, 1.0, wavetype)
+    samples, _, _ = tone.samples(numsamples, pitch, None, ATTACK_SECS,
+        DECAY_SECS)
+    return samples
+
+def _tones_mix(tracks, numsamples, amplitude):
+    from tones.tone import Samples
+
+    # Same as tones.mixer.Mixer.mix
+    weight = 1.0 / len(tracks)
+    mixed = Samples([0.0] * numsamples)
+
+    for parts in tracks:
+        i = 0
+        for part in parts:
+            for sample in part:
+                mixed[i] += (sample * weight) * amplitude
+                i += 1
+
+    return mixed.serialize()
+
+class _TrackReader(object):
+    """
+    Generates samples for a single track, one note at a time
+    """
+    def __init__(self, notes, wavetype, note_samples):
+        self.notes = notes
+        self.wavetype = wavetype
+        self.note_samples = note_samples
+        self.length = sum(int(time * SAMPLE_RATE) for _, time in notes)
+        self.index = 0
+        self.current = []
+        self.pos = 0
+
+    def read(self, numsamples):
+        """
+        Read the next samples from this track
+
+        :param int numsamples: max. number of samples to read
+        :return: list of sample sequences, containing ``numsamples`` samples\
+            in total (or less, if the end of the track is reached)
+        :rtype: list
+        """
+        ret = []
+        while numsamples > 0:
+            if self.pos >= len(self.current):
+                if self.index >= len(self.notes):
+                    break
+
+                pitch, time = self.notes[self.index]
+                self.index += 1
+                self.current = self.note_samples(pitch,
+                    int(time * SAMPLE_RATE), self.wavetype)
+                self.pos = 0
+                continue
+
+            part = self.current[self.pos:self.pos + numsamples]
+            self.pos += len(part)
+            numsamples -= len(part)
+            ret.append(part)
+
+        return ret
+
+def generate_sample_chunks(parsed, amplitude=0.5, wavetype=SINE_WAVE,
+        chunk_samples=CHUNK_SAMPLES, engine=ENGINE_AUTO):
+    """
+    Generator that renders parsed PTTTL data as 16-bit mono PCM samples, one
+    fixed-size chunk at a time. Samples for each note are only generated when
+    they are needed for the current chunk, so memory usage does not depend on
+    the length of the song. The concatenated chunks are identical to the
+    samples returned by ptttl_to_sample_data.
+
+    :param list parsed: parsed PTTTL data, as returned by\
+        text_game_maker.ptttl.ptttl_parser.PTTTLParser.parse
+    :param float amplitude: amplitude, 0.0 to 1.0
+    :param int wavetype: wave type
+    :param int chunk_samples: number of samples in each chunk (the last chunk\
+        may be shorter)
+    :param str engine: synthesis engine to use (see ptttl_to_sample_data)
+    :return: generator yielding PCM sample chunks
+    """
+    if wavetype not in [SINE_WAVE, SQUARE_WAVE]:
+        raise ValueError("Invalid wave type '%s'" % wavetype)
+
+    if _resolve_engine(engine) == ENGINE_TONES:
+        note_samples = _tones_note_samples
+        mix = _tones_mix
+    else:
+        def note_samples(pitch, numsamples, wavetype):
+            return _numpy_synth.note_samples(pitch, numsamples, SAMPLE_RATE,
+                wavetype)
+
+        mix = _numpy_synth.mix
+
+    readers = [_TrackReader(notes, wavetype, note_samples) for notes in parsed]
+    if not readers:
+        return
+
+    # Tracks must be mixed in the same order as a full render, longest first,
+    # so that the sums are identical
+    readers.sort(key=lambda r: r.length, reverse=True)
+
+    remaining = readers[0].length
+    while remaining > 0:
+        numsamples = min(chunk_samples, remaining)
+        tracks = [reader.read(numsamples) for reader in readers]
+        yield mix(tracks, numsamples, amplitude)
+        remaining -= numsamples
+
+def ptttl_to_sample_chunks(ptttl_data, amplitude=0.5,
+        wavetype=SINE_WAVE, chunk_samples=CHUNK_SAMPLES,
+        engine=ENGINE_AUTO):
+    """
+    Generator that converts PTTTL data to 16-bit mono PCM samples, one
+    fixed-size chunk at a time (see generate_sample_chunks)
+
+    :param str ptttl_data: PTTTL data
+    :param float amplitude: amplitude, 0.0 to 1.0
+    :param int wavetype: wave type
+    :param int chunk_samples: number of samples in each chunk
+    :param str engine: synthesis engine to use (see ptttl_to_sample_data)
+    :return: generator yielding PCM sample chunks
+    """
+    parser = PTTTLParser()
+    data = parser.parse(ptttl_data)
+    return generate_sample_chunks(data, amplitude, wavetype, chunk_samples,
+        engine)
+
+def duration_secs(parsed):
+    """
+    Get the duration of parsed PTTTL data
+
+    :param list parsed: parsed PTTTL data, as returned by\
+        text_game_maker.ptttl.ptttl_parser.PTTTLParser.parse
+    :return: duration in seconds
+    :rtype: float
+    """
+    if not parsed:
+        return 0.0
+
+    return max(sum(time for _, time in notes) for notes in parsed)
+
+def write_wav(fh, samples):
+    """
+    Write 16-bit mono PCM samples in WAV format
+
+    :param fh: filename, or file object opened for writing in binary mode
+    :param bytes samples: PCM samples
+    """
+    wav = wave.open(fh, 'wb')
+    try:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples)
+    finally:
+        wav.close()
+
+def samples_to_wav_data(samples):
+    """
+    Convert 16-bit mono PCM samples to WAV data in memory
+
+    :param bytes samples: PCM samples
+    :return: WAV data
+    :rtype: bytes
+    """
+    buf = io.BytesIO()
+    write_wav(buf, samples)
+    return buf.getvalue()
+
 def _generate_wav_file(parsed, amplitude, wavetype, filename):
     samples = _generate_sample_data(parsed, amplitude, wavetype)
-    Mixer(SAMPLE_RATE, amplitude).mix(filename, samples)
+    write_wav(filename, samples)
+
+def ptttl_to_sample_data(ptttl_data, amplitude=0.5, wavetype=SINE_WAVE,
+        engine=ENGINE_AUTO):
+    """
+    Convert PTTTL data to 16-bit mono PCM samples
 
-def ptttl_to_sample_data(ptttl_data, amplitude=0.5, wavetype=tones.SINE_WAVE):
+    :param str ptttl_data: PTTTL data
+    :param float amplitude: amplitude, 0.0 to 1.0
+    :param int wavetype: wave type
+    :param str engine: synthesis engine to use; ENGINE_TONES, ENGINE_NUMPY,\
+        or ENGINE_AUTO to use numpy if it is installed. Both engines generate\
+        the same samples.
+    :return: PCM samples
+    :rtype: bytes
+    """
     parser = PTTTLParser()
     data = parser.parse(ptttl_data)
-    return _generate_sample_data(data, amplitude, wavetype)
+    return _generate_sample_data(data, amplitude, wavetype, engine)
 
-def ptttl_to_wav(ptttl_data, wav_filename, amplitude=0.5, wavetype=tones.SINE_WAVE):
+def ptttl_to_wav(ptttl_data, wav_filename, amplitude=0.5, wavetype=SINE_WAVE):
     parser = PTTTLParser()
     data = parser.parse(ptttl_data)
     samples = _generate_wav_file(data, amplitude, wavetype, wav_filename)
 
-def ptttl_to_mp3(ptttl_data, mp3_filename, amplitude=0.5, wavetype=tones.SINE_WAVE):
-    fd, wavfile = tempfile.mkstemp()
-    ptttl_to_wav(ptttl_data, wavfile, amplitude, wavetype)
-    _wav_to_mp3(wavfile, mp3_filename)
-    os.close(fd)
-    os.remove(wavfile)
+def ptttl_to_mp3(ptttl_data, mp3_filename, amplitude=0.5, wavetype=SINE_WAVE):
+    samples = ptttl_to_sample_data(ptttl_data, amplitude, wavetype)
+    _wav_to_mp3(samples_to_wav_data(samples), mp3_filename)
 
 if __name__ == "__main__":
     if len(sys.argv) != 3:
@@ -84,4 +334,4 @@ if __name__ == "__main__":
     with open(sys.argv[1], 'r') as fh:
         ptttl_data = fh.read()
 
-    ptttl_to_mp3(ptttl_data, sys.argv[2], 0.5, tones.SINE_WAVE)
+    ptttl_to_mp3(ptttl_data, sys.argv[2], 0.5, SINE_WAVE)
@@ -1,3 +1,4 @@
+import re
 import math
 import sys
 
@@ -22,6 +23,31 @@ NOTES = {
     "b": 493.883301256
 }
 
+MIN_OCTAVE = 0
+MAX_OCTAVE = 8
+
+def _build_pitch_table():
+    ret = {}
+    for note, raw_pitch in NOTES.items():
+        for octave in range(MIN_OCTAVE, MAX_OCTAVE + 1):
+            if octave < 4:
+                pitch = raw_pitch / math.pow(2, (4 - octave))
+            elif octave > 4:
+                pitch = raw_pitch * math.pow(2, (octave - 4))
+            else:
+                pitch = raw_pitch
+
+            ret[(note, octave)] = pitch
+
+    return ret
+
+# Pitch in Hz for every note in every valid octave, keyed by (note, octave)
+PITCHES = _build_pitch_table()
+
+# Matches well-formed notes (after stripping and converting to lowercase).
+# Anything else is handled by PTTTLParser._parse_note, which reports errors.
+_NOTE_REGEX = re.compile(r'(\d{1,2})?([a-gp][#b]?)(\.)?(\d)?(\.)?$')
+
 class PTTTLSyntaxError(Exception): pass
 
 class PTTTLValueError(Exception): pass
@@ -65,7 +91,7 @@ def ignore_line(line):
 
 class PTTTLParser(object):
     def _is_valid_octave(self, octave):
-        return octave >= 0 and octave <= 8
+        return octave >= MIN_OCTAVE and octave <= MAX_OCTAVE
 
     def _is_valid_duration(self, duration):
         return duration in [1, 2, 4, 8, 16, 32]
@@ -171,8 +197,6 @@ class PTTTLParser(object):
             if note not in NOTES:
                 invalid_note(orig)
 
-            raw_pitch = NOTES[note]
-
             while i < len(string) and string[i].isdigit():
                 i += 1
 
@@ -185,38 +209,59 @@ class PTTTLParser(object):
                 if not self._is_valid_octave(octave):
                     invalid_octave(note)
 
-            if octave < 4:
-                pitch = raw_pitch / math.pow(2, (4 - octave))
-            elif octave > 4:
-                pitch = raw_pitch * math.pow(2, (octave - 4))
-            else:
-                pitch = raw_pitch
+            pitch = PITCHES[(note, octave)]
 
         if sawdot or ((i < len(string)) and string[-1] == '.'):
             duration += (duration / 2.0)
 
         return duration, pitch
 
-    def _parse_notes(self, track_list, bpm, default, octave):
-        ret = []
+    def _parse_token(self, token, bpm, default, octave, whole):
+        note = token.strip().lower()
+        match = _NOTE_REGEX.match(note)
 
-        for track in track_list:
-            if track.strip() == "":
-                continue
+        if match is not None:
+            dur, name, dot1, octave_digit, dot2 = match.groups()
+            if octave_digit is not None:
+                octave = int(octave_digit)
 
-            buf = []
-            fields = track.split(',')
-            for note in fields:
-                time, pitch = self._parse_note(note.strip(),
-                    bpm, default, octave)
+            if name == 'p':
+                pitch = -1
+            else:
+                pitch = PITCHES.get((name, octave))
 
-                buf.append((pitch, time))
+            if pitch is not None:
+                duration = whole / float(default if dur is None else dur)
+                if dot1 or dot2:
+                    duration += (duration / 2.0)
 
-            ret.append(buf)
+                return pitch, duration
 
-        return ret
+        # Not a well-formed note, parse the slow way to get the right error
+        duration, pitch = self._parse_note(token.strip(), bpm, default, octave)
+        return pitch, duration
+
+    def _parse_track(self, track, bpm, default, octave, whole, tokens, ret):
+        for token in track.split(','):
+            note = tokens.get(token)
+            if note is None:
+                note = self._parse_token(token, bpm, default, octave, whole)
+                tokens[token] = note
+
+            ret.append(note)
 
     def parse(self, ptttl_string):
+        """
+        Parse PTTTL data. Notes are tokenized in a single pass over each
+        track in each block, and appended directly to the list for their
+        track.
+
+        :param str ptttl_string: PTTTL data
+        :return: one list per track, of tuples of the form\
+            ``(pitch, duration)``, where ``pitch`` is in Hz (-1 for a pause)\
+            and ``duration`` is in seconds
+        :rtype: list
+        """
         lines = [x.strip() for x in ptttl_string.split('\n')]
         cleaned = ''.join([x for x in lines if not ignore_line(x)])
 
@@ -227,28 +272,42 @@ class PTTTLParser(object):
         self.name = fields[0].strip()
         bpm, default, octave = self._parse_config_line(fields[1])
 
+        # Time in seconds for a whole note (4 beats) given current BPM
+        whole = (60.0 / float(bpm)) * 4.0
+
         numtracks = -1
         blocks = fields[2].split(';')
         trackdata = []
 
+        # Check the structure of all blocks before parsing any notes
         for block in blocks:
-            tracks = [x.strip().strip(',') for x in block.split('|')]
-            if (numtracks > 0) and (len(tracks) != numtracks):
+            block_tracks = [x.strip().strip(',') for x in block.split('|')]
+            if (numtracks > 0) and (len(block_tracks) != numtracks):
                 raise PTTTLSyntaxError('All blocks must have the same number of'
                     'tracks')
 
-            numtracks = len(tracks)
-            trackdata.append(tracks)
+            numtracks = len(block_tracks)
+            trackdata.append(block_tracks)
+
+        tracks = [[] for _ in range(numtracks)]
+
+        # Songs re-use the same few notes many times, so each distinct token
+        # is only parsed once
+        tokens = {}
 
-        tracks = [''] * numtracks
+        # Parse one track at a time, from all blocks, so that malformed notes
+        # are found in the same order as a track joined across blocks
+        for j in range(numtracks):
+            for block_tracks in trackdata:
+                if (block_tracks[j] == "") and (len(trackdata) > 1):
+                    raise PTTTLSyntaxError("Missing notes after comma")
 
-        for i in range(len(trackdata)):
-            for j in range(numtracks):
-                tracks[j] += trackdata[i][j]
-                if i < (len(trackdata) - 1):
-                    tracks[j] += ","
+                if block_tracks[j].strip() != "":
+                    self._parse_track(block_tracks[j], bpm, default, octave,
+                        whole, tokens, tracks[j])
 
-        return self._parse_notes(tracks, bpm, default, octave)
+        # Tracks with no notes are skipped
+        return [t for t in tracks if t]
 
 if __name__ == "__main__":
     p = PTTTLParser()
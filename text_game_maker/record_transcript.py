@@ -0,0 +1,34 @@
+import os
+import sys
+import argparse
+
+from text_game_maker.transcript.transcript import record_map_from_class
+from text_game_maker.utils.runner import (get_runner_from_filename,
+    MapRunnerError
+)
+
+def main():
+    argparser = argparse.ArgumentParser(description="Run a map, and record a "
+        "transcript of the game session that can be replayed with "
+        "text_game_maker.replay_transcript")
+
+    argparser.add_argument('map_file', help="file containing a MapRunner "
+        "class")
+    argparser.add_argument('transcript_file', help="file to write the "
+        "transcript to")
+    argparser.add_argument('-s', '--seed', type=int, default=None,
+        help="seed for random choices made during the game session (default: "
+        "generated from the current time)")
+
+    args = argparser.parse_args()
+
+    runnerclass = get_runner_from_filename(os.path.abspath(args.map_file))
+    if not runnerclass:
+        raise MapRunnerError("Unable to find a MapRunner class in %s"
+            % args.map_file)
+
+    record_map_from_class(runnerclass, args.transcript_file, args.seed)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import os
+import sys
+import argparse
+
+import text_game_maker
+from text_game_maker.game_objects import __object_model_version__
+from text_game_maker.transcript.transcript import Transcript, replay_transcript
+from text_game_maker.transcript.replay_pool import (replay_pool,
+    find_transcript_files, percentile
+)
+from text_game_maker.utils.runner import (get_runner_from_filename,
+    MapRunnerError
+)
+
+def _replay_single(map_file, filename):
+    runnerclass = get_runner_from_filename(os.path.abspath(map_file))
+    if not runnerclass:
+        raise MapRunnerError("Unable to find a MapRunner class in %s"
+            % map_file)
+
+    transcript = Transcript.load_from_file(filename)
+    if ((transcript.engine_version != text_game_maker.__version__) or
+            (transcript.object_model_version != __object_model_version__)):
+        print("warning: transcript was recorded with text_game_maker %s "
+            "(object model %s), replaying with %s (object model %s)"
+            % (transcript.engine_version, transcript.object_model_version,
+            text_game_maker.__version__, __object_model_version__))
+
+    result = replay_transcript(runnerclass, transcript)
+
+    for turn in result.mismatches():
+        if turn == 0:
+            print("\noutput differs before first input:")
+        else:
+            print("\noutput differs after input %d (%s):"
+                % (turn, transcript.inputs[turn - 1]))
+
+        print(result.diff(turn))
+
+    if result.error is not None:
+        print("\nreplay failed: %s" % result.error)
+
+    turns = len(result.turn_secs)
+    total = sum(result.turn_secs)
+    print("\n%d inputs replayed in %.3fs, slowest turn %.6fs (recorded "
+        "slowest turn %.6fs)" % (turns, total, max(result.turn_secs or [0]),
+        max(transcript.turn_secs or [0])))
+
+    if result.matched:
+        print("output matches transcript")
+        return 0
+
+    print("%d turns with mismatched output" % len(result.mismatches()))
+    return 1
+
+def _replay_many(map_file, filenames, processes, verbose):
+    results = replay_pool(map_file, filenames, processes)
+
+    failed = 0
+    turn_secs = []
+    max_rss = None
+    rebuilt = 0
+
+    for result in results:
+        turn_secs.extend(result.turn_secs)
+        if result.max_rss_bytes is not None:
+            max_rss = max(max_rss or 0, result.max_rss_bytes)
+
+        if not result.snapshot_used:
+            rebuilt += 1
+
+        if result.matched:
+            continue
+
+        failed += 1
+        name = os.path.basename(result.filename)
+        if result.error is not None:
+            print("%s: replay failed (%s)" % (name, result.error))
+        else:
+            print("%s: output differs in %d turns" % (name,
+                len(result.diffs)))
+
+        if verbose:
+            for turn, diff in result.diffs:
+                print("\nturn %d:\n%s\n" % (turn, diff))
+
+    turn_secs.sort()
+    print("\n%d transcripts, %d failed, %d turns" % (len(results), failed,
+        len(turn_secs)))
+
+    if turn_secs:
+        print("turn latency: p50 %.6fs, p90 %.6fs, p99 %.6fs, max %.6fs"
+            % (percentile(turn_secs, 50), percentile(turn_secs, 90),
+            percentile(turn_secs, 99), turn_secs[-1]))
+
+    if max_rss is not None:
+        print("worker memory high-water mark: %.1f MB"
+            % (max_rss / (1024.0 * 1024.0)))
+
+    if rebuilt:
+        print("note: map makes random choices while being built, so it was "
+            "rebuilt for each transcript")
+
+    return 1 if failed else 0
+
+def main():
+    argparser = argparse.ArgumentParser(description="Replay transcripts "
+        "recorded with text_game_maker.record_transcript at full speed, and "
+        "check that the game output matches the recorded output. Multiple "
+        "transcripts are replayed in parallel, using a pool of worker "
+        "processes.")
+
+    argparser.add_argument('map_file', help="file containing the MapRunner "
+        "class that the transcripts were recorded with")
+    argparser.add_argument('transcripts', nargs='+', help="transcript files, "
+        "or directories containing transcript files, to replay")
+    argparser.add_argument('-j', '--processes', type=int, default=None,
+        help="number of worker processes (default: number of CPUs)")
+    argparser.add_argument('-v', '--verbose', action='store_true',
+        help="show output diffs when replaying multiple transcripts")
+
+    args = argparser.parse_args()
+
+    filenames = find_transcript_files(args.transcripts)
+    if not filenames:
+        print("no transcript files found")
+        return 1
+
+    if (len(filenames) == 1) and (args.processes is None):
+        return _replay_single(args.map_file, filenames[0])
+
+    return _replay_many(args.map_file, filenames, args.processes,
+        args.verbose)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+import operator
+from collections import OrderedDict, deque
+
+from text_game_maker.utils import utils
+from text_game_maker.tile import tile
+
+# Number of turns after a person becomes active before they are first updated
+ACTIVATE_TURNS = 2
+
+# NPCs on tiles more than this many moves away from the player's current tile
+# are suspended until the player comes closer
+LOD_RADIUS = 3
+
+@utils.serializable_callback
+def simulation_tick(player, turns):
+    """
+    Scheduled task that updates all active NPCs once per turn
+
+    :param text_game_maker.player.player.Player player: player instance
+    :param int turns: number of turns this task was scheduled for
+    :return: True if any NPCs are still active
+    :rtype: bool
+    """
+    return player.npc_simulation.tick(player)
+
+_seq_key = operator.attrgetter('seq')
+_seq_key_first = operator.itemgetter(0)
+
+class _ActiveNPC(object):
+    __slots__ = ['npc', 'seq', 'tile_id', 'active', 'last_simulated_turn']
+
+    def __init__(self, npc, seq, start):
+        self.npc = npc
+        self.seq = seq
+        self.tile_id = npc.tile_id
+        self.active = True
+
+        # None if the NPC should be updated on the next turn, without
+        # catching up on any missed turns
+        self.last_simulated_turn = None if start is None else start - 1
+
+class NPCSimulation(object):
+    """
+    Updates all active NPCs (e.g. people following the player) in one pass per
+    turn, from a single scheduled task. NPCs are grouped by the tile they are
+    on, so that the player's position is checked once per tile, rather than
+    once per NPC.
+
+    Only NPCs within a few moves of the player are updated (see
+    ``LOD_RADIUS``); NPCs further away are suspended, so that the cost of a
+    turn depends on the player's surroundings and not on the number of NPCs
+    in the game. An NPC that was in range on the previous turn is updated
+    once more on the turn it goes out of range (e.g. because the player was
+    moved several tiles at once), so that it can react to the player
+    leaving, and is suspended after that. When a suspended NPC is within
+    range again, it catches up on all the turns it missed in one step,
+    before it is updated.
+
+    Each active NPC must implement a ``simulate`` method, which is called once
+    per turn, a ``catch_up`` method, which is called with the number of
+    missed turns when a suspended NPC is resumed, and a ``simulation_stopped``
+    method, which is called when the simulation is cleared while the NPC is
+    active:
+
+    ::
+
+        def simulate(self, player, npc_tile, connected, can_see):
+            pass
+
+        def catch_up(self, player, turns):
+            pass
+
+        def simulation_stopped(self, player):
+            pass
+
+    * *player* (text_game_maker.player.player.Player): player instance
+    * *npc_tile* (text_game_maker.tile.tile.Tile): tile the NPC is on
+    * *connected* (bool): True if the NPC is on the player's current tile, or
+      on a tile connected to it
+    * *can_see* (bool): True if the player can see their surroundings
+    * *turns* (int): number of turns the NPC was suspended for
+    """
+    def __init__(self, radius=LOD_RADIUS):
+        """
+        :param int radius: max. number of moves between the player and an\
+            NPC for the NPC to be updated (must be at least 1)
+        """
+        self.radius = max(1, radius)
+        self.task_id = None
+
+        self._seq = 0
+
+        # Maps id(npc) to _ActiveNPC
+        self._npcs = {}
+
+        # Maps tile ID to {id(npc): _ActiveNPC} for all NPCs on that tile
+        self._by_tile = {}
+
+        # IDs of tiles with NPCs that were in range on the last turn, and NPCs
+        # that went out of range before they were due to be updated
+        self._watched_tiles = set()
+        self._watched = []
+
+    def __len__(self):
+        return len(self._npcs)
+
+    def is_active(self, npc):
+        """
+        Check if an NPC is being updated every turn
+
+        :param npc: NPC to check
+        :return: True if NPC is active
+        :rtype: bool
+        """
+        return id(npc) in self._npcs
+
+    def _add(self, npc, start):
+        self.deactivate(npc)
+
+        record = _ActiveNPC(npc, self._seq, start)
+        self._seq += 1
+
+        self._npcs[id(npc)] = record
+        self._by_tile.setdefault(record.tile_id, {})[id(npc)] = record
+
+    def _move(self, record, tile_id):
+        bucket = self._by_tile[record.tile_id]
+        del bucket[id(record.npc)]
+        if not bucket:
+            del self._by_tile[record.tile_id]
+
+        record.tile_id = tile_id
+        self._by_tile.setdefault(tile_id, {})[id(record.npc)] = record
+
+    def activate(self, player, npc, turns=ACTIVATE_TURNS):
+        """
+        Start updating an NPC every turn
+
+        :param text_game_maker.player.player.Player player: player instance
+        :param npc: NPC to update
+        :param int turns: number of turns before NPC is first updated
+        """
+        self._add(npc, player.turns + turns)
+        self._schedule(player)
+
+    def deactivate(self, npc):
+        """
+        Stop updating an NPC
+
+        :param npc: NPC to stop updating
+        """
+        record = self._npcs.pop(id(npc), None)
+        if record is None:
+            return
+
+        record.active = False
+
+        bucket = self._by_tile[record.tile_id]
+        del bucket[id(npc)]
+        if not bucket:
+            del self._by_tile[record.tile_id]
+
+    def clear(self, player):
+        """
+        Stop updating all active NPCs, e.g. because the scheduled task that
+        updates them has been cleared. Each NPC's ``simulation_stopped``
+        method is called, in the order the NPCs were activated.
+
+        :param text_game_maker.player.player.Player player: player instance
+        """
+        records = sorted(self._npcs.values(), key=_seq_key)
+
+        self._npcs.clear()
+        self._by_tile.clear()
+        self._watched_tiles = set()
+        self._watched = []
+        self.task_id = None
+
+        for record in records:
+            record.active = False
+            record.npc.simulation_stopped(player)
+
+    def _schedule(self, player):
+        task = player.scheduled_tasks.get(self.task_id)
+        if (task is None) or (task[0] is not simulation_tick):
+            self.task_id = player.schedule_task(simulation_tick, 1)
+
+    def rebuild(self, player, tiles):
+        """
+        Find all active NPCs after a game has been loaded. Active NPCs are not
+        saved; instead, each person with the ``following`` attribute set is
+        activated again.
+
+        :param text_game_maker.player.player.Player player: player instance
+        :param tiles: iterable of all tiles in the game
+        """
+        self._npcs.clear()
+        self._by_tile.clear()
+        self._watched_tiles = set()
+        self._watched = []
+        self.task_id = None
+
+        for task_id, task in player.scheduled_tasks.items():
+            if task[0] is simulation_tick:
+                self.task_id = task_id
+
+        for t in tiles:
+            for people in t.people.values():
+                for person in people:
+                    if getattr(person, 'following', False):
+                        self._add(person, None)
+
+        # Followers may not be in range of the player's position when the game
+        # was saved, so check them all on the next turn
+        self._watched_tiles = set(self._by_tile)
+
+        if self._npcs:
+            self._schedule(player)
+
+    def nearby_tiles(self, start):
+        """
+        Find all tiles within range of a tile, by number of moves
+
+        :param text_game_maker.tile.tile.Tile start: tile to start from
+        :return: list of tiles within range of ``start``, including ``start``
+        :rtype: [text_game_maker.tile.tile.Tile]
+        """
+        ret = [start]
+        seen = set([start.tile_id])
+        queue = deque([(start, 0)])
+
+        while queue:
+            t, distance = queue.popleft()
+            if distance >= self.radius:
+                continue
+
+            for adjacent in t.iterate_directions():
+                if adjacent.tile_id in seen:
+                    continue
+
+                seen.add(adjacent.tile_id)
+                ret.append(adjacent)
+                queue.append((adjacent, distance + 1))
+
+        return ret
+
+    def tick(self, player):
+        """
+        Update all active NPCs within range of the player for one turn
+
+        :param text_game_maker.player.player.Player player: player instance
+        :return: True if any NPCs are still active
+        :rtype: bool
+        """
+        turns = player.turns
+        current = player.current
+        groups = []
+        watched_tiles = set()
+
+        for t in self.nearby_tiles(current):
+            watched_tiles.add(t.tile_id)
+            bucket = self._by_tile.get(t.tile_id)
+            if not bucket:
+                continue
+
+            records = sorted(bucket.values(), key=_seq_key)
+            groups.append((records[0].seq, t, records))
+
+        if self._watched or (not self._watched_tiles <= watched_tiles):
+            self._add_leaving(turns, watched_tiles, groups)
+
+        self._watched_tiles = watched_tiles
+
+        if not groups:
+            return bool(self._npcs)
+
+        # Update NPCs in the order they were activated, one tile at a time
+        groups.sort(key=_seq_key_first)
+        can_see = player.can_see()
+
+        for _, npc_tile, records in groups:
+            connected = ((npc_tile is current) or
+                current.is_connected_to(npc_tile))
+
+            for record in records:
+                npc = record.npc
+                last = record.last_simulated_turn
+
+                if (last is not None) and (last >= turns):
+                    # Activated too recently
+                    continue
+
+                if (not record.active) or (npc.tile_id != record.tile_id) or (
+                        (last is not None) and (turns - last > 1)):
+                    # Deactivated while updating others, moved by something
+                    # other than the simulation, or resumed after being
+                    # suspended
+                    self._update(player, record, can_see)
+                    continue
+
+                record.last_simulated_turn = turns
+                npc.simulate(player, npc_tile, connected, can_see)
+
+                if record.active and (npc.tile_id != record.tile_id):
+                    self._move(record, npc.tile_id)
+
+        if not self._npcs:
+            self.task_id = None
+            return False
+
+        return True
+
+    def _add_leaving(self, turns, nearby_ids, groups):
+        # NPCs that were in range on the last turn, but are not any more, are
+        # updated one last time, so they can react to the player leaving.
+        # NPCs that are not due to be updated yet stay watched.
+        candidates = {}
+        for tile_id in self._watched_tiles - nearby_ids:
+            candidates.update(self._by_tile.get(tile_id, {}))
+
+        for record in self._watched:
+            candidates[id(record.npc)] = record
+
+        leaving = {}
+        self._watched = []
+
+        for record in candidates.values():
+            if (not record.active) or (record.tile_id in nearby_ids):
+                continue
+
+            last = record.last_simulated_turn
+            if (last is not None) and (last >= turns):
+                self._watched.append(record)
+            else:
+                leaving.setdefault(record.tile_id, []).append(record)
+
+        for tile_id, records in leaving.items():
+            records.sort(key=_seq_key)
+            groups.append((records[0].seq, tile.get_tile_by_id(tile_id),
+                records))
+
+    def _update(self, player, record, can_see):
+        # Update a single NPC, without using any per-tile results
+        npc = record.npc
+        if not record.active:
+            return
+
+        if npc.tile_id != record.tile_id:
+            self._move(record, npc.tile_id)
+
+        last = record.last_simulated_turn
+        record.last_simulated_turn = player.turns
+
+        if (last is not None) and (player.turns - last > 1):
+            npc.catch_up(player, player.turns - last - 1)
+            if not record.active:
+                return
+
+        npc_tile = tile.get_tile_by_id(npc.tile_id)
+        connected = ((npc_tile is player.current) or
+            player.current.is_connected_to(npc_tile))
+        npc.simulate(player, npc_tile, connected, can_see)
+
+        if record.active and (npc.tile_id != record.tile_id):
+            self._move(record, npc.tile_id)
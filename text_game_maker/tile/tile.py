@@ -2,7 +2,9 @@ import copy
 
 from text_game_maker.utils import utils
 from text_game_maker.materials.materials import get_properties
-from text_game_maker.game_objects.base import GameEntity, serialize, deserialize
+from text_game_maker.game_objects.base import (GameEntity, LocationList,
+    VersionedAttribute, serialize, deserialize, next_version
+)
 from text_game_maker.game_objects.items import Lockpick
 from text_game_maker.event.event import Event
 
@@ -49,6 +51,15 @@ def get_tile_by_id(tile_id):
 
     return _tiles[tile_id]
 
+def iterate_tiles():
+    """
+    Iterate over all registered tiles
+
+    :return: iterator yielding all registered tile instances
+    """
+    for tile_id in list(_tiles):
+        yield _tiles[tile_id]
+
 def reverse_direction(direction):
     """
     Returns the opposite direction for a given direction, e.g. "north" becomes
@@ -152,6 +163,12 @@ def builder(tiledata, start_tile_id, version, clear_old_tiles=True):
 
     return tiles[start_tile_id]
 
+class _TileAttribute(VersionedAttribute):
+    def __set__(self, obj, value):
+        attrs = obj.__dict__
+        attrs[self.name] = value
+        attrs['_version'] = next_version()
+
 class Tile(GameEntity):
     """
     Represents a single 'tile' or 'room' in the game
@@ -163,6 +180,16 @@ class Tile(GameEntity):
         "on the ground"
     ]
 
+    # Changing any of these attributes changes the description of this tile,
+    # or of the tiles adjacent to it
+    name = _TileAttribute('name')
+    description = _TileAttribute('description')
+    dark = _TileAttribute('dark')
+    north = _TileAttribute('north')
+    south = _TileAttribute('south')
+    east = _TileAttribute('east')
+    west = _TileAttribute('west')
+
     def __init__(self, name=None, description=None):
         """
         Initialise a Tile instance
@@ -172,13 +199,16 @@ class Tile(GameEntity):
             the room e.g. "a dark, scary cellar with blah blah blah... "
         """
 
+        self._version = next_version()
+        self._description_cache = {}
+
         super(Tile, self).__init__()
 
         self.description = ""
         self.name = name
         self.original_name = self.name
-        self.enter_event = Event()
-        self.exit_event = Event()
+        self.enter_event = Event(ENTER_EVENT_KEY)
+        self.exit_event = Event(EXIT_EVENT_KEY)
 
         self.name_from_dir = {
             "north": None,
@@ -207,7 +237,7 @@ class Tile(GameEntity):
         self.dark = False
 
         # Items on this tile
-        self.items = {loc: [] for loc in self.default_locations}
+        self.items = {loc: LocationList() for loc in self.default_locations}
 
         # People on this tile
         self.people = {}
@@ -285,6 +315,66 @@ class Tile(GameEntity):
 
         return name in self.name
 
+    def touch(self):
+        """
+        Called when an attribute that affects how this tile is described has
+        changed. Changes the version of this tile.
+        """
+        self._version = next_version()
+
+    def cached_description(self, name, key, func):
+        """
+        Get a description of this tile, built by calling a function only if
+        the key has changed since the last time the same description was built
+
+        :param str name: name of description
+        :param key: key for the current state of this tile, e.g. as returned\
+            by description_key(). If None, the description is not cached.
+        :param func: function to build the description, takes no arguments
+        :return: description
+        :rtype: str
+        """
+        if key is None:
+            return func()
+
+        cached = self._description_cache.get(name)
+        if (cached is not None) and (cached[0] == key):
+            return cached[1]
+
+        ret = func()
+        self._description_cache[name] = (key, ret)
+        return ret
+
+    def _locations_key(self, locations):
+        ret = []
+        for loc in locations:
+            version = getattr(locations[loc], 'version', None)
+            if version is None:
+                # Not a LocationList, so changes can't be detected
+                return None
+
+            ret.append((loc, version))
+
+        return tuple(ret)
+
+    def _summary_key(self):
+        return (self._version,) + tuple(getattr(t, '_version', None)
+            for t in [self.north, self.south, self.east, self.west])
+
+    def description_key(self):
+        """
+        Get a key that changes whenever anything that can be seen on this tile
+        changes, including the names of adjacent tiles
+
+        :return: key, or None if changes can't be detected
+        """
+        items = self._locations_key(self.items)
+        people = self._locations_key(self.people)
+        if (items is None) or (people is None):
+            return None
+
+        return (self._summary_key(), items, people)
+
     @property
     def map_identifier(self):
         if self.name in ["", None]:
@@ -380,7 +470,15 @@ class Tile(GameEntity):
 
         if PEOPLE_KEY in data:
             for name in data[PEOPLE_KEY]:
-                self.people[name] = deserialize(data[PEOPLE_KEY][name], version)
+                people = LocationList(
+                    deserialize(data[PEOPLE_KEY][name], version))
+
+                # People must know which list they are in, so that changing
+                # their name invalidates cached descriptions of this tile
+                for person in people:
+                    person.home = people
+
+                self.people[name] = people
 
             del data[PEOPLE_KEY]
 
@@ -525,7 +623,9 @@ class Tile(GameEntity):
         :rtype: str
         """
 
-        return self._item_descriptions(self.items, lambda x: x.scenery)
+        return self.cached_description('scene',
+            self._locations_key(self.items),
+            lambda: self._item_descriptions(self.items, lambda x: x.scenery))
 
     def describe_items(self):
         """
@@ -535,7 +635,10 @@ class Tile(GameEntity):
         :rtype: str
         """
 
-        return self._item_descriptions(self.items, lambda x: not x.scenery)
+        return self.cached_description('items',
+            self._locations_key(self.items),
+            lambda: self._item_descriptions(self.items,
+                lambda x: not x.scenery))
 
     def describe_people(self):
         """
@@ -545,7 +648,9 @@ class Tile(GameEntity):
         :rtype: str
         """
 
-        return self._item_descriptions(self.people)
+        return self.cached_description('people',
+            self._locations_key(self.people),
+            lambda: self._item_descriptions(self.people))
 
     def add_item(self, item):
         """
@@ -555,7 +660,7 @@ class Tile(GameEntity):
         :return: the added item
         """
         if item.location not in self.items:
-            self.items[item.location] = []
+            self.items[item.location] = LocationList()
 
         return item.move(self.items[item.location])
 
@@ -566,7 +671,7 @@ class Tile(GameEntity):
         :param text_game_maker.game_objects.person.Person: person to add
         """
         if person.location not in self.people:
-            self.people[person.location] = []
+            self.people[person.location] = LocationList()
 
         if person in self.people[person.location]:
             return
@@ -582,6 +687,10 @@ class Tile(GameEntity):
         :return: description of all available directions from this tile
         :rtype: str
         """
+        return self.cached_description('summary', self._summary_key(),
+            self._summary)
+
+    def _summary(self):
         ret = []
 
         north = self._get_name(self.north, 'north')
@@ -0,0 +1,232 @@
+import os
+import random
+import multiprocessing
+
+from text_game_maker.builder import map_builder
+from text_game_maker.builder.map_bundle import UTILS_STATE_KEYS
+from text_game_maker.event import event_bus
+from text_game_maker.player import player
+from text_game_maker.utils import utils
+from text_game_maker.utils.runner import (get_runner_from_filename,
+    build_map_from_class, reset_global_state, MapRunnerError
+)
+from text_game_maker.transcript.transcript import (Transcript, replay_builder,
+    replay_transcript
+)
+
+try:
+    import resource
+except ImportError:
+    # Not available on windows
+    resource = None
+
+# Seed used to build the map in each worker process. Any seed will do; maps
+# are only snapshotted if building them does not make any random choices.
+BUILD_SEED = 0
+
+TRANSCRIPT_SUFFIX = '.json'
+
+class MapSnapshot(object):
+    """
+    Snapshot of a map that has been built but not run, which can be restored
+    onto the same builder instance any number of times. Restoring is much
+    faster than building the map again.
+    """
+    def __init__(self, builder):
+        """
+        :param text_game_maker.builder.map_builder.MapBuilder builder: built\
+            map to snapshot
+        """
+        builder.player.start = builder.start
+        builder.player.current = builder.start
+
+        self.player_data = builder.player.save_to_string(compression=False)
+        self.new_game_handlers = builder.player.new_game_event.get_handlers()
+        self.command_handlers = [(cmd, cmd.event.get_handlers())
+            for cmd in builder.parser.get_commands()]
+
+        self.event_bus = event_bus.get_event_bus().snapshot()
+        self.utils_state = {k: utils.info[k] for k in UTILS_STATE_KEYS}
+        self.wrap_width = utils.wrapper.width
+
+    def restore(self, builder, seed):
+        """
+        Restore this snapshot, and re-seed the builder for a new game session
+
+        :param text_game_maker.builder.map_builder.MapBuilder builder: builder\
+            instance the snapshot was taken from
+        :param int seed: seed for the new game session
+        """
+        del utils.sequence[:]
+        del utils.saved_prints[:]
+        utils.info.update(self.utils_state)
+        utils.wrapper.width = self.wrap_width
+        map_builder.info['debug_next'] = False
+
+        for cmd, handlers in self.command_handlers:
+            cmd.event.set_handlers(handlers)
+
+        event_bus.get_event_bus().restore(self.event_bus)
+
+        # Loading the player also restores all tiles and craftables
+        builder.player = player.load_from_string(self.player_data,
+            compression=False)
+        builder.player.new_game_event.set_handlers(self.new_game_handlers)
+        builder.start = builder.player.start
+        builder.reset_state_data = None
+
+        builder.seed = seed
+        builder.rng.seed(seed)
+        random.seed(seed)
+        utils.set_rng(builder.rng)
+
+def build_uses_rng(builder, seed):
+    """
+    Check whether any random choices were made while building a map, in which
+    case the built map depends on the seed and cannot be snapshotted
+
+    :param text_game_maker.builder.map_builder.MapBuilder builder: map that\
+        was just built
+    :param int seed: seed the map was built with
+    :return: True if any random choices were made
+    :rtype: bool
+    """
+    fresh = random.Random(seed).getstate()
+    return (builder.rng.getstate() != fresh) or (random.getstate() != fresh)
+
+class _WorkerState(object):
+    runnerclass = None
+    builder = None
+    snapshot = None
+
+def _discard_output(text):
+    pass
+
+def _init_worker(map_filename):
+    utils.set_printfunc(_discard_output)
+
+    runnerclass = get_runner_from_filename(map_filename)
+    if not runnerclass:
+        raise MapRunnerError("Unable to find a MapRunner class in %s"
+            % map_filename)
+
+    _WorkerState.runnerclass = runnerclass
+
+    reset_global_state()
+    builder = build_map_from_class(runnerclass, BUILD_SEED)
+    if not build_uses_rng(builder, BUILD_SEED):
+        _WorkerState.builder = builder
+        _WorkerState.snapshot = MapSnapshot(builder)
+
+def _max_rss_bytes():
+    if resource is None:
+        return None
+
+    # ru_maxrss is in kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def _replay_worker(filename):
+    transcript = Transcript.load_from_file(filename)
+
+    if _WorkerState.snapshot is None:
+        result = replay_transcript(_WorkerState.runnerclass, transcript)
+    else:
+        _WorkerState.snapshot.restore(_WorkerState.builder, transcript.seed)
+        result = replay_builder(_WorkerState.builder, transcript)
+
+    diffs = []
+    for turn in result.mismatches():
+        diffs.append((turn, result.diff(turn)))
+
+    error = None if result.error is None else str(result.error)
+    return (filename, diffs, error, result.turn_secs, _max_rss_bytes(),
+        _WorkerState.snapshot is not None)
+
+class PoolReplayResult(object):
+    """
+    Result of replaying a transcript in a worker process
+    """
+    def __init__(self, filename, diffs, error, turn_secs, max_rss_bytes,
+            snapshot_used):
+        self.filename = filename
+
+        # list of tuples of the form (turn, diff), see
+        # text_game_maker.transcript.transcript.ReplayResult
+        self.diffs = diffs
+        self.error = error
+        self.turn_secs = turn_secs
+
+        # Memory high-water mark of the worker process after replaying this
+        # transcript (None if not available)
+        self.max_rss_bytes = max_rss_bytes
+
+        # False if the map had to be rebuilt for this transcript
+        self.snapshot_used = snapshot_used
+
+    @property
+    def matched(self):
+        return (self.error is None) and (not self.diffs)
+
+def find_transcript_files(paths):
+    """
+    Find transcript files in a list of files and directories. Directories are
+    searched for files ending in ``.json``.
+
+    :param [str] paths: transcript files and directories
+    :return: list of transcript file paths
+    :rtype: [str]
+    """
+    ret = []
+    for path in paths:
+        if not os.path.isdir(path):
+            ret.append(path)
+            continue
+
+        for f in sorted(os.listdir(path)):
+            if f.endswith(TRANSCRIPT_SUFFIX):
+                ret.append(os.path.join(path, f))
+
+    return ret
+
+def replay_pool(map_filename, filenames, processes=None):
+    """
+    Replay transcript files in parallel, using a pool of worker processes. Each
+    worker builds the map once, and restores a snapshot of the built map for
+    each transcript (if the map makes random choices while being built, it is
+    rebuilt for each transcript instead).
+
+    :param str map_filename: file containing the MapRunner class that the\
+        transcripts were recorded with
+    :param [str] filenames: transcript files to replay
+    :param int processes: number of worker processes to use (if None, the\
+        number of CPUs is used)
+    :return: list of results, in the same order as ``filenames``
+    :rtype: [text_game_maker.transcript.replay_pool.PoolReplayResult]
+    """
+    if not filenames:
+        return []
+
+    pool = multiprocessing.Pool(processes, _init_worker,
+        (os.path.abspath(map_filename),))
+
+    try:
+        ret = pool.map(_replay_worker, filenames, chunksize=8)
+    finally:
+        pool.close()
+        pool.join()
+
+    return [PoolReplayResult(*r) for r in ret]
+
+def percentile(sorted_values, pct):
+    """
+    Get a percentile from a sorted list of values (nearest-rank method)
+
+    :param list sorted_values: sorted values
+    :param float pct: percentile (0-100)
+    :return: value at the given percentile (None if no values)
+    """
+    if not sorted_values:
+        return None
+
+    i = int(round((pct / 100.0) * (len(sorted_values) - 1)))
+    return sorted_values[i]
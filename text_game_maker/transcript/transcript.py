@@ -0,0 +1,306 @@
+import json
+import difflib
+from timeit import default_timer
+
+import text_game_maker
+from text_game_maker.game_objects import __object_model_version__
+from text_game_maker.builder.map_builder import StopWaitingForInput
+from text_game_maker.utils import utils
+from text_game_maker.utils.runner import (build_map_from_class,
+    reset_global_state
+)
+
+TRANSCRIPT_FORMAT_VERSION = 1
+
+class Transcript(object):
+    """
+    Record of a single game session; the seed used for the session, every line
+    of input entered by the player, all game output, and the time taken to
+    process each line of input
+    """
+    def __init__(self, seed):
+        """
+        :param int seed: seed used for the game session
+        """
+        self.seed = seed
+        self.engine_version = text_game_maker.__version__
+        self.object_model_version = __object_model_version__
+        self.inputs = []
+
+        # outputs[0] is all output printed before the first line of input,
+        # and outputs[i] is all output printed after the i'th line of input
+        self.outputs = [[]]
+        self.turn_secs = []
+
+    def to_dict(self):
+        return {
+            'format_version': TRANSCRIPT_FORMAT_VERSION,
+            'engine_version': self.engine_version,
+            'object_model_version': self.object_model_version,
+            'seed': self.seed,
+            'inputs': self.inputs,
+            'outputs': self.outputs,
+            'turn_secs': self.turn_secs
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data['format_version'] != TRANSCRIPT_FORMAT_VERSION:
+            raise ValueError("unsupported transcript format version %s"
+                % data['format_version'])
+
+        ret = cls(data['seed'])
+        ret.engine_version = data['engine_version']
+        ret.object_model_version = data['object_model_version']
+        ret.inputs = data['inputs']
+        ret.outputs = data['outputs']
+        ret.turn_secs = data['turn_secs']
+        return ret
+
+    def save_to_file(self, filename):
+        """
+        Write transcript to a JSON file
+
+        :param str filename: name of file to write
+        """
+        with open(filename, 'w') as fh:
+            json.dump(self.to_dict(), fh)
+
+    @classmethod
+    def load_from_file(cls, filename):
+        """
+        Read transcript from a JSON file
+
+        :param str filename: name of file to read
+        :return: loaded transcript
+        :rtype: text_game_maker.transcript.transcript.Transcript
+        """
+        with open(filename, 'r') as fh:
+            return cls.from_dict(json.load(fh))
+
+class TranscriptRecorder(object):
+    """
+    Records input and output of a game session, by wrapping the current input
+    function and observing all game output
+    """
+    def __init__(self, seed):
+        """
+        :param int seed: seed used for the game session
+        """
+        self.transcript = Transcript(seed)
+        self._inputfunc = None
+        self._turn_start = None
+
+    def _end_turn(self):
+        if self._turn_start is not None:
+            self.transcript.turn_secs.append(default_timer() -
+                self._turn_start)
+            self._turn_start = None
+
+    def _on_input(self, prompt):
+        self._end_turn()
+
+        if self._inputfunc is None:
+            # No input function was set, so create the default one
+            utils.set_inputfunc(None)
+            self._inputfunc = utils.get_inputfunc()
+            utils.set_inputfunc(self._on_input)
+
+        ret = self._inputfunc(prompt)
+        if isinstance(ret, StopWaitingForInput):
+            return ret
+
+        self.transcript.inputs.append(ret)
+        self.transcript.outputs.append([])
+        self._turn_start = default_timer()
+        return ret
+
+    def _on_output(self, text):
+        self.transcript.outputs[-1].append(text)
+
+    def start(self):
+        """
+        Start recording
+        """
+        self._inputfunc = utils.info['inputfunc']
+        utils.set_inputfunc(self._on_input)
+        utils.add_output_observer(self._on_output)
+
+    def stop(self):
+        """
+        Stop recording
+
+        :return: recorded transcript
+        :rtype: text_game_maker.transcript.transcript.Transcript
+        """
+        self._end_turn()
+        utils.remove_output_observer(self._on_output)
+        utils.set_inputfunc(self._inputfunc)
+        return self.transcript
+
+class ReplayResult(object):
+    """
+    Result of replaying a transcript
+    """
+    def __init__(self, transcript):
+        self.transcript = transcript
+        self.outputs = [[]]
+        self.turn_secs = []
+        self.error = None
+
+    def mismatches(self):
+        """
+        Get all turns where the replayed output differs from the recorded
+        output
+
+        :return: list of turn indices. Index 0 is output printed before the\
+            first line of input, index i is output printed after the i'th line\
+            of input
+        :rtype: [int]
+        """
+        expected = self.transcript.outputs
+        ret = []
+        for i in range(max(len(expected), len(self.outputs))):
+            exp = expected[i] if i < len(expected) else None
+            act = self.outputs[i] if i < len(self.outputs) else None
+            if exp != act:
+                ret.append(i)
+
+        return ret
+
+    @property
+    def matched(self):
+        return (self.error is None) and (not self.mismatches())
+
+    def diff(self, turn):
+        """
+        Get a unified diff of recorded and replayed output for a single turn
+
+        :param int turn: turn index, as returned by mismatches()
+        :return: diff text
+        :rtype: str
+        """
+        expected = self.transcript.outputs
+        exp = expected[turn] if turn < len(expected) else []
+        act = self.outputs[turn] if turn < len(self.outputs) else []
+        exp = '\n'.join(exp).splitlines()
+        act = '\n'.join(act).splitlines()
+
+        return '\n'.join(difflib.unified_diff(exp, act, 'recorded',
+            'replayed', lineterm=''))
+
+class _EndOfTranscript(Exception):
+    pass
+
+class _Replayer(object):
+    def __init__(self, transcript):
+        self.result = ReplayResult(transcript)
+        self.inputs = transcript.inputs
+        self.index = 0
+        self.turn_start = None
+
+    def _end_turn(self):
+        if self.turn_start is not None:
+            self.result.turn_secs.append(default_timer() - self.turn_start)
+            self.turn_start = None
+
+    def on_input(self, prompt):
+        self._end_turn()
+        if self.index >= len(self.inputs):
+            # Raise instead of returning StopWaitingForInput, since the game
+            # may be waiting for input somewhere other than the main loop,
+            # e.g. in a conversation with an NPC
+            raise _EndOfTranscript()
+
+        ret = self.inputs[self.index]
+        self.index += 1
+        self.result.outputs.append([])
+        self.turn_start = default_timer()
+        return ret
+
+    def on_output(self, text):
+        self.result.outputs[-1].append(text)
+
+def _discard_output(text):
+    pass
+
+def replay_builder(builder, transcript):
+    """
+    Replay a transcript on a map that has already been built with the seed
+    from the transcript. Game output is checked against the transcript, and
+    is not displayed. Printing one character at a time is disabled.
+
+    :param text_game_maker.builder.map_builder.MapBuilder builder: built map
+    :param text_game_maker.transcript.transcript.Transcript transcript:\
+        transcript to replay
+    :return: replay result
+    :rtype: text_game_maker.transcript.transcript.ReplayResult
+    """
+    replayer = _Replayer(transcript)
+
+    old_inputfunc = utils.info['inputfunc']
+    old_printfunc = utils.info['printfunc']
+    old_delay_disabled = utils.info['print_delay_disabled']
+
+    utils.set_inputfunc(replayer.on_input)
+    utils.set_printfunc(_discard_output)
+    utils.set_print_delay_disabled(True)
+    utils.add_output_observer(replayer.on_output)
+
+    try:
+        builder.run_game()
+    except (_EndOfTranscript, SystemExit):
+        # Ran out of input, or player quit the game
+        pass
+    except Exception as e:
+        replayer.result.error = e
+    finally:
+        replayer._end_turn()
+        utils.remove_output_observer(replayer.on_output)
+        utils.set_print_delay_disabled(old_delay_disabled)
+        utils.set_printfunc(old_printfunc)
+        utils.set_inputfunc(old_inputfunc)
+
+    return replayer.result
+
+def replay_transcript(classobj, transcript):
+    """
+    Build a map from a map runner class, using the seed from a transcript,
+    and replay the transcript
+
+    :param classobj: map runner class object the transcript was recorded with
+    :param text_game_maker.transcript.transcript.Transcript transcript:\
+        transcript to replay
+    :return: replay result
+    :rtype: text_game_maker.transcript.transcript.ReplayResult
+    """
+    reset_global_state()
+    builder = build_map_from_class(classobj, transcript.seed)
+    return replay_builder(builder, transcript)
+
+def record_map_from_class(classobj, filename, seed=None):
+    """
+    Create an instance of the given map runner class, run it, and record a
+    transcript of the game session
+
+    :param classobj: map runner class object
+    :param str filename: name of file to write transcript to when the game\
+        session ends
+    :param int seed: seed for random choices made during the game session\
+        (if None, a seed is generated from the current time)
+    :return: recorded transcript
+    :rtype: text_game_maker.transcript.transcript.Transcript
+    """
+    builder = build_map_from_class(classobj, seed)
+    recorder = TranscriptRecorder(builder.seed)
+    recorder.start()
+
+    try:
+        builder.run_game()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        transcript = recorder.stop()
+        transcript.save_to_file(filename)
+
+    return transcript
@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import zlib
+import argparse
+import multiprocessing
+
+from text_game_maker.game_objects import __object_model_version__
+from text_game_maker.builder import map_builder
+from text_game_maker.player import player
+from text_game_maker.utils import utils
+from text_game_maker.utils.runner import (get_runner_from_filename,
+    build_map_from_class, MapRunnerError
+)
+
+SAVE_FILE_PREFIX = 'save_state_'
+TEMP_SUFFIX = '.tmp'
+BACKUP_SUFFIX = '.bak'
+
+STATUS_UPGRADED = 'upgraded'
+STATUS_CURRENT = 'current'
+STATUS_FAILED = 'failed'
+
+class _WorkerConfig(object):
+    backup = False
+
+def _discard_output(text):
+    pass
+
+def _init_worker(map_filename, backup):
+    # Importing the map file and building the map registers all game object
+    # classes, serializable callbacks and object model migrations used by the
+    # map, which are all needed to load its save files
+    utils.set_printfunc(_discard_output)
+    _WorkerConfig.backup = backup
+
+    runnerclass = get_runner_from_filename(map_filename)
+    if not runnerclass:
+        raise MapRunnerError("Unable to find a MapRunner class in %s"
+            % map_filename)
+
+    build_map_from_class(runnerclass)
+
+def _replace_file(src, dest):
+    if hasattr(os, 'replace'):
+        os.replace(src, dest)
+        return
+
+    if os.path.exists(dest):
+        os.remove(dest)
+
+    os.rename(src, dest)
+
+def upgrade_save_file(filename, backup=False):
+    """
+    Upgrade a single save file to the current object model version. Save files
+    that are already at the current version are not modified.
+
+    :param str filename: save file to upgrade
+    :param bool backup: if True, the original file will be kept with a\
+        ``.bak`` extension
+    :return: tuple of the form ``(status, version)``, where ``status`` is\
+        ``'upgraded'`` or ``'current'`` and ``version`` is the object model\
+        version the save file was created with
+    :rtype: tuple
+    """
+    with open(filename, 'rb') as fh:
+        strdata = zlib.decompress(fh.read()).decode("utf-8")
+
+    version = json.loads(strdata)[player.OBJECT_VERSION_KEY]
+    if version == __object_model_version__:
+        return STATUS_CURRENT, version
+
+    upgraded = player.load_from_string(strdata, compression=False)
+    tempfile = filename + TEMP_SUFFIX
+
+    with open(tempfile, 'wb') as fh:
+        fh.write(upgraded.save_to_string())
+
+    if backup:
+        _replace_file(filename, filename + BACKUP_SUFFIX)
+
+    _replace_file(tempfile, filename)
+    return STATUS_UPGRADED, version
+
+def _upgrade_worker(filename):
+    try:
+        status, version = upgrade_save_file(filename, _WorkerConfig.backup)
+    except Exception as e:
+        return filename, STATUS_FAILED, None, str(e)
+
+    return filename, status, version, None
+
+def find_save_files(save_dir):
+    """
+    Find all save files in a directory
+
+    :param str save_dir: directory to search
+    :return: list of save file paths
+    :rtype: [str]
+    """
+    ret = []
+    for f in sorted(os.listdir(save_dir)):
+        if not f.startswith(SAVE_FILE_PREFIX):
+            continue
+
+        if f.endswith(TEMP_SUFFIX) or f.endswith(BACKUP_SUFFIX):
+            continue
+
+        path = os.path.join(save_dir, f)
+        if os.path.isfile(path):
+            ret.append(path)
+
+    return ret
+
+def upgrade_save_dir(map_filename, save_dir, processes=None, backup=False):
+    """
+    Upgrade all save files in a directory to the current object model version,
+    using a pool of worker processes
+
+    :param str map_filename: file containing the MapRunner class that the\
+        save files were created with
+    :param str save_dir: directory containing save files
+    :param int processes: number of worker processes to use (if None, the\
+        number of CPUs is used)
+    :param bool backup: if True, original files will be kept with a ``.bak``\
+        extension
+    :return: list of tuples of the form ``(filename, status, version, error)``
+    :rtype: [tuple]
+    """
+    files = find_save_files(save_dir)
+    if not files:
+        return []
+
+    pool = multiprocessing.Pool(processes, _init_worker,
+        (os.path.abspath(map_filename), backup))
+
+    try:
+        ret = list(pool.imap_unordered(_upgrade_worker, files))
+    finally:
+        pool.close()
+        pool.join()
+
+    return sorted(ret)
+
+def main():
+    argparser = argparse.ArgumentParser(description="Upgrade all save files "
+        "in a directory to the current object model version (%s)"
+        % __object_model_version__)
+
+    argparser.add_argument('map_file', help="file containing the MapRunner "
+        "class that the save files were created with")
+    argparser.add_argument('save_dir', nargs='?',
+        default=map_builder._get_save_dir(), help="directory containing save "
+        "files (default: %(default)s)")
+    argparser.add_argument('-j', '--processes', type=int, default=None,
+        help="number of worker processes (default: number of CPUs)")
+    argparser.add_argument('-b', '--backup', action='store_true',
+        help="keep original save files with a '%s' extension" % BACKUP_SUFFIX)
+
+    args = argparser.parse_args()
+
+    if not os.path.isdir(args.save_dir):
+        print("%s: no such directory" % args.save_dir)
+        return 1
+
+    results = upgrade_save_dir(args.map_file, args.save_dir, args.processes,
+        args.backup)
+
+    failed = 0
+    for filename, status, version, error in results:
+        name = os.path.basename(filename)
+        if status == STATUS_FAILED:
+            failed += 1
+            print("%s: failed (%s)" % (name, error))
+        elif status == STATUS_UPGRADED:
+            print("%s: upgraded from %s to %s" % (name, version,
+                __object_model_version__))
+        else:
+            print("%s: already at %s" % (name, version))
+
+    print("\n%d save files, %d failed" % (len(results), failed))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+import os
+import json
+import threading
+from collections import deque
+from timeit import default_timer
+
+# Names of the stages timed for each turn
+STAGE_TURN = 'turn'
+STAGE_NORMALIZE_INPUT = 'normalize_input'
+STAGE_BADWORD_CHECK = 'badword_check'
+STAGE_RUN_PARSER = 'run_parser'
+STAGE_COMMAND_CALLBACK = 'command_callback'
+STAGE_COMMAND_EVENT = 'command_event'
+STAGE_SCHEDULER_TICK = 'scheduler_tick'
+STAGE_DEFERRED_EVENTS = 'deferred_events'
+STAGE_WRAP_OUTPUT = 'wrap_output'
+STAGE_PRINT_OUTPUT = 'print_output'
+STAGE_PLAY_SOUND = 'play_sound'
+
+# Default max. number of trace events held for a session. Oldest events are
+# discarded first.
+DEFAULT_MAX_TRACE_EVENTS = 100000
+
+# Number of histogram buckets. Bucket 0 counts durations under 1 microsecond,
+# bucket i counts durations in the range [2^(i - 1), 2^i) microseconds, and
+# the last bucket counts everything above
+NUM_BUCKETS = 32
+
+info = {
+    'enabled': False,
+    'session': None,
+    'max_trace_events': DEFAULT_MAX_TRACE_EVENTS
+}
+
+class Histogram(object):
+    """
+    Histogram of durations, with log2-spaced buckets in microseconds
+    """
+    def __init__(self):
+        self.buckets = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total_secs = 0.0
+        self.min_secs = None
+        self.max_secs = 0.0
+
+    def add(self, secs):
+        """
+        Add a duration to the histogram
+
+        :param float secs: duration in seconds
+        """
+        usecs = int(secs * 1000000.0)
+        self.buckets[min(usecs.bit_length(), NUM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total_secs += secs
+
+        if (self.min_secs is None) or (secs < self.min_secs):
+            self.min_secs = secs
+
+        if secs > self.max_secs:
+            self.max_secs = secs
+
+    @property
+    def mean_secs(self):
+        if self.count == 0:
+            return 0.0
+
+        return self.total_secs / self.count
+
+    def percentile(self, pct):
+        """
+        Get the approximate duration below which a given percentage of all
+        durations in this histogram fall. The result is the upper bound of the
+        bucket containing the percentile, clamped to the max. duration.
+
+        :param float pct: percentile (0-100)
+        :return: duration in seconds
+        :rtype: float
+        """
+        if self.count == 0:
+            return 0.0
+
+        target = (pct / 100.0) * self.count
+        seen = 0
+        for i in range(NUM_BUCKETS):
+            seen += self.buckets[i]
+            if seen >= target:
+                return min((2 ** i) / 1000000.0, self.max_secs)
+
+        return self.max_secs
+
+    def to_dict(self):
+        """
+        Get a summary of this histogram as a serializable dict
+
+        :return: histogram summary
+        :rtype: dict
+        """
+        return {
+            'count': self.count,
+            'total_secs': self.total_secs,
+            'mean_secs': self.mean_secs,
+            'min_secs': self.min_secs or 0.0,
+            'max_secs': self.max_secs,
+            'p50_secs': self.percentile(50),
+            'p90_secs': self.percentile(90),
+            'p99_secs': self.percentile(99),
+            'buckets_usecs': self.buckets
+        }
+
+class Session(object):
+    """
+    Holds the histograms and trace events recorded for a single game session
+    """
+    def __init__(self, max_trace_events=DEFAULT_MAX_TRACE_EVENTS):
+        self.start = default_timer()
+        self.pid = os.getpid()
+        self.histograms = {}
+        self.trace_events = deque(maxlen=max_trace_events)
+
+    def record(self, name, start, end):
+        """
+        Record a completed stage
+
+        :param str name: stage name
+        :param float start: stage start time, from timeit.default_timer
+        :param float end: stage end time, from timeit.default_timer
+        """
+        if name not in self.histograms:
+            self.histograms[name] = Histogram()
+
+        self.histograms[name].add(end - start)
+        self.trace_events.append({
+            'name': name,
+            'cat': 'turn',
+            'ph': 'X',
+            'ts': (start - self.start) * 1000000.0,
+            'dur': (end - start) * 1000000.0,
+            'pid': self.pid,
+            'tid': threading.current_thread().ident
+        })
+
+    def summary(self):
+        """
+        Get a summary of all histograms in this session
+
+        :return: dict of histogram summaries, keyed by stage name
+        :rtype: dict
+        """
+        return {name: self.histograms[name].to_dict()
+            for name in self.histograms}
+
+    def chrome_trace(self):
+        """
+        Get all trace events in this session, in the Chrome trace event format
+        (load in chrome://tracing or https://ui.perfetto.dev)
+
+        :return: trace data
+        :rtype: dict
+        """
+        return {
+            'traceEvents': list(self.trace_events),
+            'displayTimeUnit': 'ms'
+        }
+
+    def dump_chrome_trace(self, filename):
+        """
+        Write all trace events in this session to a file, in the Chrome trace
+        event format
+
+        :param str filename: name of file to write
+        """
+        with open(filename, 'w') as fh:
+            json.dump(self.chrome_trace(), fh)
+
+class _Stage(object):
+    __slots__ = ['name', 'start']
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = default_timer()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        info['session'].record(self.name, self.start, default_timer())
+        return False
+
+class _NullStage(object):
+    __slots__ = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+_null_stage = _NullStage()
+
+def stage(name):
+    """
+    Get a context manager that times the code it wraps as a named stage of the
+    current turn. When instrumentation is disabled, nothing is recorded.
+
+    ::
+
+        with instrumentation.stage('my_stage'):
+            do_something()
+
+    :param str name: stage name
+    :return: context manager
+    """
+    if not info['enabled']:
+        return _null_stage
+
+    return _Stage(name)
+
+def enable(max_trace_events=DEFAULT_MAX_TRACE_EVENTS):
+    """
+    Enable instrumentation, and start a new session. A new session is also
+    started each time text_game_maker.builder.map_builder.MapBuilder.run_game
+    is called while instrumentation is enabled.
+
+    :param int max_trace_events: max. number of trace events to hold per\
+        session
+    """
+    info['max_trace_events'] = max_trace_events
+    new_session()
+    info['enabled'] = True
+
+def disable():
+    """
+    Disable instrumentation. Data recorded in the current session is kept.
+    """
+    info['enabled'] = False
+
+def is_enabled():
+    """
+    :return: True if instrumentation is enabled
+    :rtype: bool
+    """
+    return info['enabled']
+
+def new_session():
+    """
+    Start a new session, discarding all data recorded in the current session
+
+    :return: new session
+    :rtype: text_game_maker.utils.instrumentation.Session
+    """
+    info['session'] = Session(info['max_trace_events'])
+    return info['session']
+
+def get_session():
+    """
+    Get the current session
+
+    :return: current session (None if instrumentation was never enabled)
+    :rtype: text_game_maker.utils.instrumentation.Session
+    """
+    return info['session']
+
+def get_histograms():
+    """
+    Get the histograms recorded in the current session
+
+    :return: dict of histograms, keyed by stage name
+    :rtype: {str: text_game_maker.utils.instrumentation.Histogram}
+    """
+    if info['session'] is None:
+        return {}
+
+    return info['session'].histograms
+
+def dump_chrome_trace(filename):
+    """
+    Write all trace events in the current session to a file, in the Chrome
+    trace event format
+
+    :param str filename: name of file to write
+    """
+    if info['session'] is None:
+        raise RuntimeError("instrumentation has not been enabled")
+
+    info['session'].dump_chrome_trace(filename)
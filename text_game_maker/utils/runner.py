@@ -3,8 +3,12 @@ import os
 import importlib
 import inspect
 
+from text_game_maker.builder import map_builder, map_bundle
 from text_game_maker.builder.map_builder import MapBuilder
+from text_game_maker.crafting import crafting
+from text_game_maker.event import event_bus
 from text_game_maker.parser.parser import CommandParser
+from text_game_maker.utils import utils
 
 class MapRunnerError(Exception):
     pass
@@ -72,18 +76,107 @@ def get_runner_from_filename(filename):
 
     return None
 
-def run_map_from_class(classobj):
+def build_map_from_class(classobj, seed=None):
     """
-    Create an instance of the given map runner class, and run it
-
-    :param classobj: mapp runner class object
+    Create an instance of the given map runner class, and use it to build the
+    parser and the map, without running the game
+
+    :param classobj: map runner class object
+    :param int seed: seed for random choices made during the game session\
+        (if None, a seed is generated from the current time)
+    :return: map builder instance containing the built map
+    :rtype: text_game_maker.builder.map_builder.MapBuilder
     """
     runner = classobj()
     parser = CommandParser()
 
     runner.build_parser(parser)
-    builder = MapBuilder(parser)
+    builder = MapBuilder(parser, seed)
     runner.build_map(builder)
+    return builder
+
+def build_map_from_bundle(classobj, bundle, seed=None):
+    """
+    Create an instance of the given map runner class, use it to build the
+    parser, and load the map from a bundle created by
+    text_game_maker.compile_map instead of building it
+
+    :param classobj: map runner class object the bundle was compiled from
+    :param bundle: name of bundle file to read, or a decoded bundle as\
+        returned by text_game_maker.builder.map_bundle.read_bundle
+    :param int seed: seed for random choices made during the game session\
+        (if None, a seed is generated from the current time)
+    :return: map builder instance containing the loaded map
+    :rtype: text_game_maker.builder.map_builder.MapBuilder
+    """
+    if not isinstance(bundle, dict):
+        bundle = map_bundle.read_bundle(bundle)
+
+    runner = classobj()
+    parser = CommandParser()
+
+    runner.build_parser(parser)
+    builder = MapBuilder(parser, seed)
+    map_bundle.load_bundle(builder, bundle)
+    return builder
+
+def _build_map_from_current_bundle(classobj, seed):
+    # Returns None if there is no current bundle, or if it cannot be used
+    try:
+        source = inspect.getsourcefile(classobj)
+    except TypeError:
+        return None
+
+    if source is None:
+        return None
+
+    filename = map_bundle.get_bundle_filename(source)
+    if not map_bundle.bundle_is_current(filename, source):
+        return None
+
+    try:
+        bundle = map_bundle.read_bundle(filename)
+        return build_map_from_bundle(classobj, bundle, seed)
+    except (IOError, OSError, RuntimeError, map_bundle.MapBundleError) as e:
+        # e.g. the map file was imported under a different module name when
+        # the bundle was compiled, so its callbacks cannot be found
+        sys.stderr.write("Ignoring bundle %s: %s\n" % (filename, e))
+
+    # The bundle may have been partially loaded
+    reset_global_state()
+    return None
+
+def reset_global_state():
+    """
+    Reset global state left behind by a previously built map, so that another
+    map can be built and played in the same process
+    """
+    map_builder.clear_instance()
+    del utils.sequence[:]
+    del utils.saved_prints[:]
+    crafting.craftables.clear()
+    event_bus.get_event_bus().clear()
+
+def run_map_from_class(classobj, seed=None):
+    """
+    Create an instance of the given map runner class, and run it
+
+    If a bundle created by text_game_maker.compile_map exists alongside the
+    file containing the map runner class, and is newer than that file, then
+    the map is loaded from the bundle instead of being built. If the bundle
+    cannot be loaded, it is ignored and the map is built. Only the
+    modification time of the file containing the map runner class is
+    checked; changes to any other modules imported by the map do not cause
+    the bundle to be ignored, so the map must be compiled again after
+    changing them.
+
+    :param classobj: mapp runner class object
+    :param int seed: seed for random choices made during the game session\
+        (if None, a seed is generated from the current time)
+    """
+    builder = _build_map_from_current_bundle(classobj, seed)
+    if builder is None:
+        builder = build_map_from_class(classobj, seed)
 
     try:
         builder.run_game()
@@ -0,0 +1,236 @@
+import sys
+import atexit
+import traceback
+import threading
+from collections import deque
+from timeit import default_timer
+
+# Text printed one character at a time is written in frames, so that at most
+# one write is done per frame, regardless of the delay between characters
+FRAME_SECS = 1.0 / 30.0
+
+def iter_frames(text, chardelay, frame_secs=FRAME_SECS):
+    """
+    Split text into frames, for displaying one character at a time. Can be
+    used by a frontend to schedule slow printing itself, e.g. with one asyncio
+    task per game session:
+
+    ::
+
+        for chunk, secs in typewriter.iter_frames(text, chardelay):
+            send(chunk)
+            await asyncio.sleep(secs)
+
+    :param str text: text to split
+    :param float chardelay: delay between characters, in seconds
+    :param float frame_secs: minimum time between frames, in seconds
+    :return: iterator yielding tuples of the form ``(chunk, secs)``, where\
+        ``chunk`` is the text for a frame and ``secs`` is the time to wait\
+        after displaying it
+    """
+    if chardelay <= 0.0:
+        if text:
+            yield text, 0.0
+
+        return
+
+    chars = max(1, int(frame_secs / chardelay))
+    for i in range(0, len(text), chars):
+        chunk = text[i:i + chars]
+        yield chunk, len(chunk) * chardelay
+
+def _write_stdout(text):
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+class Typewriter(object):
+    """
+    Displays text one character at a time from a background thread, so that
+    the game loop does not have to wait for slow printing to finish. Function
+    calls can be queued behind the text, so that output displayed by other
+    means stays in order.
+    """
+    def __init__(self, writefunc=None, frame_secs=FRAME_SECS):
+        """
+        :param writefunc: function to display each frame of text (if None,\
+            frames are written to stdout)
+        :param float frame_secs: minimum time between frames, in seconds
+        """
+        self.writefunc = _write_stdout if writefunc is None else writefunc
+        self.frame_secs = frame_secs
+
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._active = False
+        self._closed = False
+        self._thread = None
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _put(self, item):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("typewriter is closed")
+
+            self._items.append(item)
+            self._start()
+            self._cond.notify_all()
+
+    def write(self, text, chardelay):
+        """
+        Queue text to be displayed one character at a time. Returns
+        immediately.
+
+        :param str text: text to display
+        :param float chardelay: delay between characters, in seconds
+        """
+        self._put((self.writefunc, (text,), chardelay))
+
+    def call(self, func, *args):
+        """
+        Queue a function call, to run after all queued text has been
+        displayed. Returns immediately.
+
+        :param func: function to call
+        :param args: arguments to pass to function
+        """
+        self._put((func, args, None))
+
+    def busy(self):
+        """
+        Check whether any queued text has not been displayed yet
+
+        :return: True if text is being displayed
+        :rtype: bool
+        """
+        with self._cond:
+            return self._active or bool(self._items)
+
+    def drain(self, timeout=None):
+        """
+        Block until all queued text has been displayed
+
+        :param float timeout: max. time to wait in seconds (if None, wait\
+            forever)
+        :return: True if all queued text was displayed
+        :rtype: bool
+        """
+        deadline = None if timeout is None else default_timer() + timeout
+
+        with self._cond:
+            while self._active or self._items:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - default_timer()
+                    if remaining <= 0.0:
+                        return False
+
+                self._cond.wait(remaining)
+
+        return True
+
+    def close(self):
+        """
+        Stop the background thread. Any text not yet displayed is discarded.
+        """
+        with self._cond:
+            self._closed = True
+            self._items.clear()
+            self._cond.notify_all()
+
+        if self._thread is not None:
+            self._thread.join()
+
+    def _wait_until(self, deadline):
+        # Called with self._cond held
+        while not self._closed:
+            remaining = deadline - default_timer()
+            if remaining <= 0.0:
+                return
+
+            self._cond.wait(remaining)
+
+    def _run(self):
+        with self._cond:
+            while True:
+                while (not self._items) and (not self._closed):
+                    self._cond.wait()
+
+                if self._closed:
+                    return
+
+                func, args, chardelay = self._items.popleft()
+                self._active = True
+                self._cond.release()
+
+                try:
+                    if chardelay is None:
+                        func(*args)
+                    else:
+                        self._type(func, args[0], chardelay)
+                except Exception:
+                    traceback.print_exc()
+                finally:
+                    self._cond.acquire()
+                    self._active = False
+                    self._cond.notify_all()
+
+    def _type(self, func, text, chardelay):
+        deadline = default_timer()
+
+        for chunk, secs in iter_frames(text, chardelay, self.frame_secs):
+            func(chunk)
+            deadline += secs
+
+            with self._cond:
+                self._wait_until(deadline)
+                if self._closed:
+                    return
+
+_typewriter = None
+
+def get_typewriter():
+    """
+    Get the default typewriter, used to display game output when slow printing
+    is enabled
+
+    :return: default typewriter
+    :rtype: text_game_maker.utils.typewriter.Typewriter
+    """
+    global _typewriter
+
+    if _typewriter is None:
+        _typewriter = Typewriter()
+
+    return _typewriter
+
+def set_typewriter(typewriter):
+    """
+    Set the typewriter used to display game output when slow printing is
+    enabled. A frontend serving multiple game sessions can use this to
+    display slow output in its own way; any object with the same methods as
+    text_game_maker.utils.typewriter.Typewriter can be used.
+
+    :param typewriter: typewriter to use
+    """
+    global _typewriter
+    _typewriter = typewriter
+
+def get_active_typewriter():
+    """
+    Get the typewriter that is in use, without creating the default one
+
+    :return: typewriter, or None if slow printing has not been used yet
+    """
+    return _typewriter
+
+@atexit.register
+def _drain_at_exit():
+    # The background thread is a daemon thread, so let it finish displaying
+    # queued text before the process exits
+    if _typewriter is not None:
+        _typewriter.drain()
@@ -1,7 +1,9 @@
 from __future__ import unicode_literals, print_function
+import re
 import sys
 import os
-import time
+import mmap
+import array
 import copy
 import random
 import fnmatch
@@ -9,10 +11,7 @@ import inspect
 import textwrap
 import importlib
 
-from prompt_toolkit.completion import PathCompleter
-from prompt_toolkit import prompt as prompt_toolkit_prompt
-from prompt_toolkit import PromptSession
-from prompt_toolkit.history import InMemoryHistory
+from text_game_maker.utils import instrumentation, typewriter
 
 ITEM_LIST_FMT = "      {0:33}{1:1}({2})"
 
@@ -29,12 +28,27 @@ saved_prints = []
 
 _serializable_classes = {}
 _serializable_callbacks = {}
+_output_observers = []
+
+# Set this environment variable to 1 to run in headless mode by default
+HEADLESS_ENV_VAR = 'TEXT_GAME_MAKER_HEADLESS'
 
 def _default_printfunc(text):
     print(text)
 
+def _plain_inputfunc(prompt):
+    sys.stdout.write(prompt)
+    sys.stdout.flush()
+
+    line = sys.stdin.readline()
+    if not line:
+        raise EOFError()
+
+    return line.rstrip('\n')
+
 info = {
     'slow_printing': False,
+    'print_delay_disabled': False,
     'chardelay': 0.02,
     'last_command': 'look',
     'sequence_count': None,
@@ -42,13 +56,23 @@ info = {
     'instance': None,
     'printfunc': _default_printfunc,
     'inputfunc': None,
-    'prompt_session': None
+    'prompt_session': None,
+    'headless': os.environ.get(HEADLESS_ENV_VAR, '0') not in ['', '0'],
+    'rng': random.Random()
 }
 
 wrapper = textwrap.TextWrapper()
 wrapper.width = 60
 
+# Maximum number of entries in each of the text template and wrapped text
+# caches. Caches are emptied when full.
+TEXT_CACHE_SIZE = 1024
+
 _format_tokens = {}
+_format_token_regex = None
+_text_templates = {}
+_wrapped_text = {}
+_wrappers = {}
 
 _location = os.path.dirname(__file__)
 _first_names = os.path.join(_location, "first-names.txt")
@@ -357,31 +381,46 @@ def disable_commands(*commands):
     for command in commands:
         disable_command(command)
 
-def _fpeek(fh):
-    ret = fh.read(1)
-    fh.seek(-1, 1)
-    return ret
+class _LineIndex(object):
+    """
+    Read-only memory-mapped text file, with an index of the byte offset of
+    the start of each line, so that any line can be fetched without any file
+    I/O
+    """
+    def __init__(self, filename):
+        with open(filename, 'rb') as fh:
+            self.data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
 
-def _rand_line(filename):
-    with open(filename, 'rb') as fh:
-        # Get file size in bytes
-        fh.seek(0, 2)
-        size = fh.tell()
-        fh.seek(0)
+        # offsets[i] is the start of line i, and the last entry is the file
+        # size, so line i spans offsets[i] to offsets[i + 1]. Typecode must be
+        # a native str on python 2 (unicode_literals is in effect here)
+        self.offsets = array.array(str('I'), [0])
+        size = len(self.data)
+        pos = self.data.find(b'\n')
+
+        while (pos >= 0) and (pos < (size - 1)):
+            self.offsets.append(pos + 1)
+            pos = self.data.find(b'\n', pos + 1)
 
-        # Seek to random byte offset in file
-        pos = random.randrange(0, size)
-        fh.seek(pos)
+        self.offsets.append(size)
 
-        # Seek backwards to a newline
-        while (fh.tell() > 0) and (_fpeek(fh) != b'\n'):
-            fh.seek(-1, 1)
+    def __len__(self):
+        return len(self.offsets) - 1
 
-        if _fpeek(fh) == b'\n':
-            fh.seek(1, 1)
+    def line(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]]
+
+# Line indexes for name files, built on first use and shared by all sessions
+_line_indexes = {}
+
+def _rand_line(filename):
+    if filename not in _line_indexes:
+        _line_indexes[filename] = _LineIndex(filename)
 
-        name = fh.readline().decode("utf-8").strip().lower()
-        return name[:1].upper() + name[1:]
+    index = _line_indexes[filename]
+    name = index.line(info['rng'].randrange(len(index)))
+    name = name.decode("utf-8").strip().lower()
+    return name[:1].upper() + name[1:]
 
 def set_inputfunc(func):
     """
@@ -395,21 +434,60 @@ def set_inputfunc(func):
     """
     info['inputfunc'] = func
 
-def inputfunc(prompt):
+def set_headless(headless):
     """
-    Block until user input is available
+    Enable/disable headless mode. In headless mode, audio is never initialized,
+    and prompt-toolkit is never used; if no input function has been set with
+    set_inputfunc, input is read from stdin one line at a time. Headless mode
+    can also be enabled by setting the ``TEXT_GAME_MAKER_HEADLESS`` environment
+    variable to 1.
 
-    :param str prompt: string to prompt user for input
-    :return: user input
-    :rtype: str
+    :param bool headless: True to enable headless mode
+    """
+    info['headless'] = headless
+
+def is_headless():
+    """
+    Check whether headless mode is enabled
+
+    :return: True if headless mode is enabled
+    :rtype: bool
+    """
+    return info['headless']
+
+def get_inputfunc():
+    """
+    Get the function used for blocking on input from the user. If no function
+    has been set with set_inputfunc, a prompt session is created (or, in
+    headless mode, a function that reads lines from stdin is used).
+
+    :return: function used for reading user input
     """
     if info['inputfunc'] is None:
+        if info['headless']:
+            info['inputfunc'] = _plain_inputfunc
+            return info['inputfunc']
+
+        # prompt_toolkit is slow to import, so only import it when needed
+        from prompt_toolkit import PromptSession
+        from prompt_toolkit.history import InMemoryHistory
+
         history = InMemoryHistory()
         session = PromptSession(history=history, enable_history_search=True)
         info['prompt_session'] = session
         info['inputfunc'] = session.prompt
 
-    return info['inputfunc'](prompt)
+    return info['inputfunc']
+
+def inputfunc(prompt):
+    """
+    Block until user input is available
+
+    :param str prompt: string to prompt user for input
+    :return: user input
+    :rtype: str
+    """
+    return get_inputfunc()(prompt)
 
 def set_printfunc(func):
     """
@@ -427,7 +505,87 @@ def printfunc(text):
     :param str text: text to display
     :return: value returned by print function
     """
-    return info['printfunc'](text)
+    _notify_output_observers(text)
+    with instrumentation.stage(instrumentation.STAGE_PRINT_OUTPUT):
+        writer = typewriter.get_active_typewriter()
+        if (writer is not None) and writer.busy():
+            # Slow printing is still in progress, display this text after it
+            writer.call(info['printfunc'], text)
+            return None
+
+        return info['printfunc'](text)
+
+def wait_for_output(timeout=None):
+    """
+    Block until all game output printed one character at a time (when slow
+    printing is enabled) has been displayed
+
+    :param float timeout: max. time to wait in seconds (if None, wait forever)
+    :return: True if all output was displayed
+    :rtype: bool
+    """
+    writer = typewriter.get_active_typewriter()
+    if writer is None:
+        return True
+
+    return writer.drain(timeout)
+
+def add_output_observer(func):
+    """
+    Register a function to be called with all game output text, before it is
+    displayed. Output printed one character at a time (when slow printing is
+    enabled) is passed to observers as a single string.
+
+    :param func: function to call with game output text
+    """
+    _output_observers.append(func)
+
+def remove_output_observer(func):
+    """
+    Unregister a function previously registered with add_output_observer
+
+    :param func: function to unregister
+    """
+    if func in _output_observers:
+        _output_observers.remove(func)
+
+def _notify_output_observers(text):
+    for func in _output_observers:
+        func(text)
+
+def set_rng(rng):
+    """
+    Set the random number generator used for all random choices made by the
+    game engine (set by text_game_maker.builder.map_builder.MapBuilder, so
+    that each game session can be seeded and reproduced)
+
+    :param random.Random rng: random number generator
+    """
+    info['rng'] = rng
+
+def get_rng():
+    """
+    Get the random number generator used for all random choices made by the
+    game engine
+
+    :return: random number generator
+    :rtype: random.Random
+    """
+    return info['rng']
+
+def get_cache_dir():
+    """
+    Get the directory used for caching generated data between game sessions,
+    creating it if it does not exist
+
+    :return: cache directory path
+    :rtype: str
+    """
+    ret = os.path.join(os.path.expanduser("~"), '.text_game_maker_cache')
+    if not os.path.isdir(ret):
+        os.makedirs(ret)
+
+    return ret
 
 def get_random_name():
     """
@@ -537,6 +695,15 @@ def set_slow_printing(val):
 def get_slow_printing():
     return info['slow_printing']
 
+def set_print_delay_disabled(val):
+    """
+    Disable printing one character at a time, even if the player has set
+    'print slow'. Used to replay games at full speed.
+
+    :param bool val: True to disable print delay
+    """
+    info['print_delay_disabled'] = val
+
 def set_last_command(cmd):
     info['last_command'] = cmd
 
@@ -776,6 +943,69 @@ def find_tile(player, name):
 
     return None
 
+class _TextTemplate(object):
+    """
+    Text that has been split into static segments and format tokens, so that
+    format tokens can be replaced without searching the text again
+    """
+    def __init__(self, text):
+        self.tokens = []
+        self.segments = []
+
+        if _format_token_regex is None:
+            self.segments.append(text)
+            return
+
+        pos = 0
+        for match in _format_token_regex.finditer(text):
+            tok = match.group(0)
+            if tok not in self.tokens:
+                self.tokens.append(tok)
+
+            self.segments.append(text[pos:match.start()])
+            self.segments.append(self.tokens.index(tok))
+            pos = match.end()
+
+        self.segments.append(text[pos:])
+
+    def resolve(self):
+        """
+        Get current replacement text for all format tokens in this template
+        """
+        return tuple(_format_tokens[tok]() for tok in self.tokens)
+
+    def render(self, values, clean=None):
+        """
+        Build text with format tokens replaced
+
+        :param tuple values: replacement text for format tokens, as returned\
+            by resolve()
+        :param clean: function to apply to each segment of text (optional)
+        """
+        ret = []
+        for segment in self.segments:
+            if isinstance(segment, int):
+                segment = values[segment]
+
+            ret.append(segment if clean is None else clean(segment))
+
+        return ''.join(ret)
+
+def _clear_text_caches():
+    _text_templates.clear()
+    _wrapped_text.clear()
+
+def _get_text_template(text):
+    template = _text_templates.get(text)
+    if template is None:
+        if len(_text_templates) >= TEXT_CACHE_SIZE:
+            _text_templates.clear()
+
+        template = _TextTemplate(text)
+        _text_templates[text] = template
+
+    return template
+
 def add_format_token(token, func):
     """
     Add a format token
@@ -783,8 +1013,15 @@ def add_format_token(token, func):
     :param str token: token string to look for
     :param func: function to call to obtain replacement text for format token
     """
+    global _format_token_regex
+
     _format_tokens[token] = func
 
+    # Try longer tokens first, so a token that contains another token wins
+    tokens = sorted(_format_tokens, key=len, reverse=True)
+    _format_token_regex = re.compile('|'.join(re.escape(t) for t in tokens))
+    _clear_text_caches()
+
 def replace_format_tokens(text):
     """
     Replace format tokens in string (if any)
@@ -793,11 +1030,11 @@ def replace_format_tokens(text):
     :return: formatted text
     :rtype: str
     """
-    for tok in _format_tokens:
-        if tok in text:
-            text = text.replace(tok, _format_tokens[tok]())
+    template = _get_text_template(text)
+    if not template.tokens:
+        return text
 
-    return text
+    return template.render(template.resolve())
 
 basic_controls = """
 Movement
@@ -899,22 +1136,44 @@ def _remove_leading_whitespace(string):
     trimmed = [s.strip() for s in string.splitlines()]
     return '\n'.join(trimmed)
 
+def _get_wrapper(width):
+    if (not width) or (width == wrapper.width):
+        return wrapper
+
+    # Use a separate wrapper for each width, rather than changing the width
+    # of the shared wrapper
+    ret = _wrappers.get(width)
+    if ret is None:
+        ret = copy.copy(wrapper)
+        ret.width = width
+        _wrappers[width] = ret
+
+    return ret
+
+def _unwrap_text(text):
+    return text.replace('\n', ' ').replace('\r', '')
+
 def _wrap_text(text, width=None):
-    oldwidth = None
+    return _get_wrapper(width).fill(_unwrap_text(text))
 
-    if width:
-        oldwidth = wrapper.width
-        wrapper.width = width
+def _format_output(text):
+    with instrumentation.stage(instrumentation.STAGE_WRAP_OUTPUT):
+        template = _get_text_template(text)
+        values = template.resolve()
+        key = (text, values, wrapper.width)
 
-    ret = wrapper.fill(text.replace('\n', ' ').replace('\r', ''))
+        ret = _wrapped_text.get(key)
+        if ret is None:
+            if len(_wrapped_text) >= TEXT_CACHE_SIZE:
+                _wrapped_text.clear()
 
-    if oldwidth:
-        wrapper.width = oldwidth
+            ret = '\n' + wrapper.fill(template.render(values, _unwrap_text))
+            _wrapped_text[key] = ret
 
-    return ret
+        return ret
 
 def _wrap_print(text, wait=False):
-    msg = '\n' + _wrap_text(replace_format_tokens(text))
+    msg = _format_output(text)
     if wait:
         saved_prints.append(msg)
         return
@@ -1144,6 +1403,12 @@ def del_from_lists(item, *lists):
             del l[l.index(item)]
 
 def read_path_autocomplete(msg):
+    if info['headless']:
+        return inputfunc(msg)
+
+    from prompt_toolkit import prompt as prompt_toolkit_prompt
+    from prompt_toolkit.completion import PathCompleter
+
     return prompt_toolkit_prompt(msg, completer=PathCompleter())
 
 def read_line_raw(msg="", cancel_word=None, default=None):
@@ -1173,6 +1438,8 @@ def read_line_raw(msg="", cancel_word=None, default=None):
         user_input = pop_command()
         printfunc(prompt + user_input)
     else:
+        # Make sure the prompt is displayed after all game output
+        wait_for_output()
         user_input = inputfunc(prompt)
 
     if default and user_input == '':
@@ -1274,27 +1541,28 @@ def flush_waiting_prints():
 def game_print(msg, wait=False):
     """
     Print one character at a time if player has set 'print slow', otherwise
-    print normally
+    print normally. Text printed one character at a time is displayed by a
+    background thread (see text_game_maker.utils.typewriter), so this function
+    always returns immediately.
 
     :param msg: message to print
     :type msg: str
     """
 
-    msg = '\n' + _wrap_text(replace_format_tokens(msg))
+    msg = _format_output(msg)
     if wait:
         saved_prints.append(msg)
         return
 
-    if not info['slow_printing']:
+    if (not info['slow_printing']) or info['print_delay_disabled']:
         printfunc(msg)
         return
 
-    for i in range(len(msg)):
-        sys.stdout.write(msg[i])
-        sys.stdout.flush()
-        time.sleep(info['chardelay'])
-
-    printfunc('')
+    _notify_output_observers(msg)
+    with instrumentation.stage(instrumentation.STAGE_PRINT_OUTPUT):
+        writer = typewriter.get_typewriter()
+        writer.write(msg, info['chardelay'])
+        writer.call(info['printfunc'], '')
 
 def get_basic_controls():
     """